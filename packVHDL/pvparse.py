@@ -118,7 +118,10 @@ def p_bus_statement(p) :
 def p_error(p):
 	print "error :"
 	
-bparser = yacc.yacc(debug=True)
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'vhdlverif'))
+import tabcache
+bparser = tabcache.yacc(yacc, sys.modules[__name__], 'pv', debug=True)
 
 def parse(data,debug=0):
 	bparser.error = 0
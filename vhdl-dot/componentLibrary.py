@@ -198,8 +198,10 @@ class component:
 		self.identifier = arg_identifier
 		self.inSignals = arg_inSignals
 		self.outSignals = arg_outSignals
+	def text(self):
+		return self.identifier
 	def out(self):
-		print self.identifier
+		print self.text()
 		
 class signal:
 
@@ -208,8 +210,10 @@ class signal:
 		self.type = arg_type
 		self.leftLinks = arg_leftLinks
 		self.rightLinsk = arg_rightLinks
+	def text(self):
+		return ' '.join([str(x) for x in (self.identifier, "(", self.type, self.leftLinks, self.rightLinsk, ")")])
 	def out(self):
-		print self.identifier,"(",arg_type,arg_leftLinks,arg_rightLinks,")"
+		print self.text()
 		
 class signalAssignment:
 
@@ -217,8 +221,10 @@ class signalAssignment:
 		self.left = arg_LHS
 		self.right = arg_RHS
 		self.direction = arg_Dir
+	def text(self):
+		return ' '.join([str(x) for x in (self.left, "-", self.direction, "-", self.right)])
 	def out(self):
-		print self.left,"-",self.direction,"-",self.right
+		print self.text()
 		
 class portMap:
 	
@@ -226,6 +232,8 @@ class portMap:
 		self.identifier = arg_identifier
 		self.componentName = arg_componentName
 		self.signalAssignments = arg_signalAssignments
+	def text(self):
+		return ' '.join([str(x) for x in (self.identifier, "-", self.componentName, "-", self.signalAssignments)])
 	def out(self):
-		print self.identifier,"-",self.componentName,"-",self.signalAssignments
+		print self.text()
 		
\ No newline at end of file
@@ -187,7 +187,7 @@ def p_entity(p):
 	ident = p[2]
 	inSignals = []
 	outSignals = []
-	print 'entity',len(p)
+	events.debug('vhdldot.entity', 'entity ' + str(len(p)), symbols=len(p))
 	# Entity does not contain a portDef
 	if len(p) == 7:
 		p[0] = vhdl.component(ident)
@@ -399,8 +399,13 @@ def p_error(p):
 			tok = yacc.token()
 
 
-# Build the parser
-yacc.yacc(debug=True,debuglog=log)
+# Build the parser (tables are kept in the shared table cache of vhdlverif)
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'vhdlverif'))
+import tabcache
+import grammarprof
+import events
+parser = tabcache.yacc(yacc, sys.modules[__name__], 'vhdldot', debug=True, debuglog=log)
 	
 #*****MAIN*****#
 
@@ -489,10 +494,38 @@ def generateDotFile(componentTemplates, signalDefinitions, signalAssignments, po
 parsedData = []
 fileNames = []
 
-if len(sys.argv) > 1:
+# --profile-grammar FILE counts the reductions and times the actions of every
+# grammar rule, the report is printed and written to FILE (json)
+profile = None
+profileName = None
+args = sys.argv[1:]
+if '--profile-grammar' in args:
+	i = args.index('--profile-grammar')
+	profileName = args[i+1]
+	del args[i:i+2]
+	profile = grammarprof.GrammarProfile()
+	parser.productions = profile.productions(parser.productions)
+# -v (repeatable) prints the statements (-vv) and parse results (-vvv),
+# --log-jsonl FILE appends the events to FILE (see vhdlverif/events.py)
+verbose = 0
+for a in [a for a in args if a[:2] == '-v' and a.strip('v') == '-']:
+	args.remove(a)
+	verbose += len(a) - 1
+logName = None
+if '--log-jsonl' in args:
+	i = args.index('--log-jsonl')
+	logName = args[i+1]
+	del args[i:i+2]
+if verbose:
+	events.configure((events.INFO, events.DEBUG, events.TRACE)[min(verbose, 3) - 1])
+if logName:
+	events.configure(jsonl=logName)
+debugOn = events.enabled(events.DEBUG)
+
+if len(args) > 0:
 	print "Reading files specified by command line parameters..."
-	for i in range(1, len(sys.argv)):
-		fileNames.append(sys.argv[i])
+	for i in range(0, len(args)):
+		fileNames.append(args[i])
 else:
 	print "Enter the name of the file to parse."
 	t = raw_input('>')
@@ -507,7 +540,10 @@ for file in fileNames:
 	for line in f:
 		fileContents = fileContents + line
 	print "\tParsing file..."
-	result = yacc.parse(fileContents)
+	if profile:
+		result = profile.parse(parser, lex.lexer, fileContents)
+	else:
+		result = yacc.parse(fileContents)
 	result = flatten(result)
 	if result == None:
 		print "Error parsing VHDL file. " + str(file) + "\n"
@@ -516,6 +552,10 @@ for file in fileNames:
 		parsedData.append([file,result])
 
 import json
+
+if profile:
+	profile.report()
+	profile.dump(profileName)
 		
 # parsedData is of the form [ [ fileName, parseResult ], ... ]
 for results in parsedData:
@@ -531,25 +571,26 @@ for results in parsedData:
 	signalAssignments = []
 	portMaps = []
 	
-	print results
+	if events.enabled(events.TRACE):
+		events.trace('vhdldot.results', str(results), file=fileName)
 	# Fill the data structures
 	for statement in r:
 		# Components
 		if isinstance(statement, vhdl.component):
 			componentTemplates.append(statement)
-			statement.out()
 		# Signal definitions
 		elif isinstance(statement, vhdl.signal):
 			signalDefinitions.append(statement)
-			statement.out()
 		# Signal assignments
 		elif isinstance(statement, vhdl.signalAssignment):
 			signalAssignments.append(statement)
-			statement.out()
 		# Port maps
 		elif isinstance(statement, vhdl.portMap):
 			portMaps.append(statement)
-			statement.out()
+		else:
+			continue
+		if debugOn:
+			events.debug('vhdldot.statement', statement.text(), kind=statement.__class__.__name__)
 	
 	renderer = vhdl.dotRenderer()
 	if rootEntity:
@@ -15,37 +15,36 @@
 
 import sys
 import os # for OS functions
+import optparse
 from xml.dom import minidom
 from xml.dom.minidom import parse, parseString, getDOMImplementation
 from elements import VHDLdesign, VHDLfile
-import re
+from vhdlast import load_dom
+import events
 
-
-def deleteWS(file):
-    txt = open(file, 'r').read()
-    r = re.compile('\n', re.MULTILINE)
-    txt = r.sub('', txt)
-    r = re.compile('\t')
-    txt = r.sub('', txt)
-    r = re.compile('>( )*<')
-    txt = r.sub('><', txt)
-    return txt
+# loads optimized xml file file_arg into design, returns its VHDLfile
+def loadFile(design, file_arg):
+    topElement = load_dom(file_arg).documentElement
+    newFile = VHDLfile(file_arg, topElement, design)
+    design.addFile(newFile)
+    return newFile
 
 ###############################################################################
 # Basic function                                                              #
 ###############################################################################
 
 if __name__ == "__main__":
-    if len(sys.argv)>1:
-        for file_arg in sys.argv[1:]:
+    optparser = optparse.OptionParser(
+        usage='%prog [-v] file.vhd.optim.xml ...')
+    events.add_options(optparser)
+    (options, args) = optparser.parse_args()
+    events.configure_options(options)
+    if len(args)>0:
+        for file_arg in args:
             design = VHDLdesign('myDesign')
             if file_arg.endswith('optim.xml'):
                 print file_arg
-                DOMimplement = minidom.parseString(deleteWS(file_arg))
-                topElement = DOMimplement.getElementsByTagName('optimalVHDL') \
-                    .item(0)
-                newFile = VHDLfile(file_arg, topElement, design)
-                design.addFile(newFile)
+                loadFile(design, file_arg)
                 print '------------ done'
             else:
                 print file_arg + ' is not valid name file'
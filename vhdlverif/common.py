@@ -17,6 +17,7 @@ import xml.dom.minidom
 from xml.dom.minidom import Node
 from xml.dom import minidom
 from xml.dom.minidom import parse, parseString, getDOMImplementation, Element
+from vhdlast import elements_by_tag_name, first_element_by_tag_name
 
 # Superclass of all VHDL objects
 class VHDLobject(object):
@@ -50,6 +51,10 @@ class VHDLobject(object):
     def setXMLNode(self, xml):
         self.xmlNode = xml
 
+    # design-wide symbol table
+    def getSymbols(self):
+        return self.getParent().getSymbols()
+
 def getFirstReallyChild(xmlNode):
     for obj in xmlNode.childNodes:
         print obj
@@ -0,0 +1,318 @@
+#! /usr/bin/env python
+# vim:ts=4:expandtab:sw=4:tw=0
+###############################################################################
+# designdb.py - SQLite database of the design units converted by vhd2xml      #
+#                                                                             #
+# This program is free software; you can redistribute it and/or modify        #
+#   it under the terms of the GNU General Public License as published by      #
+#   the Free Software Foundation; either version 2 of the License, or         #
+#   (at your option) any later version.                                       #
+#   See http://www.gnu.org/licenses/gpl.html for more details.                #
+#                                                                             #
+###############################################################################
+###############################################################################
+# The database holds the entities, architectures, packages, components,
+# ports, generics, signals and instantiations of every converted file, each
+# row with its file and source line.  A file is indexed from its xml (one
+# streaming expat pass, no DOM) and only when the md5 of its source changed
+# since it was indexed the last time; the rows of a file are replaced in one
+# transaction.
+#
+# $ ./designdb.py design.db entities|ports ENTITY|instances UNIT
+
+import sys
+import os # for OS functions
+import hashlib
+import sqlite3
+from xml.parsers import expat
+
+# version of the schema, a database of another version is rebuilt
+SCHEMA_VERSION = 1
+
+schema = """
+create table files (id integer primary key, name text unique, hash text);
+create table entities (id integer primary key, file integer, name text,
+    line integer);
+create table architectures (id integer primary key, file integer, name text,
+    entity text, line integer);
+create table packages (id integer primary key, file integer, name text,
+    body integer, line integer);
+create table components (id integer primary key, file integer,
+    architecture integer, package integer, name text, line integer);
+create table ports (id integer primary key, file integer, entity integer,
+    component integer, position integer, name text, direction text,
+    type text, line integer);
+create table generics (id integer primary key, file integer, entity integer,
+    component integer, position integer, name text, type text,
+    line integer);
+create table signals (id integer primary key, file integer,
+    architecture integer, package integer, name text, type text,
+    line integer);
+create table instantiations (id integer primary key, file integer,
+    architecture integer, label text, kind text, library text, unit text,
+    unit_architecture text, line integer);
+create index entities_name on entities (name);
+create index architectures_entity on architectures (entity);
+create index packages_name on packages (name);
+create index components_name on components (name);
+create index ports_entity on ports (entity);
+create index ports_component on ports (component);
+create index generics_entity on generics (entity);
+create index generics_component on generics (component);
+create index signals_architecture on signals (architecture);
+create index instantiations_unit on instantiations (unit);
+create index instantiations_architecture on instantiations (architecture);
+"""
+
+# tables holding rows of a file
+tables = ('entities', 'architectures', 'packages', 'components', 'ports',
+    'generics', 'signals', 'instantiations')
+
+# instantiation statement tag -> kind
+instance_kinds = {
+    'componentParallelStatement': 'component',
+    'entityParallelStatement': 'entity',
+    'configurationParallelStatement': 'configuration',
+}
+
+# md5 of the content of file filename
+def file_hash(filename):
+    h = hashlib.md5()
+    f = open(filename, 'rb')
+    while True:
+        data = f.read(1 << 16)
+        if not data:
+            break
+        h.update(data)
+    f.close()
+    return h.hexdigest()
+
+# returns the line attribute of attrs as integer (None if missing)
+def line_of(attrs):
+    line = attrs.get('line')
+    if line:
+        return int(line)
+    return None
+
+# Design unit indexer class
+class UnitIndexer(object):
+    """Fills the rows of one file from the expat events of its xml, the
+    enclosing unit and declaration are kept on the element stack"""
+
+    def __init__(self, cursor, fileid):
+        self.cursor = cursor
+        self.file = fileid
+        # (tag, attrs, row data) of the open elements
+        self.stack = []
+        # row ids of the enclosing entity, architecture, package, component
+        self.entity = None
+        self.architecture = None
+        self.package = None
+        self.component = None
+        self.positions = {}
+
+    def insert(self, table, **values):
+        values['file'] = self.file
+        names = values.keys()
+        self.cursor.execute('insert into %s (%s) values (%s)' % (table,
+            ', '.join(names), ', '.join(['?'] * len(names))),
+            [values[n] for n in names])
+        return self.cursor.lastrowid
+
+    # next position of a port or generic of the current interface
+    def position(self, kind):
+        key = (kind, self.entity, self.component)
+        n = self.positions.get(key, 0)
+        self.positions[key] = n + 1
+        return n
+
+    def start(self, tag, attrs):
+        parent = self.stack and self.stack[-1][0] or None
+        data = None
+        depth = len(self.stack)
+        if depth == 1 and tag == 'entity':
+            self.entity = self.insert('entities', name=attrs.get('id'),
+                line=line_of(attrs))
+        elif depth == 1 and tag == 'architecture':
+            self.architecture = self.insert('architectures',
+                name=attrs.get('id'), entity=attrs.get('entity'),
+                line=line_of(attrs))
+        elif depth == 1 and (tag == 'package' or tag == 'packageBody'):
+            self.package = self.insert('packages', name=attrs.get('id'),
+                body=int(tag == 'packageBody'), line=line_of(attrs))
+        elif tag == 'componentDeclaration':
+            self.component = self.insert('components',
+                architecture=self.architecture, package=self.package,
+                name=attrs.get('id'), line=line_of(attrs))
+        elif tag == 'port' and parent == 'ports':
+            data = {'name': attrs.get('id'), 'direction': attrs.get('io'),
+                'type': None, 'line': line_of(attrs)}
+        elif tag == 'parameter' and parent == 'generic':
+            data = {'name': attrs.get('id'), 'type': None,
+                'line': line_of(attrs)}
+        elif tag == 'signalDeclaration':
+            data = {'ids': [], 'type': None, 'line': line_of(attrs)}
+            if attrs.has_key('id'):
+                # declaration split by optimvhd
+                data['ids'].append((attrs['id'], data['line']))
+        elif tag == 'id' and parent == 'ids' and len(self.stack) > 1 and \
+            self.stack[-2][0] == 'signalDeclaration':
+            self.stack[-2][2]['ids'].append((attrs.get('id'),
+                line_of(attrs)))
+        elif tag == 'type' and self.stack and self.stack[-1][2] != None and \
+            self.stack[-1][2].has_key('type') and \
+            self.stack[-1][2]['type'] == None:
+            self.stack[-1][2]['type'] = attrs.get('id')
+        elif instance_kinds.has_key(tag) and self.architecture != None:
+            unit = attrs.get('id', '')
+            library = None
+            if '.' in unit:
+                library, unit = unit.rsplit('.', 1)
+            self.insert('instantiations', architecture=self.architecture,
+                label=attrs.get('label'), kind=instance_kinds[tag],
+                library=library, unit=unit,
+                unit_architecture=attrs.get('architecture'),
+                line=line_of(attrs))
+        self.stack.append((tag, attrs, data))
+
+    def end(self, tag):
+        tag, attrs, data = self.stack.pop()
+        if tag == 'port' and data != None:
+            self.insert('ports', entity=self.owner('entity'),
+                component=self.component, position=self.position('port'),
+                **data)
+        elif tag == 'parameter' and data != None:
+            self.insert('generics', entity=self.owner('entity'),
+                component=self.component, position=self.position('generic'),
+                **data)
+        elif tag == 'signalDeclaration':
+            for name, line in data['ids']:
+                self.insert('signals', architecture=self.architecture,
+                    package=self.package, name=name, type=data['type'],
+                    line=line or data['line'])
+        elif tag == 'componentDeclaration':
+            self.component = None
+        elif len(self.stack) == 1:
+            self.entity = self.architecture = self.package = None
+
+    # the entity of an interface item, None inside a component declaration
+    def owner(self, kind):
+        if self.component != None:
+            return None
+        return self.entity
+
+# Design database class
+class DesignDatabase(object):
+    "SQLite database of design units, updated per file by content hash"
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.text_factory = str
+        # files indexed and skipped by update
+        self.indexed = 0
+        self.skipped = 0
+        self.create()
+
+    # creates the tables (again if the schema changed)
+    def create(self):
+        c = self.connection
+        version = c.execute('pragma user_version').fetchone()[0]
+        if version == SCHEMA_VERSION:
+            return
+        for (name,) in c.execute("select name from sqlite_master "
+            "where type = 'table'").fetchall():
+            c.execute('drop table %s' % name)
+        c.executescript(schema)
+        c.execute('pragma user_version = %d' % SCHEMA_VERSION)
+        c.commit()
+
+    def close(self):
+        self.connection.close()
+
+    # indexes source file filename from its xml file xml_name unless the
+    # source did not change, returns True if the file was indexed
+    def update(self, filename, xml_name, content_hash=None):
+        name = os.path.abspath(filename)
+        if content_hash == None:
+            content_hash = file_hash(filename)
+        c = self.connection
+        row = c.execute('select id, hash from files where name = ?',
+            (name,)).fetchone()
+        if row and row[1] == content_hash:
+            self.skipped += 1
+            return False
+        try:
+            cursor = c.cursor()
+            if row:
+                fileid = row[0]
+                for table in tables:
+                    cursor.execute('delete from %s where file = ?' % table,
+                        (fileid,))
+                cursor.execute('update files set hash = ? where id = ?',
+                    (content_hash, fileid))
+            else:
+                cursor.execute('insert into files (name, hash) values (?, ?)',
+                    (name, content_hash))
+                fileid = cursor.lastrowid
+            self.index(cursor, fileid, xml_name)
+            c.commit()
+        except:
+            c.rollback()
+            raise
+        self.indexed += 1
+        return True
+
+    # fills the rows of file fileid from xml file xml_name
+    def index(self, cursor, fileid, xml_name):
+        indexer = UnitIndexer(cursor, fileid)
+        parser = expat.ParserCreate()
+        parser.returns_unicode = False
+        parser.StartElementHandler = indexer.start
+        parser.EndElementHandler = indexer.end
+        f = open(xml_name, 'rb')
+        parser.ParseFile(f)
+        f.close()
+
+    # returns (name, file, line) of all entities
+    def entities(self):
+        return self.connection.execute('select e.name, f.name, e.line '
+            'from entities e join files f on e.file = f.id '
+            'order by e.name').fetchall()
+
+    # returns (name, direction, type, line) of the ports of entity name
+    def ports(self, name):
+        return self.connection.execute('select p.name, p.direction, p.type, '
+            'p.line from ports p join entities e on p.entity = e.id '
+            'where e.name = ? order by p.position', (name.lower(),)).fetchall()
+
+    # returns (entity, architecture, label, file, line) of the
+    # instantiations of unit name
+    def instances(self, name):
+        return self.connection.execute('select a.entity, a.name, i.label, '
+            'f.name, i.line from instantiations i '
+            'join architectures a on i.architecture = a.id '
+            'join files f on i.file = f.id where i.unit = ? '
+            'order by f.name, i.line', (name.lower(),)).fetchall()
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or (sys.argv[2] != 'entities' and len(sys.argv) < 4):
+        print >>sys.stderr, \
+            'syntax: %s design.db entities|ports ENTITY|instances UNIT' % \
+            sys.argv[0]
+        sys.exit(1)
+    db = DesignDatabase(sys.argv[1])
+    query = sys.argv[2]
+    if query == 'entities':
+        for name, filename, line in db.entities():
+            print '%s %s:%s' % (name, filename, line)
+    elif query == 'ports':
+        for name, direction, type, line in db.ports(sys.argv[3]):
+            print '%s %s %s (line %s)' % (name, direction, type, line)
+    elif query == 'instances':
+        for entity, arch, label, filename, line in db.instances(sys.argv[3]):
+            print '%s(%s) %s %s:%s' % (entity, arch, label, filename, line)
+    else:
+        print >>sys.stderr, 'unknown query %s' % query
+        sys.exit(1)
+    db.close()
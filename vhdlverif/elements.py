@@ -19,7 +19,8 @@ from xml.dom import minidom
 from xml.dom.minidom import parse, parseString, getDOMImplementation
 from common import *
 from statements import *
-from numpy import *
+from symbols import SymbolTable
+import events
 
 # Superclass of all VHDL objects
 class VHDLobject(object):
@@ -53,6 +54,10 @@ class VHDLobject(object):
     def getXMLNode(self):
         return self.xmlNode
 
+    # design-wide symbol table
+    def getSymbols(self):
+        return self.getParent().getSymbols()
+
 # VHDL Desgin class
 class VHDLdesign(VHDLobject):
     "File class"
@@ -60,12 +65,18 @@ class VHDLdesign(VHDLobject):
     fileList = []
     mainFile = None
     mainArch = None
+    # Symbol table of all identifiers
+    symbols = None
 
     def __init__(self, ID):
         self.fileList = []
         self.mainFile = None
         self.mainArch = None
+        self.symbols = SymbolTable()
         self.setID(ID)
+
+    def getSymbols(self):
+        return self.symbols
         
     def addFile(self, f):
         self.fileList.append(f)
@@ -88,6 +99,13 @@ class VHDLdesign(VHDLobject):
     def checkDependency(self):
         return self.mainArch.checkDependency()
 
+    # entity name of any file of the design
+    def getEntityByName(self, name):
+        for f in self.fileList:
+            if f.getEntityMap().has_key(name):
+                return f.getEntityMap()[name]
+        raise KeyError(name)
+
 # File class
 class VHDLfile(VHDLobject):
     "File class"
@@ -95,10 +113,16 @@ class VHDLfile(VHDLobject):
     entityMap = {}
     # Architecture list
     archMap = {}
+    # Library list (library clauses)
+    libraryList = []
+    # Use list (selected names of use clauses)
+    useList = []
 
     def __init__(self, ID, xml, par):
         self.entityMap = {}
         self.archMap = {}
+        self.libraryList = []
+        self.useList = []
         self.setID(ID)
         self.setXMLNode(xml)
         self.setParent(par)
@@ -110,8 +134,11 @@ class VHDLfile(VHDLobject):
     def getEntityMap(self):
         return self.entityMap
 
+    # entities of other files of the design are found through the design
     def getEntityByName(self, name):
-        return self.entityMap[name]
+        if self.entityMap.has_key(name):
+            return self.entityMap[name]
+        return self.getParent().getEntityByName(name)
 
     def addArch(self, arch):
         self.archMap[arch.getID()] = arch
@@ -122,66 +149,107 @@ class VHDLfile(VHDLobject):
     def getArchByName(self, name):
         return self.archMap[name]
 
+    def addLibrary(self, lib):
+        if lib not in self.libraryList:
+            self.libraryList.append(lib)
+
+    def getLibraryList(self):
+        return self.libraryList
+
+    def addUse(self, use):
+        if use not in self.useList:
+            self.useList.append(use)
+
+    def getUseList(self):
+        return self.useList
+
     def loadStructure(self):
         self.loadLibraries()
         self.loadEntities()
         self.loadArchs()
 
     def loadLibraries(self):
-        "Not yet supported"
+        for useTag in elements_by_tag_name(self.getXMLNode(), 'useClause'):
+            if useTag.hasAttribute('library'):
+                self.addLibrary(str(useTag.getAttribute('library')))
+            for tag in elements_by_tag_name(useTag, 'use'):
+                self.addUse(str(tag.getAttribute('id')))
 
     def loadEntities(self):
-        for entityTag in self.getXMLNode().getElementsByTagName('entity'):
+        for entityTag in elements_by_tag_name(self.getXMLNode(), 'entity'):
             idEntity = str(entityTag.getAttribute('id'))
             entityItem = Entity(idEntity, entityTag, self)
-            print "analyse entity: " + idEntity
-            portsTag = entityTag.getElementsByTagName('ports').item(0)
-            for portTag in portsTag.getElementsByTagName('port'):
-                idPort = str(portTag.getAttribute('id'))
-                dirPort = str(portTag.getAttribute('io'))
-                print "- port " + dirPort + ": " + idPort
-                if dirPort == 'in':
-                    portItem = InPort(idPort, entityItem)
-                    entityItem.addInPort(portItem)
-                elif dirPort == 'out':
-                    portItem = OutPort(idPort, entityItem)
-                    entityItem.addOutPort(portItem)
-                elif dirPort == 'out':
-                    portItem = InOutPort(idPort, entityItem)
-                    entityItem.addInoutPort(portItem)
+            events.info('analyse.entity', "analyse entity: " + idEntity,
+                id=idEntity)
+            debugOn = events.enabled(events.DEBUG)
+            portsTag = first_element_by_tag_name(entityTag, 'ports')
+            # an entity without ports (a testbench) has no ports tag
+            if portsTag != None:
+                for portTag in elements_by_tag_name(portsTag, 'port'):
+                    idPort = str(portTag.getAttribute('id'))
+                    dirPort = str(portTag.getAttribute('io'))
+                    if debugOn:
+                        events.debug('analyse.port',
+                            "- port " + dirPort + ": " + idPort, io=dirPort,
+                            id=idPort, entity=idEntity)
+                    if dirPort == 'in':
+                        portItem = InPort(idPort, entityItem)
+                        entityItem.addInPort(portItem)
+                    elif dirPort == 'out':
+                        portItem = OutPort(idPort, entityItem)
+                        entityItem.addOutPort(portItem)
+                    elif dirPort == 'out':
+                        portItem = InOutPort(idPort, entityItem)
+                        entityItem.addInoutPort(portItem)
             self.addEntity(entityItem)
 
     def loadArchs(self):
-        for archTag in self.getXMLNode().getElementsByTagName('architecture'):
+        for archTag in elements_by_tag_name(self.getXMLNode(), 'architecture'):
             idArch = str(archTag.getAttribute('id'))
             idArchEnt = str(archTag.getAttribute('entity'))
             archItem = Architecture(idArch, archTag, self, idArchEnt)
-            print "analyse architecture: " + idArch + " of entity: " + idArchEnt
-            declTag = archTag.getElementsByTagName('declarations').item(0)
-            for sigTag in declTag.getElementsByTagName('signalDeclaration'):
-                idSig = str(sigTag.getAttribute('id'))
-                signalItem = Signal(idSig, archItem)
-                print "- signal: " + idSig
-                archItem.addSignal(signalItem)
-            for compTag in declTag.getElementsByTagName('componentDeclaration'):
-                idComp = str(compTag.getAttribute('id'))
-                compItem = Component(idComp, compTag, archItem)
-                print "- component: " + idComp
-                portsTag = compTag.getElementsByTagName('ports').item(0)
-                for portTag in portsTag.getElementsByTagName('port'):
-                    idPort = str(portTag.getAttribute('id'))
-                    dirPort = str(portTag.getAttribute('io'))
-                    print "- port " + dirPort + ": " + idPort
-                    if dirPort == 'in':
-                        portItem = InPort(idPort, compItem)
-                        compItem.addInPort(portItem)
-                    elif dirPort == 'out':
-                        portItem = OutPort(idPort, compItem)
-                        compItem.addOutPort(portItem)
-                    elif dirPort == 'out':
-                        portItem = InOutPort(idPort, compItem)
-                        compItem.addInoutPort(portItem)
-                archItem.addComp(compItem)
+            events.info('analyse.architecture', "analyse architecture: " + \
+                idArch + " of entity: " + idArchEnt, id=idArch,
+                entity=idArchEnt)
+            debugOn = events.enabled(events.DEBUG)
+            declTag = first_element_by_tag_name(archTag, 'declarations')
+            # an architecture without declarations has no declarations tag
+            if declTag != None:
+                for sigTag in elements_by_tag_name(declTag,
+                    'signalDeclaration'):
+                    idSig = str(sigTag.getAttribute('id'))
+                    signalItem = Signal(idSig, archItem)
+                    if debugOn:
+                        events.debug('analyse.signal', "- signal: " + idSig,
+                            id=idSig)
+                    archItem.addSignal(signalItem)
+                for compTag in elements_by_tag_name(declTag,
+                    'componentDeclaration'):
+                    idComp = str(compTag.getAttribute('id'))
+                    compItem = Component(idComp, compTag, archItem)
+                    if debugOn:
+                        events.debug('analyse.component',
+                            "- component: " + idComp, id=idComp)
+                    portsTag = first_element_by_tag_name(compTag, 'ports')
+                    # a component without ports has no ports tag
+                    if portsTag != None:
+                        for portTag in elements_by_tag_name(portsTag, 'port'):
+                            idPort = str(portTag.getAttribute('id'))
+                            dirPort = str(portTag.getAttribute('io'))
+                            if debugOn:
+                                events.debug('analyse.port',
+                                    "- port " + dirPort + ": " + idPort,
+                                    io=dirPort, id=idPort, component=idComp)
+                            if dirPort == 'in':
+                                portItem = InPort(idPort, compItem)
+                                compItem.addInPort(portItem)
+                            elif dirPort == 'out':
+                                portItem = OutPort(idPort, compItem)
+                                compItem.addOutPort(portItem)
+                            elif dirPort == 'out':
+                                portItem = InOutPort(idPort, compItem)
+                                compItem.addInoutPort(portItem)
+                    archItem.addComp(compItem)
             self.addArch(archItem)
 
 # VHDL interface class - Entity or Component
@@ -253,9 +321,12 @@ class Architecture(VHDLobject):
     signalMap = {}
     # Component list
     compMap = {}
-    # Dependency matrix
-    depMat = None
-    resultMat = None
+    # Dependency graph: node number -> set of the nodes depending on it
+    # (only nodes with edges), matrix maps give the node number of a symbol
+    depGraph = None
+    # in port node number -> set of the nodes it reaches
+    resultGraph = None
+    symbols = None
     matrixMap = {}
     inMatrixMap = {}
     outMatrixMap = {}
@@ -266,8 +337,8 @@ class Architecture(VHDLobject):
     def __init__(self, ID, xml, par, ent):
         self.signalMap ={}
         self.compMap = {}
-        self.depMat = None
-        self.resultMat = None
+        self.depGraph = None
+        self.resultGraph = None
         self.matrixMap = {}
         self.inMatrixMap = {}
         self.outMatrixMap = {}
@@ -275,6 +346,7 @@ class Architecture(VHDLobject):
         self.setID(ID)
         self.setXMLNode(xml)
         self.setParent(par)
+        self.symbols = self.getSymbols()
         self.setEntity(ent)
         self.idList = []
         self.resultString = ''
@@ -300,47 +372,65 @@ class Architecture(VHDLobject):
     def getCompMap(self):
         return self.compMap
 
-    def createDepMatrix(self):
+    # numbers the in ports, out ports and signals as the graph nodes
+    def createDepGraph(self):
         count = 0
-        print "in ports"
+        debugOn = events.enabled(events.DEBUG)
+        events.debug('analyse.graph', "in ports")
         for p in self.getEntity().getInPortMap().values():
-            print "- " + p.getID()
-            self.inMatrixMap[p.getID()] = count
-            self.matrixMap[p.getID()] = count
+            if debugOn:
+                events.debug('analyse.graph.in', "- " + p.getID(),
+                    id=p.getID(), index=count)
+            sym = self.symbols.symbol(p.getID())
+            self.inMatrixMap[sym] = count
+            self.matrixMap[sym] = count
             self.idList.append(p.getID())
             count = count + 1
-        print "out ports"
+        events.debug('analyse.graph', "out ports")
         for p in self.getEntity().getOutPortMap().values():
-            print "- " + p.getID()
-            self.outMatrixMap[p.getID()] = count
-            self.matrixMap[p.getID()] = count
+            if debugOn:
+                events.debug('analyse.graph.out', "- " + p.getID(),
+                    id=p.getID(), index=count)
+            sym = self.symbols.symbol(p.getID())
+            self.outMatrixMap[sym] = count
+            self.matrixMap[sym] = count
             self.idList.append(p.getID())
             count = count + 1
-        print "signals"
+        events.debug('analyse.graph', "signals")
         for s in self.getSignalMap().values():
-            print "- " + s.getID()
-            self.sigMatrixMap[s.getID()] = count
-            self.matrixMap[s.getID()] = count
+            if debugOn:
+                events.debug('analyse.graph.signal', "- " + s.getID(),
+                    id=s.getID(), index=count)
+            sym = self.symbols.symbol(s.getID())
+            self.sigMatrixMap[sym] = count
+            self.matrixMap[sym] = count
             self.idList.append(s.getID())
             count = count + 1
-        self.depMat = matrix(identity(count, int))
-        self.printDepMatrix(True)
+        self.depGraph = {}
+        events.count('analyse.graph.nodes', count)
 #        for i in range(0, len(self.idList)-1):
 #            print str(i) + ": " + self.idList[i]
 
-    def getDepMatrix(self):
-        return self.depMat
+    def getDepGraph(self):
+        return self.depGraph
 
-    def printDepMatrix(self, raw):
-        if raw:
-            print self.depMat
+    def printDepGraph(self, raw):
+        if raw and events.enabled(events.TRACE):
+            for i in sorted(self.depGraph):
+                events.trace('analyse.graph.dep', self.idList[i] + ' -> ' + \
+                    ' '.join([self.idList[j]
+                    for j in sorted(self.depGraph[i])]))
 
+    # master .. list of symbols, slave .. symbol
     def setDep(self, master, slave):
         if self.matrixMap.has_key(slave):
             slaveNbr = self.matrixMap[slave]
             for id in master:
                 if self.matrixMap.has_key(id):
-                    self.depMat[self.matrixMap[id],slaveNbr] = 1
+                    masterNbr = self.matrixMap[id]
+                    if masterNbr != slaveNbr:
+                        self.depGraph.setdefault(masterNbr,
+                            set()).add(slaveNbr)
 #                    print id + " -> " + slave
 
 #                else:
@@ -348,23 +438,23 @@ class Architecture(VHDLobject):
 #        else:
 #            print 'signal or port ' + id + ' not defined'
 
-    def countDepFromMatrix(self):
-        changing = True
-        tempMat = self.depMat * matrix(identity(len(self.idList), int))
-        self.resultMat = self.depMat * matrix(identity(len(self.idList), int))
-        while changing:
-            self.resultMat = tempMat * tempMat
-            print self.resultMat
-            changing = False
-            for i in range(0, len(self.idList)-1):
-                for j in range(0, len(self.idList)-1):
-                    if self.resultMat[i,j] != 0:
-                        self.resultMat[i,j] = 1
-                    if self.resultMat[i,j] != tempMat[i,j]:
-                        changing = True
-            tempMat = self.resultMat
-
-    def depMatrixToString(self):
+    # transitive closure of the in ports: every in port gets the set of the
+    # nodes it reaches (depth first search over the edges)
+    def countDepFromGraph(self):
+        self.resultGraph = {}
+        graph = self.depGraph
+        for i in self.inMatrixMap.values():
+            reached = set()
+            stack = [i]
+            while stack:
+                for j in graph.get(stack.pop(), ()):
+                    if j not in reached:
+                        reached.add(j)
+                        stack.append(j)
+            self.resultGraph[i] = reached
+            events.count('analyse.closure.reached', len(reached))
+
+    def depGraphToString(self):
 
         def add(s):
             self.resultString = self.resultString + s + '\n'
@@ -372,27 +462,33 @@ class Architecture(VHDLobject):
         add('digraph ' + self.getID() + ' {')
         add('label = "Architecture ' + self.getID().upper() + \
             ' of entity ' + self.getEntity().getID().upper() + '";')
-        for i in self.inMatrixMap.values():
+        # ports sorted by name, the graph does not depend on the order of
+        # the port maps
+        name = lambda i: self.idList[i]
+        inList = sorted(self.inMatrixMap.values(), key=name)
+        outList = sorted(self.outMatrixMap.values(), key=name)
+        for i in inList:
             add('   ' + self.idList[i] + ' [shape=box];')
-        for i in self.outMatrixMap.values():
+        for i in outList:
             add('   ' + self.idList[i] + ' [shape=ellipse];')
-        for i in self.inMatrixMap.values():
-            for j in self.outMatrixMap.values():
-                if self.resultMat[i,j] != 0:
+        for i in inList:
+            reached = self.resultGraph[i]
+            for j in outList:
+                if j in reached:
                     add('   ' + self.idList[i] + ' -> ' + self.idList[j] + ';')
         add('}')
         return self.resultString
 
     def checkDependency(self):
-        print "checking dependency"
-        self.createDepMatrix()
-        parStmtsTag = self.getXMLNode(). \
-            getElementsByTagName('parallelStatements').item(0)
+        events.info('analyse.check', "checking dependency", id=self.getID())
+        self.createDepGraph()
+        parStmtsTag = first_element_by_tag_name(self.getXMLNode(), \
+            'parallelStatements')
         parStmt = ParStmts(self.getID(), parStmtsTag, self, self, [])
         parStmt.checkDependency()
-        self.countDepFromMatrix()
-#        self.printDepMatrix(True)
-        return self.depMatrixToString()
+        self.printDepGraph(True)
+        self.countDepFromGraph()
+        return self.depGraphToString()
 
 # Component class
 class Component(VHDLinterfaceObject):
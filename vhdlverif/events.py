@@ -0,0 +1,159 @@
+#! /usr/bin/env python
+# vim:ts=4:expandtab:sw=4:tw=0
+###############################################################################
+# events.py - level gated events and counters of the tools                    #
+#                                                                             #
+# This program is free software; you can redistribute it and/or modify        #
+#   it under the terms of the GNU General Public License as published by      #
+#   the Free Software Foundation; either version 2 of the License, or         #
+#   (at your option) any later version.                                       #
+#   See http://www.gnu.org/licenses/gpl.html for more details.                #
+#                                                                             #
+###############################################################################
+###############################################################################
+# An event has a level, a dotted name (optimvhd.split), an optional message
+# and fields.  It goes to the console (the message on stdout, as the tools
+# printed it) if its level reaches the console level, and to the JSONL sink
+# (one json object per line: time, pid, level, event, message and the
+# fields) if one is open and the level reaches the sink level.  By default
+# the console level is WARNING and there is no sink, so the analysis of a
+# large design prints nothing per item; the sink takes the DEBUG events and
+# up.  Hot loops test enabled(level) once and pay nothing more when the
+# level is off.
+#
+# Counters (count) are kept per process, they are written to the sink when
+# it is closed and printed at the INFO level.
+#
+# The levels are taken from $PYVHDL_LOG (error, warning, info, debug, trace)
+# and $PYVHDL_LOG_JSONL (file name of the sink, opened for appending), the
+# tools set them by -v (repeatable) and --log-jsonl FILE.
+
+import sys
+import os # for OS functions
+import json
+import time
+import atexit
+
+# environment variables of the console level and the sink file
+LEVEL_ENV = 'PYVHDL_LOG'
+JSONL_ENV = 'PYVHDL_LOG_JSONL'
+
+# levels
+ERROR = 40
+WARNING = 30
+INFO = 20
+DEBUG = 10
+TRACE = 5
+
+level_names = {ERROR: 'error', WARNING: 'warning', INFO: 'info',
+    DEBUG: 'debug', TRACE: 'trace'}
+
+# lowest level that is not dropped (console or sink)
+threshold = WARNING
+console_level = WARNING
+sink_level = DEBUG
+sink = None
+# counter name -> value
+counters = {}
+
+# returns the level of name (level name or number)
+def parse_level(name):
+    for l, n in level_names.items():
+        if n == str(name).lower():
+            return l
+    return int(name)
+
+# true if events of level lvl go anywhere
+def enabled(lvl):
+    return lvl >= threshold
+
+# emits event of level lvl with message and fields
+def log(lvl, event, message=None, **fields):
+    if lvl < threshold:
+        return
+    if lvl >= console_level:
+        if message == None:
+            message = event + ''.join([' %s=%s' % (k, fields[k])
+                for k in sorted(fields)])
+        print message
+    if sink != None and lvl >= sink_level:
+        record = {'time': time.time(), 'pid': os.getpid(),
+            'level': level_names.get(lvl, lvl), 'event': event}
+        if message != None:
+            record['message'] = message
+        record.update(fields)
+        # one write per line, concurrent processes append whole lines
+        sink.write(json.dumps(record, default=str) + '\n')
+        sink.flush()
+
+def error(event, message=None, **fields):
+    log(ERROR, event, message, **fields)
+
+def warning(event, message=None, **fields):
+    log(WARNING, event, message, **fields)
+
+def info(event, message=None, **fields):
+    log(INFO, event, message, **fields)
+
+def debug(event, message=None, **fields):
+    log(DEBUG, event, message, **fields)
+
+def trace(event, message=None, **fields):
+    log(TRACE, event, message, **fields)
+
+# adds n to counter name
+def count(name, n=1):
+    counters[name] = counters.get(name, 0) + n
+
+# sets the console level and opens the sink jsonl (file name) for events
+# of level jsonl_level and up, None keeps the current setting
+def configure(level=None, jsonl=None, jsonl_level=None):
+    global threshold, console_level, sink_level, sink
+    if level != None:
+        console_level = level
+    if jsonl_level != None:
+        sink_level = jsonl_level
+    if jsonl != None:
+        if sink != None:
+            sink.close()
+        sink = open(jsonl, 'a')
+    threshold = console_level
+    if sink != None:
+        threshold = min(threshold, sink_level)
+
+# writes the counters to the sink and closes it, prints the counters at the
+# INFO level
+def close():
+    global sink
+    if counters and console_level <= INFO:
+        for name in sorted(counters):
+            print '%s: %d' % (name, counters[name])
+    if sink != None:
+        if counters:
+            sink.write(json.dumps({'time': time.time(), 'pid': os.getpid(),
+                'level': 'info', 'event': 'counters',
+                'counters': counters}) + '\n')
+        sink.close()
+        sink = None
+    counters.clear()
+
+# adds the -v and --log-jsonl options to optparser
+def add_options(optparser):
+    optparser.add_option('-v', '--verbose', action='count', default=0,
+        help='print progress (-v), every item (-vv), internal data (-vvv)')
+    optparser.add_option('--log-jsonl', metavar='FILE',
+        help='append the events (debug and up, trace with -vvv) and the '
+        'counters to FILE (jsonl)')
+
+# configures the events from the options of add_options
+def configure_options(options):
+    level = None
+    if options.verbose:
+        level = (INFO, DEBUG, TRACE)[min(options.verbose, 3) - 1]
+    configure(level, options.log_jsonl, min(level or DEBUG, DEBUG))
+
+if os.environ.get(LEVEL_ENV):
+    configure(parse_level(os.environ[LEVEL_ENV]))
+if os.environ.get(JSONL_ENV):
+    configure(jsonl=os.environ[JSONL_ENV])
+atexit.register(close)
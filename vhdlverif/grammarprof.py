@@ -0,0 +1,195 @@
+#! /usr/bin/env python
+# vim:ts=4:expandtab:sw=4:tw=0
+###############################################################################
+# grammarprof.py - reduction counts and action times of PLY grammars          #
+#                                                                             #
+# This program is free software; you can redistribute it and/or modify        #
+#   it under the terms of the GNU General Public License as published by      #
+#   the Free Software Foundation; either version 2 of the License, or         #
+#   (at your option) any later version.                                       #
+#   See http://www.gnu.org/licenses/gpl.html for more details.                #
+#                                                                             #
+###############################################################################
+###############################################################################
+# A profiled parser gets a copy of the production list of its tables in which
+# every rule function is wrapped: the wrapper counts the reductions of the
+# rule function, adds up the time spent in it and samples the depth of the
+# symbol stack.  The symbol stack is deepest right before a reduction, so the
+# stack high-water mark is the largest stack seen by a rule function plus the
+# length of its production.  Tokens are counted by wrapping the token method
+# of the lexer for the time of a parse.  Work a rule function hands to the
+# caller of the parser (vhd2xml writes every parsed design unit from the
+# start rule) is wrapped by outside(): its time is reported on a line of its
+# own and not charged to the rule function.
+#
+# Works with the vendored PLY 2.3 (production.func) and PLY 3
+# (production.callable); the parse tables are not touched.
+
+import sys
+import copy
+import json
+import time
+
+# Grammar profile class
+class GrammarProfile(object):
+    "Reductions and action time per rule function, tokens and parse time"
+
+    def __init__(self):
+        # rule function name -> [reductions, seconds]
+        self.rules = {}
+        # name of outside work -> [calls, seconds], seconds of all of it
+        self.outsides = {}
+        self.nested = 0.0
+        self.tokens = 0
+        self.time = 0.0
+        self.stack = 0
+        self.parses = 0
+        # id of production list -> (production list, wrapped list)
+        self.wrapped = {}
+
+    # returns the wrapped copy of production list productions
+    def productions(self, productions):
+        entry = self.wrapped.get(id(productions))
+        if entry == None:
+            entry = (productions, [self.wrap(p) for p in productions])
+            self.wrapped[id(productions)] = entry
+        return entry[1]
+
+    # returns a copy of production prod calling a profiled rule function
+    def wrap(self, prod):
+        if hasattr(prod, 'callable'):
+            attr = 'callable'
+        else:
+            attr = 'func'
+        func = getattr(prod, attr, None)
+        if not callable(func):
+            # the augmented start production has no rule function
+            return prod
+        stat = self.rules.setdefault(func.__name__, [0, 0.0])
+        clock = time.time
+        profile = self
+        def action(p):
+            depth = len(p.stack) + len(p.slice) - 1
+            if depth > profile.stack:
+                profile.stack = depth
+            nested = profile.nested
+            start = clock()
+            try:
+                return func(p)
+            finally:
+                stat[1] += clock() - start - (profile.nested - nested)
+                stat[0] += 1
+        prod = copy.copy(prod)
+        setattr(prod, attr, action)
+        return prod
+
+    # returns func timed as outside work name, not charged to rule functions
+    def outside(self, name, func):
+        stat = self.outsides.setdefault(name, [0, 0.0])
+        clock = time.time
+        profile = self
+        def work(*args):
+            start = clock()
+            try:
+                return func(*args)
+            finally:
+                seconds = clock() - start
+                stat[1] += seconds
+                stat[0] += 1
+                profile.nested += seconds
+        return work
+
+    # runs parser on content, the tokens of lexer are counted
+    def parse(self, parser, lexer, content, **kw):
+        lexer.input(content)
+        token = lexer.token
+        own = 'token' in lexer.__dict__
+        def count():
+            t = token()
+            if t:
+                self.tokens += 1
+            return t
+        lexer.token = count
+        start = time.time()
+        try:
+            # the input is already set, the parser takes the token method
+            return parser.parse(None, lexer=lexer, **kw)
+        finally:
+            self.time += time.time() - start
+            self.parses += 1
+            if own:
+                lexer.token = token
+            else:
+                del lexer.token
+
+    # returns the profile as a dictionary (json)
+    def data(self):
+        rules = {}
+        for name, (count, seconds) in self.rules.items():
+            if count:
+                rules[name] = {'reductions': count, 'time': seconds}
+        outsides = {}
+        for name, (count, seconds) in self.outsides.items():
+            if count:
+                outsides[name] = {'calls': count, 'time': seconds}
+        return {'rules': rules, 'outside': outsides, 'tokens': self.tokens, 'time': self.time,
+            'tokens_per_second': self.tokens / max(self.time, 1e-9),
+            'stack': self.stack, 'parses': self.parses}
+
+    # adds profile data (of another process) to this profile
+    def merge(self, data):
+        for name, r in data['rules'].items():
+            stat = self.rules.setdefault(name, [0, 0.0])
+            stat[0] += r['reductions']
+            stat[1] += r['time']
+        for name, r in data['outside'].items():
+            stat = self.outsides.setdefault(name, [0, 0.0])
+            stat[0] += r['calls']
+            stat[1] += r['time']
+        self.tokens += data['tokens']
+        self.time += data['time']
+        self.stack = max(self.stack, data['stack'])
+        self.parses += data['parses']
+
+    # forgets all counts, the wrapped productions stay in use
+    def clear(self):
+        for stat in self.rules.values():
+            stat[0] = 0
+            stat[1] = 0.0
+        for stat in self.outsides.values():
+            stat[0] = 0
+            stat[1] = 0.0
+        self.nested = 0.0
+        self.tokens = 0
+        self.time = 0.0
+        self.stack = 0
+        self.parses = 0
+
+    # prints the rule functions sorted by cumulative time
+    def report(self, output=sys.stdout):
+        rules = [(s[1], s[0], n) for n, s in self.rules.items() if s[0]]
+        rules.sort(reverse=True)
+        total = sum([r[0] for r in rules])
+        print >>output, '%-36s %10s %10s %6s %9s' % \
+            ('rule', 'reductions', 'time [s]', '%', 'mean [us]')
+        for seconds, count, name in rules:
+            print >>output, '%-36s %10d %10.3f %6.1f %9.2f' % (name, count,
+                seconds, 100.0 * seconds / max(total, 1e-9),
+                1e6 * seconds / count)
+        # outside work is not part of the actions, no share of their time
+        for name, (count, seconds) in sorted(self.outsides.items()):
+            if count:
+                print >>output, '%-36s %10d %10.3f %6s %9.2f' % \
+                    ('(' + name + ')', count, seconds, '-',
+                    1e6 * seconds / count)
+        print >>output, '%d tokens in %.3f s (%.0f tokens/s), ' \
+            '%d reductions, %.3f s in actions, stack high-water %d' % \
+            (self.tokens, self.time, self.tokens / max(self.time, 1e-9),
+            sum([r[1] for r in rules]), total, self.stack)
+
+    # writes the profile to json file filename
+    def dump(self, filename):
+        f = open(filename, 'w')
+        json.dump(self.data(), f, indent=1, sort_keys=True)
+        f.write('\n')
+        f.close()
@@ -0,0 +1,119 @@
+#! /usr/bin/env python
+# vim:ts=4:expandtab:sw=4:tw=0
+###############################################################################
+# incrcheck.py - checks the incremental mode (-i) of vhd2xml                  #
+#                                                                             #
+# This program is free software; you can redistribute it and/or modify        #
+#   it under the terms of the GNU General Public License as published by      #
+#   the Free Software Foundation; either version 2 of the License, or         #
+#   (at your option) any later version.                                       #
+#   See http://www.gnu.org/licenses/gpl.html for more details.                #
+#                                                                             #
+###############################################################################
+###############################################################################
+# The given files are joined into one source, which is parsed by the
+# incremental parser and then edited at random (lines deleted, inserted from
+# elsewhere in the source, modified or commented out).  The xml of every
+# edited source parsed incrementally has to be equal to the xml of a full
+# parse.  Edits that leave syntax errors are skipped, after an error the
+# full parse drops the rest of the file while the incremental one keeps the
+# unchanged units.
+#
+# $ ./incrcheck.py [-n edits] [-s seed] file(s)
+
+import sys
+import os
+import shutil
+import tempfile
+import random
+import optparse
+from cStringIO import StringIO
+import vhd2xml
+import vhdlast
+
+# returns the xml of file filename parsed by parser and its syntax errors
+def parse(parser, filename):
+    output = StringIO()
+    stderr = sys.stderr
+    sys.stderr = StringIO()
+    try:
+        parser.stream_file(filename, output)
+    finally:
+        sys.stderr = stderr
+    return output.getvalue(), parser.errors
+
+# returns the lines of source edited at random
+def edit(r, lines):
+    result = list(lines)
+    kind = r.choice(('delete', 'insert', 'modify', 'comment'))
+    i = r.randrange(len(result))
+    count = r.randint(1, 40)
+    if kind == 'delete':
+        del result[i:i+count]
+    elif kind == 'insert':
+        j = r.randrange(len(lines))
+        result[i:i] = lines[j:j+count]
+    elif kind == 'comment':
+        result[i:i+count] = ['-- ' + l for l in result[i:i+count]]
+    else:
+        result[i] = result[i].replace('std_logic', 'bit', 1) + ' -- edit'
+    return '%s %d %d' % (kind, i, count), result
+
+if __name__ == "__main__":
+    optparser = optparse.OptionParser(
+        usage='%prog [-n edits] [-s seed] file.vhd ...')
+    optparser.add_option('-n', '--edits', type='int', default=100,
+        help='number of random edits')
+    optparser.add_option('-s', '--seed', type='int', default=1,
+        help='seed of the random edits')
+    (options, args) = optparser.parse_args()
+    if len(args) == 0:
+        print >>sys.stderr, 'syntax: %s file.vhd' % sys.argv[0]
+        sys.exit(1)
+    source = ''
+    for filename in args:
+        f = open(filename)
+        source += f.read() + '\n'
+        f.close()
+    lines = source.split('\n')
+    r = random.Random(options.seed)
+    tmpdir = tempfile.mkdtemp()
+    filename = os.path.join(tmpdir, 'source.vhd')
+    checked = skipped = failed = 0
+    try:
+        for n in range(options.edits):
+            # every edit starts from a cache of the unedited source
+            cachedir = os.path.join(tmpdir, 'cache%d' % n)
+            os.mkdir(cachedir)
+            parser = vhd2xml.IncrementalParser(cachedir)
+            f = open(filename, 'w')
+            f.write(source)
+            f.close()
+            parse(parser, filename)
+            name, edited = edit(r, lines)
+            f = open(filename, 'w')
+            f.write('\n'.join(edited))
+            f.close()
+            try:
+                reference, errors = parse(
+                    vhd2xml.VHDLParser(vhdlast.Document), filename)
+            except Exception:
+                # some broken sources make the grammar actions fail
+                errors = 1
+            if errors:
+                skipped += 1
+                continue
+            checked += 1
+            try:
+                result = parse(parser, filename)[0]
+            except Exception, e:
+                result = '%s: %s' % (e.__class__.__name__, e)
+            if result != reference:
+                failed += 1
+                print '%s: xml differs from the full parse' % name
+    finally:
+        shutil.rmtree(tmpdir)
+    print '%d edits checked, %d skipped (syntax errors), %d failed' % \
+        (checked, skipped, failed)
+    if failed:
+        sys.exit(1)
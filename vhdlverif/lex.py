@@ -24,7 +24,7 @@
 
 __version__ = "2.3"
 
-import re, sys, types
+import re, sys, types, mmap
 
 # Regular expression used to match valid token names
 _is_identifier = re.compile(r'^[a-zA-Z0-9_]+$')
@@ -55,6 +55,15 @@ class LexToken(object):
     def skip(self,n):
         self.lexer.skip(n)
 
+# Token whose value is sliced from the input (lexdata[lexpos:lexend]) when it
+# is first used, see Lexer.lexlazy.  Assigned values are used as usual.
+# Tokens handled by a rule function always get their value.
+class LazyLexToken(LexToken):
+    def __getattr__(self,name):
+        if name != 'value': raise AttributeError, name
+        self.value = self.lexer.lexdata[self.lexpos:self.lexend]
+        return self.value
+
 # -----------------------------------------------------------------------------
 # Lexer class
 #
@@ -90,6 +99,7 @@ class Lexer:
         self.lineno = 1               # Current line number
         self.lexdebug = 0             # Debugging mode
         self.lexoptimize = 0          # Optimized mode
+        self.lexlazy = 0              # Token values are sliced on first use
 
     def clone(self,object=None):
         c = Lexer()
@@ -108,6 +118,7 @@ class Lexer:
         c.lexdebug = self.lexdebug
         c.lineno = self.lineno
         c.lexoptimize = self.lexoptimize
+        c.lexlazy = self.lexlazy
         c.lexliterals = self.lexliterals
         c.lexmodule   = self.lexmodule
 
@@ -197,8 +208,8 @@ class Lexer:
     # input() - Push a new string into the lexer
     # ------------------------------------------------------------
     def input(self,s):
-        if not (isinstance(s,types.StringType) or isinstance(s,types.UnicodeType)):
-            raise ValueError, "Expected a string"
+        if not isinstance(s,(types.StringType,types.UnicodeType,types.BufferType,mmap.mmap)):
+            raise ValueError, "Expected a string, buffer or mmap"
         self.lexdata = s
         self.lexpos = 0
         self.lexlen = len(s)
@@ -268,16 +279,22 @@ class Lexer:
                 # Set last match in lexer so that rules can access it if they want
                 self.lexmatch = m
 
-                # Create a token for return
-                tok = LexToken()
-                tok.value = m.group()
+                i = m.lastindex
+                func,toktype = lexindexfunc[i]
+
+                # Create a token for return (rule functions get the value)
+                if self.lexlazy and not func:
+                    tok = LazyLexToken()
+                    tok.lexend = m.end()
+                else:
+                    tok = LexToken()
+                    tok.value = m.group()
+                tok.type = toktype
                 tok.lineno = self.lineno
                 tok.lexpos = lexpos
                 tok.lexer = self
 
                 lexpos = m.end()
-                i = m.lastindex
-                func,tok.type = lexindexfunc[i]
                 self.lexpos = lexpos
 
                 if not func:
@@ -319,8 +336,12 @@ class Lexer:
         
                 # No match. Call t_error() if defined.
                 if self.lexerrorf:
-                    tok = LexToken()
-                    tok.value = self.lexdata[lexpos:]
+                    if self.lexlazy:
+                        tok = LazyLexToken()
+                        tok.lexend = lexlen
+                    else:
+                        tok = LexToken()
+                        tok.value = self.lexdata[lexpos:]
                     tok.lineno = self.lineno
                     tok.type = "error"
                     tok.lexer = self
@@ -0,0 +1,84 @@
+#! /usr/bin/env python
+# vim:ts=4:expandtab:sw=4:tw=0
+###############################################################################
+# lexbench.py - compares the lexer engines of vhd2xml                         #
+#                                                                             #
+# This program is free software; you can redistribute it and/or modify        #
+#   it under the terms of the GNU General Public License as published by      #
+#   the Free Software Foundation; either version 2 of the License, or         #
+#   (at your option) any later version.                                       #
+#   See http://www.gnu.org/licenses/gpl.html for more details.                #
+#                                                                             #
+###############################################################################
+###############################################################################
+# Every engine lexes the given files (repeat times, the best time counts), the
+# token streams of the engines are checked to be identical.
+#
+# $ ./lexbench.py [-n repeat] file(s)
+
+import sys
+import time
+import optparse
+import vhd2xml
+
+engines = ('ply', 'scan')
+
+# returns the token stream of content as a list of tuples
+def token_list(engine, filename, content):
+    lexer = vhd2xml.new_lexer(filename, engine)
+    lexer.input(content)
+    token = lexer.token
+    result = []
+    while True:
+        t = token()
+        if not t:
+            return result
+        result.append((t.type, t.value, t.lineno, t.lexpos))
+
+# returns the best time of lexing content repeat times and the token count
+def time_lexer(engine, filename, content, repeat):
+    best = None
+    for i in range(repeat):
+        lexer = vhd2xml.new_lexer(filename, engine)
+        lexer.input(content)
+        token = lexer.token
+        count = 0
+        start = time.time()
+        while token():
+            count += 1
+        elapsed = time.time() - start
+        if best == None or elapsed < best:
+            best = elapsed
+    return best, count
+
+if __name__ == "__main__":
+    optparser = optparse.OptionParser(usage='%prog [-n repeat] file.vhd ...')
+    optparser.add_option('-n', '--repeat', type='int', default=3,
+        help='runs per engine and file, the best one counts')
+    (options, args) = optparser.parse_args()
+    if len(args) == 0:
+        print >>sys.stderr, 'syntax: %s file.vhd' % sys.argv[0]
+        sys.exit(1)
+    totals = dict([(e, [0.0, 0]) for e in engines])
+    for filename in args:
+        f = open(filename)
+        content = f.read()
+        f.close()
+        reference = token_list(engines[0], filename, content)
+        for engine in engines[1:]:
+            if token_list(engine, filename, content) != reference:
+                print >>sys.stderr, '%s: token stream of %s differs' % \
+                    (filename, engine)
+                sys.exit(1)
+        for engine in engines:
+            elapsed, count = time_lexer(engine, filename, content,
+                options.repeat)
+            totals[engine][0] += elapsed
+            totals[engine][1] += count
+    base = totals[engines[0]][0]
+    print '%-6s %10s %10s %12s %8s' % \
+        ('engine', 'tokens', 'time [s]', 'tokens/s', 'speedup')
+    for engine in engines:
+        elapsed, count = totals[engine]
+        print '%-6s %10d %10.3f %12.0f %7.2fx' % (engine, count, elapsed,
+            count / max(elapsed, 1e-9), base / max(elapsed, 1e-9))
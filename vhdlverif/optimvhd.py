@@ -15,9 +15,14 @@
 
 import sys
 import os # for OS functions
+import time
+import optparse
 from xml.dom import minidom
 from xml.dom.minidom import parse, parseString, getDOMImplementation
 import re
+import events
+from vhdlast import clone_tree, element_census, elements_by_tag_name, \
+    elements_by_tag_names, first_element_by_tag_name, load_dom, toprettyxml
 
 # output file
 DOMimplement = None
@@ -28,214 +33,459 @@ top_element = None
 # Optimize functions                                                          #
 ###############################################################################
 
-# main optimize function calls all other
+# split passes in the order of the original optimize functions: name, tag of
+# the declarations split into one element per identifier, title of the pass
+# and label of the printed identifiers
+splitPasses = [
+    ('optimSignalDecl', 'signalDeclaration', 'signal declaration', 'signal'),
+    ('optimVarDecl', 'variableDeclaration', 'variable declaration',
+        'variable'),
+    ('optimFileDecl', 'fileDeclaration', 'file declaration', 'file'),
+    ('optimConstDecl', 'constantDeclaration', 'constant declaration',
+        'constant'),
+    ('optimSignalPar', 'signalParameter', 'signal parameter', 'signal'),
+    ('optimVarPar', 'variableParameter', 'variable parameter', 'variable'),
+    ('optimConstPar', 'constantParameter', 'constant parameter', 'constant'),
+    ('optimIdPar', 'idParameter', 'id parameter', 'id'),
+]
+
+# switches pass name on or off
+def enablePass(name, enabled=True):
+    passManager.enable(name, enabled)
+
+# main optimize function runs all enabled passes
 def optimizeXML():
-    #optimGenericParams()
-    optimSignalDecl()
-    optimVarDecl()
-    optimFileDecl()
-    optimConstDecl()
-    optimSignalPar()
-    optimVarPar()
-    optimConstPar()
-    optimIdPar()
+    passManager.run(top_element)
+
+# runs the pass name on its own
+def runPass(name):
+    passManager.run(top_element, [name])
+
+# replaces declaration maintag of several identifiers by one declaration per
+# identifier (attribute id, without the ids element), the split declarations
+# share the other children (type, value) of maintag
+def splitIds(maintag, label):
+    idstag = first_element_by_tag_name(maintag, 'ids')
+    shared = [c for c in maintag.childNodes if c is not idstag]
+    for c in shared:
+        maintag.removeChild(c)
+    subclones = []
+    debugOn = events.enabled(events.DEBUG)
+    for idtag in idstag.childNodes:
+        subclone = maintag.cloneNode(False)
+        id = idtag.getAttribute('id')
+        if debugOn:
+            events.debug('optimvhd.split', "- " + label + ": " + id,
+                kind=label, id=id)
+        subclone.setAttribute('id', id)
+        for c in shared:
+            shareChild(subclone, c)
+        subclones.append(subclone)
+    replaceByNodes(maintag, subclones)
+    events.count('optimvhd.split.' + label, len(subclones))
+
+# replaces node old by the nodes in one list operation (inserting the nodes
+# one by one searches the children of the parent for every node)
+def replaceByNodes(old, nodes):
+    parent = old.parentNode
+    prev = old.previousSibling
+    for node in nodes:
+        node.parentNode = parent
+        node.previousSibling = prev
+        if prev != None:
+            prev.nextSibling = node
+        prev = node
+    if prev != None:
+        prev.nextSibling = old.nextSibling
+    if old.nextSibling != None:
+        old.nextSibling.previousSibling = prev
+    i = parent.childNodes.index(old)
+    parent.childNodes[i:i+1] = nodes
+    old.parentNode = old.previousSibling = old.nextSibling = None
+
+###############################################################################
+# Shared subtrees - the children of a split declaration are not copied for
+# every identifier: all split declarations list the same child nodes.  The
+# parentNode (and the sibling links) of a shared node are those of its first
+# declaration, node.sharedBy lists all its declarations.  The children of
+# split declarations are read-only after splitIds: no pass adds, removes or
+# replaces them.  A pass may change the nodes below them, the change is seen
+# by all declarations of the split (they were one declaration).
+
+# appends node to the children of declaration decl, shared if node already
+# has a parent
+def shareChild(decl, node):
+    if node.parentNode == None:
+        decl.appendChild(node)
+        node.sharedBy = [decl]
+    else:
+        decl.childNodes.append(node)
+        node.sharedBy.append(decl)
 
 ###############################################################################
 # replaces generic parameters
 def optimGenericParams():
-    print "replacing generic parameters"
-    for entityTag in top_element.getElementsByTagName('entity'):
-        idEntity = entityTag.getAttribute('id')
-        genericTag = entityTag.getElementsByTagName('generic').item(0)
-        for paramTag in genericTag.childNodes:
-            idParam = paramTag.getAttribute('id')
-            print "- parameter id: " + idParam
-            valueTag = paramTag.getElementsByTagName('value').item(0)
-            expTag = valueTag.firstChild
-            portTag = entityTag.getElementsByTagName('ports').item(0)
-            for objTag in portTag.getElementsByTagName('objectExpression'):
+    events.info('optimvhd.pass', "replacing generic parameters",
+        name='optimGenericParams')
+    for entityTag in elements_by_tag_name(top_element, 'entity'):
+        genericTag = first_element_by_tag_name(entityTag, 'generic')
+        replaceGenerics(top_element, entityTag, genericTag)
+
+# replaces the parameters of generic genericTag of entity entityTag by their
+# values in the ports of the entity and in its architectures (found in top),
+# returns the changed subtrees (ports and architectures)
+def replaceGenerics(top, entityTag, genericTag):
+    idEntity = entityTag.getAttribute('id')
+    subtrees = []
+    portTag = first_element_by_tag_name(entityTag, 'ports')
+    if portTag != None:
+        subtrees.append(portTag)
+    for archTag in elements_by_tag_name(top, 'architecture'):
+        if idEntity == archTag.getAttribute('entity'):
+            subtrees.append(archTag)
+    for paramTag in genericTag.childNodes:
+        idParam = paramTag.getAttribute('id')
+        events.debug('optimvhd.generic', "- parameter id: " + idParam,
+            id=idParam)
+        valueTag = first_element_by_tag_name(paramTag, 'value')
+        if valueTag == None:
+            # no default value to replace the parameter by
+            continue
+        expTag = valueTag.firstChild
+        for subtree in subtrees:
+            # a shared subtree is found once per declaration, it is
+            # replaced for all of them at once; the objectExpression is
+            # below the type or value (never a child of the declaration),
+            # its parentNode is its only parent
+            seen = set()
+            for objTag in elements_by_tag_name(subtree, 'objectExpression'):
+                if id(objTag) in seen:
+                    continue
+                seen.add(id(objTag))
                 if idParam == objTag.getAttribute('id'):
-                    print "-- object id: " + objTag.getAttribute('id')
-                    clone = expTag.cloneNode(True)
+                    events.debug('optimvhd.generic.object',
+                        "-- object id: " + idParam, id=idParam)
+                    events.count('optimvhd.generic.objects')
+                    clone = clone_tree(expTag)
                     objTag.parentNode.insertBefore(clone, objTag)
                     objTag.parentNode.removeChild(objTag)
-            for archTag in top_element.getElementsByTagName('architecture'):
-                if idEntity == archTag.getAttribute('entity'):
-                    for objTag in archTag. \
-                        getElementsByTagName('objectExpression'):
-                        if idParam == objTag.getAttribute('id'):
-                            print "-- object id: " + objTag.getAttribute('id')
-                            clone = expTag.cloneNode(True)
-                            objTag.parentNode.insertBefore(clone, objTag)
-                            objTag.parentNode.removeChild(objTag)
-        # component generic not yet supported
+    # component generic not yet supported
+    return subtrees
+
+###############################################################################
+# Pass manager - a pass names the tags of the elements it runs on (kinds) and
+# of those it changes, and the passes it depends on.  The manager orders the
+# passes by their dependencies and collects the elements of all their kinds
+# in one walk of the tree, which also counts the nodes.  A pass without
+# elements is skipped.  A pass returns the subtrees it changed (dirty): the
+# elements a later pass runs on are collected again only there, a dirtyOnly
+# pass runs only on the dirty subtrees of the passes it depends on.  Every
+# pass records its wall time and the node count before and after it.
+
+# Optimize pass class
+class OptimPass(object):
+    "Optimize pass on the elements of some tags"
+
+    def __init__(self, name, title, kinds, changes=(), requires=(),
+        dirtyOnly=False, enabled=True):
+        self.name = name
+        self.title = title
+        # tags of the elements the pass runs on and of those it changes
+        self.kinds = tuple(kinds)
+        self.changes = tuple(changes)
+        # names of the passes run before (if they run at all)
+        self.requires = tuple(requires)
+        self.dirtyOnly = dirtyOnly
+        self.enabled = enabled
+
+    # returns the subtrees the pass may change when run on elements
+    def scope(self, top, elements):
+        return outermost([e.parentNode for e in elements])
+
+    # runs the pass on elements, returns the changed subtrees
+    def run(self, top, elements):
+        return []
+
+# Split pass class
+class SplitPass(OptimPass):
+    "Splits declarations of several identifiers, one per identifier"
+
+    def __init__(self, name, tag, title, label):
+        OptimPass.__init__(self, name, title, (tag,), (tag,))
+        self.label = label
+
+    def run(self, top, elements):
+        dirty = [e.parentNode for e in elements]
+        for maintag in elements:
+            splitIds(maintag, self.label)
+        return dirty
+
+# Generic parameters pass class
+class GenericParamsPass(OptimPass):
+    "Replaces the generic parameters of entities by their values"
+
+    def __init__(self):
+        OptimPass.__init__(self, 'optimGenericParams', 'generic parameters',
+            ('generic',), ('objectExpression',), enabled=False)
+
+    # the architectures of an entity are anywhere in the tree
+    def scope(self, top, elements):
+        return [top]
+
+    def run(self, top, elements):
+        dirty = []
+        for genericTag in elements:
+            # component generic not yet supported
+            if genericTag.parentNode.tagName == 'entity':
+                dirty.extend(replaceGenerics(top, genericTag.parentNode,
+                    genericTag))
+        return dirty
+
+# returns the nodes (once) that are not inside another one of them
+def outermost(nodes):
+    keys = set([id(n) for n in nodes])
+    result = []
+    done = set()
+    for n in nodes:
+        if n == None or id(n) in done:
+            continue
+        done.add(id(n))
+        p = n.parentNode
+        while p != None and id(p) not in keys:
+            p = p.parentNode
+        if p == None:
+            result.append(n)
+    return result
+
+# returns the number of elements of subtree e
+def countNodes(e):
+    return element_census(e, ())[0] + 1
+
+# Pass manager class
+class PassManager(object):
+    "Runs the optimize passes in dependency order"
+
+    def __init__(self):
+        self.passes = []
+        # statistics of the last run, one dictionary per pass
+        self.stats = []
+
+    # registers optimize pass p, returns it
+    def register(self, p):
+        if [q for q in self.passes if q.name == p.name]:
+            raise KeyError('optimize pass registered twice: ' + p.name)
+        self.passes.append(p)
+        return p
+
+    # returns the pass name
+    def getPass(self, name):
+        for p in self.passes:
+            if p.name == name:
+                return p
+        raise KeyError('unknown optimize pass: ' + name)
+
+    # switches pass name on or off
+    def enable(self, name, enabled=True):
+        self.getPass(name).enabled = enabled
+
+    # returns the passes names (default: the enabled ones) ordered by their
+    # dependencies, else in the order of registration
+    def order(self, names=None):
+        if names == None:
+            selected = [p for p in self.passes if p.enabled]
+        else:
+            selected = [self.getPass(name) for name in names]
+        names = set()
+        for p in selected:
+            names.add(p.name)
+            for name in p.requires:
+                self.getPass(name)
+        result = []
+        done = set()
+        while len(result) < len(selected):
+            ready = [p for p in selected if p.name not in done and \
+                not [r for r in p.requires if r in names and r not in done]]
+            if not ready:
+                raise ValueError('optimize pass dependency cycle: ' + \
+                    ' '.join([p.name for p in selected if p.name not in done]))
+            result.append(ready[0])
+            done.add(ready[0].name)
+        return result
+
+    # runs the passes names (default: the enabled ones) on tree top
+    def run(self, top, names=None):
+        passes = self.order(names)
+        self.stats = []
+        kinds = set()
+        for p in passes:
+            if not p.dirtyOnly:
+                kinds.update(p.kinds)
+        nodes, found = element_census(top, kinds)
+        nodes += 1
+        # tag -> elements of the tag
+        byKind = {}
+        for e in found:
+            byKind.setdefault(e.tagName, []).append(e)
+        # pass name -> changed subtrees
+        dirty = {}
+        for i in range(len(passes)):
+            p = passes[i]
+            if p.dirtyOnly:
+                elements = []
+                for r in outermost([r for q in p.requires \
+                    for r in dirty.get(q, [])]):
+                    if r.tagName in p.kinds:
+                        elements.append(r)
+                    elements.extend(elements_by_tag_names(r, p.kinds))
+            else:
+                elements = [e for tag in p.kinds for e in byKind.get(tag, [])]
+            # elements removed by a pass before
+            elements = [e for e in elements if e.parentNode != None]
+            stat = {'pass': p.name, 'elements': len(elements), 'time': 0.0,
+                'before': nodes, 'after': nodes}
+            self.stats.append(stat)
+            if not elements:
+                stat['status'] = 'skipped'
+                events.debug('optimvhd.pass.stats', **stat)
+                continue
+            stat['status'] = 'run'
+            events.info('optimvhd.pass', "optimizing " + p.title,
+                name=p.name)
+            scope = p.scope(top, elements)
+            before = sum([countNodes(e) for e in scope])
+            start = time.time()
+            changed = p.run(top, elements)
+            stat['time'] = time.time() - start
+            nodes += sum([countNodes(e) for e in scope]) - before
+            stat['after'] = nodes
+            events.debug('optimvhd.pass.stats', **stat)
+            dirty[p.name] = outermost(changed)
+            # elements of the changed kinds the later passes run on
+            later = set()
+            for q in passes[i+1:]:
+                if not q.dirtyOnly:
+                    later.update([k for k in q.kinds if k in p.changes])
+            if not later:
+                continue
+            known = set([id(e) for k in later for e in byKind.get(k, [])])
+            for r in dirty[p.name]:
+                for e in [r] + elements_by_tag_names(r, later):
+                    if e.tagName in later and id(e) not in known:
+                        known.add(id(e))
+                        byKind.setdefault(e.tagName, []).append(e)
+
+    # prints the statistics of the last run
+    def report(self, output=sys.stdout):
+        print >>output, '%-20s %8s %9s %10s %10s %10s' % ('pass', 'status',
+            'elements', 'time [s]', 'nodes', 'after')
+        for s in self.stats:
+            print >>output, '%-20s %8s %9d %10.4f %10d %10d' % (s['pass'],
+                s['status'], s['elements'], s['time'], s['before'],
+                s['after'])
+
+# the optimize passes run by optimizeXML
+passManager = PassManager()
+passManager.register(GenericParamsPass())
+for name, tag, title, label in splitPasses:
+    passManager.register(SplitPass(name, tag, title, label))
 
 ###############################################################################
 # optimizes multiple signal declaration identifiers
 def optimSignalDecl():
-    print "optimizing signal declaration"
-    for maintag in top_element.getElementsByTagName('signalDeclaration'):
-        mainclone = maintag.cloneNode(True)
-        mainclone.removeChild(mainclone.getElementsByTagName('ids').item(0))
-        idstag = maintag.getElementsByTagName('ids').item(0)
-        for idtag in idstag.childNodes:
-            subclone = mainclone.cloneNode(True)
-            id = idtag.getAttribute('id')
-            print "- signal: " + id
-            subclone.setAttribute('id', id)
-            maintag.parentNode.insertBefore(subclone, maintag)
-        maintag.parentNode.removeChild(maintag)
-
+    runPass('optimSignalDecl')
 
 # optimizes multiple variable declaration identifiers
 def optimVarDecl():
-    print "optimizing variable declaration"
-    for maintag in top_element.getElementsByTagName('variableDeclaration'):
-        mainclone = maintag.cloneNode(True)
-        mainclone.removeChild(mainclone.getElementsByTagName('ids').item(0))
-        idstag = maintag.getElementsByTagName('ids').item(0)
-        for idtag in idstag.childNodes:
-            subclone = mainclone.cloneNode(True)
-            id = idtag.getAttribute('id')
-            print "- variable: " + id
-            subclone.setAttribute('id', id)
-            maintag.parentNode.insertBefore(subclone, maintag)
-        maintag.parentNode.removeChild(maintag)
+    runPass('optimVarDecl')
 
 # optimizes multiple constant declaration identifiers
 def optimConstDecl():
-    print "optimizing constant declaration"
-    for maintag in top_element.getElementsByTagName('constantDeclaration'):
-        mainclone = maintag.cloneNode(True)
-        mainclone.removeChild(mainclone.getElementsByTagName('ids').item(0))
-        idstag = maintag.getElementsByTagName('ids').item(0)
-        for idtag in idstag.childNodes:
-            subclone = mainclone.cloneNode(True)
-            id = idtag.getAttribute('id')
-            print "- constant: " + id
-            subclone.setAttribute('id', id)
-            maintag.parentNode.insertBefore(subclone, maintag)
-        maintag.parentNode.removeChild(maintag)
+    runPass('optimConstDecl')
 
 # optimizes multiple file declaration identifiers
 def optimFileDecl():
-    print "optimizing file declaration"
-    for maintag in top_element.getElementsByTagName('fileDeclaration'):
-        mainclone = maintag.cloneNode(True)
-        mainclone.removeChild(mainclone.getElementsByTagName('ids').item(0))
-        idstag = maintag.getElementsByTagName('ids').item(0)
-        for idtag in idstag.childNodes:
-            subclone = mainclone.cloneNode(True)
-            id = idtag.getAttribute('id')
-            print "- file: " + id
-            subclone.setAttribute('id', id)
-            maintag.parentNode.insertBefore(subclone, maintag)
-        maintag.parentNode.removeChild(maintag)
+    runPass('optimFileDecl')
 
 ###############################################################################
 # optimizes multiple signal parameter identifiers
 def optimSignalPar():
-    print "optimizing signal parameter"
-    for maintag in top_element.getElementsByTagName('signalParameter'):
-        mainclone = maintag.cloneNode(True)
-        mainclone.removeChild(mainclone.getElementsByTagName('ids').item(0))
-        idstag = maintag.getElementsByTagName('ids').item(0)
-        for idtag in idstag.childNodes:
-            subclone = mainclone.cloneNode(True)
-            id = idtag.getAttribute('id')
-            print "- signal: " + id
-            subclone.setAttribute('id', id)
-            maintag.parentNode.insertBefore(subclone, maintag)
-        maintag.parentNode.removeChild(maintag)
-
+    runPass('optimSignalPar')
 
 # optimizes multiple variable parameter identifiers
 def optimVarPar():
-    print "optimizing variable parameter"
-    for maintag in top_element.getElementsByTagName('variableParameter'):
-        mainclone = maintag.cloneNode(True)
-        mainclone.removeChild(mainclone.getElementsByTagName('ids').item(0))
-        idstag = maintag.getElementsByTagName('ids').item(0)
-        for idtag in idstag.childNodes:
-            subclone = mainclone.cloneNode(True)
-            id = idtag.getAttribute('id')
-            print "- variable: " + id
-            subclone.setAttribute('id', id)
-            maintag.parentNode.insertBefore(subclone, maintag)
-        maintag.parentNode.removeChild(maintag)
+    runPass('optimVarPar')
 
 # optimizes multiple constant parameter identifiers
 def optimConstPar():
-    print "optimizing constant parameter"
-    for maintag in top_element.getElementsByTagName('constantParameter'):
-        mainclone = maintag.cloneNode(True)
-        mainclone.removeChild(mainclone.getElementsByTagName('ids').item(0))
-        idstag = maintag.getElementsByTagName('ids').item(0)
-        for idtag in idstag.childNodes:
-            subclone = mainclone.cloneNode(True)
-            id = idtag.getAttribute('id')
-            print "- constant: " + id
-            subclone.setAttribute('id', id)
-            maintag.parentNode.insertBefore(subclone, maintag)
-        maintag.parentNode.removeChild(maintag)
+    runPass('optimConstPar')
 
 # optimizes multiple id parameter identifiers
 def optimIdPar():
-    print "optimizing id parameter"
-    for maintag in top_element.getElementsByTagName('idParameter'):
-        mainclone = maintag.cloneNode(True)
-        mainclone.removeChild(mainclone.getElementsByTagName('ids').item(0))
-        idstag = maintag.getElementsByTagName('ids').item(0)
-        for idtag in idstag.childNodes:
-            subclone = mainclone.cloneNode(True)
-            id = idtag.getAttribute('id')
-            print "- id: " + id
-            subclone.setAttribute('id', id)
-            maintag.parentNode.insertBefore(subclone, maintag)
-        maintag.parentNode.removeChild(maintag)
+    runPass('optimIdPar')
 
 
 ###############################################################################
 # Basic functions                                                             #
 ###############################################################################
 
-# delete white spaces from file
-
-def deleteWS(file):
-    txt = open(file, 'r').read()
-    r = re.compile('\n', re.MULTILINE)
-    txt = r.sub('', txt)
-    r = re.compile('\t')
-    txt = r.sub('', txt)
-    r = re.compile('>( )*<')
-    txt = r.sub('><', txt)
-    return txt
-    
 # parse file in new tree
 def parseFile(file):
-    dom = minidom.parseString(deleteWS(file))
-    top = dom.getElementsByTagName('vhdl').item(0)
+    dom = load_dom(file)
+    top = dom.documentElement
     while top.hasChildNodes():
         top_element.appendChild(top.firstChild)
 
+# optimizes file_arg into a new tree, writes it to file_arg with .xml
+# replaced by .optim.xml and returns the new file name
+def optimizeFile(file_arg):
+    global DOMimplement, xml_document, top_element
+    DOMimplement = getDOMImplementation()
+    xml_document = DOMimplement.createDocument(None, \
+        "optimalVHDL", None)
+    top_element = xml_document.documentElement
+    parseFile(file_arg)
+    optimizeXML()
+    filename = file_arg[:-4]+'.optim.xml'
+    xml_file = open(filename, 'w')
+    xml_file.write(toprettyxml(xml_document, '  '))
+    xml_file.close()
+    return filename
+
 if __name__ == "__main__":
-    if len(sys.argv)>1:
-        for file_arg in sys.argv[1:]:
+    optparser = optparse.OptionParser(
+        usage='%prog [-d PASS] [-e PASS] [-s] file.vhd.xml ...')
+    optparser.add_option('-d', '--disable', action='append', default=[],
+        metavar='PASS', help='do not run optimize pass PASS (repeatable)')
+    optparser.add_option('-e', '--enable', action='append', default=[],
+        metavar='PASS', help='run optimize pass PASS (repeatable)')
+    optparser.add_option('-l', '--list', action='store_true', default=False,
+        help='list the optimize passes')
+    optparser.add_option('-s', '--stats', action='store_true', default=False,
+        help='print time and node counts of every pass')
+    events.add_options(optparser)
+    (options, args) = optparser.parse_args()
+    events.configure_options(options)
+    if options.list:
+        for p in passManager.passes:
+            print '%-20s %-4s %s (%s)%s' % (p.name, p.enabled and 'on' or 'off',
+                p.title, ', '.join(p.kinds),
+                p.requires and ' after ' + ', '.join(p.requires) or '')
+        sys.exit(0)
+    for names, enabled in ((options.disable, False), (options.enable, True)):
+        for name in names:
+            try:
+                enablePass(name, enabled)
+            except KeyError, e:
+                optparser.error(e.args[0])
+    if len(args)>0:
+        for file_arg in args:
             if file_arg.endswith('.xml'):
                 print file_arg
-                DOMimplement = getDOMImplementation()
-                xml_document = DOMimplement.createDocument(None, \
-                    "optimalVHDL", None)
-                top_element = xml_document.documentElement
-                parseFile(file_arg)
-                optimizeXML()
-                filename = file_arg[:-4]+'.optim.xml'
-                xml_file = open(filename, 'w')
-                xml_file.write(xml_document.toprettyxml('  '))
-                xml_file.close()
+                optimizeFile(file_arg)
+                if options.stats:
+                    passManager.report()
                 print '------------ done'
             else:
                 print file_arg + ' is not valid name file'
     else:
         print >>sys.stderr, 'syntax: %s file.vhd.xml' % sys.argv[0]
-
@@ -0,0 +1,357 @@
+#! /usr/bin/env python
+# vim:ts=4:expandtab:sw=4:tw=0
+###############################################################################
+# pipebench.py - benchmark of the vhd2xml -> optimvhd -> analysevhd pipeline  #
+#                                                                             #
+# This program is free software; you can redistribute it and/or modify        #
+#   it under the terms of the GNU General Public License as published by      #
+#   the Free Software Foundation; either version 2 of the License, or         #
+#   (at your option) any later version.                                       #
+#   See http://www.gnu.org/licenses/gpl.html for more details.                #
+#                                                                             #
+###############################################################################
+###############################################################################
+# Every file of the corpus goes through the whole pipeline in a fresh process,
+# each phase is timed on its own:
+#
+#   vhd2xml.lex                  lexing (token stream only)
+#   vhd2xml.parse                parsing into the minidom document
+#   vhd2xml.write                writing the xml of the design units
+#   optimvhd.load                loading the xml file
+#   optimvhd.optimize            the optimize passes (one traversal)
+#   optimvhd.write               writing the optimized xml file
+#   analysevhd.load              loading the optimized file (VHDLfile)
+#   analysevhd.checkDependency   dependency analysis of the main architecture
+#   vhdldot.parse                vhdl-dot run without the rendering
+#   vhdldot.render               vhdl-dot rendering (generateDotCode)
+#
+# vhd2xml.parse and vhd2xml.write are the conversion of the tool (default
+# backend, every unit written as soon as it is parsed), split by the time of
+# the writer as in the -m manifest; the RSS growth is counted to the parse.
+# A phase that raises is not timed, it is recorded as failed for the file
+# and the later phases of the file are not run.
+#
+# The RSS of a phase is the growth of the peak RSS (high-water mark) of the
+# process during the phase, the largest one of all files; the peak RSS of the
+# run is the largest peak of a file.  Throughput is VHDL source bytes per
+# second.  With repeat > 1 the best run counts.  The result (json) can be
+# stored and used as baseline of a later run on the same files, phases slower
+# than the baseline by more than the tolerance or failed on files where they
+# did not fail in the baseline are reported and make the exit status 1.
+#
+# $ ./pipebench.py [-n repeat] [-o result.json] [-b baseline.json]
+#       [-t tolerance] [file(s)]
+# (default corpus: ../example/vhdl/*.vhd and examples/*.vhd)
+
+import sys
+import os # for OS functions
+import glob
+import json
+import time
+import shutil
+import tempfile
+import runpy
+import resource
+import traceback
+import optparse
+import multiprocessing
+
+here = os.path.dirname(os.path.abspath(__file__))
+vhdldot_dir = os.path.join(here, '..', 'vhdl-dot')
+
+# default corpus
+corpus = sorted(glob.glob(os.path.join(here, '..', 'example', 'vhdl', '*.vhd'))
+    + glob.glob(os.path.join(here, 'examples', '*.vhd')))
+
+phases = ['vhd2xml.lex', 'vhd2xml.parse', 'vhd2xml.write',
+    'optimvhd.load', 'optimvhd.optimize', 'optimvhd.write',
+    'analysevhd.load', 'analysevhd.checkDependency', 'vhdldot.parse',
+    'vhdldot.render']
+
+# peak RSS of the process (KB)
+def maxrss():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+# Phase timer class
+class PhaseTimer(object):
+    "Times the phases of one pipeline run"
+
+    def __init__(self):
+        # phase -> (seconds, growth of the peak RSS)
+        self.results = {}
+        # phase -> error of the failed phase
+        self.failures = {}
+        # phase being run
+        self.phase = None
+
+    # runs func(*args) as phase, returns its result
+    def run(self, phase, func, *args):
+        self.phase = phase
+        rss = maxrss()
+        start = time.time()
+        result = func(*args)
+        self.add(phase, time.time() - start, maxrss() - rss)
+        return result
+
+    def add(self, phase, seconds, rss):
+        self.results[phase] = (seconds, rss)
+
+    # records the exception being handled as failure of the phase being run,
+    # the phase is not timed
+    def fail(self):
+        phase = self.phase or 'pipeline'
+        self.failures[phase] = traceback.format_exc().splitlines()[-1]
+        if self.results.has_key(phase):
+            del self.results[phase]
+
+# runs the vhd2xml phases, returns the xml file
+def run_vhd2xml(timer, filename, workdir):
+    import vhd2xml
+    f = open(filename)
+    content = f.read()
+    f.close()
+    def lex():
+        lexer = vhd2xml.new_lexer(filename)
+        lexer.input(content)
+        token = lexer.token
+        while token():
+            pass
+    timer.run('vhd2xml.lex', lex)
+    # as convert_file: the parser of the tool writes every unit as soon as
+    # it is parsed, the time of the writer is the write phase
+    parser = vhd2xml.new_parser()
+    xml_name = os.path.join(workdir, os.path.basename(filename) + '.xml')
+    timer.phase = 'vhd2xml.parse'
+    rss = maxrss()
+    start = time.time()
+    output = open(xml_name, 'w')
+    writer = parser.stream_string(content, output, filename)
+    output.close()
+    elapsed = time.time() - start
+    timer.add('vhd2xml.parse', elapsed - writer.time, maxrss() - rss)
+    timer.add('vhd2xml.write', writer.time, 0)
+    return xml_name
+
+# runs the optimvhd phases, returns the optimized xml file
+def run_optimvhd(timer, xml_name):
+    import optimvhd
+    def load():
+        optimvhd.DOMimplement = optimvhd.getDOMImplementation()
+        optimvhd.xml_document = optimvhd.DOMimplement.createDocument(None,
+            "optimalVHDL", None)
+        optimvhd.top_element = optimvhd.xml_document.documentElement
+        optimvhd.parseFile(xml_name)
+    timer.run('optimvhd.load', load)
+    timer.run('optimvhd.optimize', optimvhd.optimizeXML)
+    optim_name = xml_name[:-4] + '.optim.xml'
+    def write():
+        output = open(optim_name, 'w')
+        output.write(optimvhd.toprettyxml(optimvhd.xml_document, '  '))
+        output.close()
+    timer.run('optimvhd.write', write)
+    return optim_name
+
+# runs the analysevhd phases
+def run_analysevhd(timer, optim_name):
+    import analysevhd
+    from elements import VHDLdesign
+    def load():
+        design = VHDLdesign('myDesign')
+        analysevhd.loadFile(design, optim_name)
+        return design
+    design = timer.run('analysevhd.load', load)
+    firstFile = design.getFileList()[0]
+    if firstFile.getArchMap():
+        design.setMainFile(firstFile)
+        design.setMainArch(firstFile.getArchMap().values()[0])
+        timer.run('analysevhd.checkDependency', design.checkDependency)
+
+# runs vhdl-dot on the file, the rendering is timed on its own
+def run_vhdldot(timer, filename, workdir):
+    if vhdldot_dir not in sys.path:
+        sys.path.insert(0, vhdldot_dir)
+    import componentLibrary
+    render = componentLibrary.dotRenderer.generateDotCode
+    # seconds and peak RSS growth of the rendering
+    spent = [0.0, 0]
+    def timed(*args):
+        timer.phase = 'vhdldot.render'
+        rss = maxrss()
+        start = time.time()
+        result = render(*args)
+        spent[0] += time.time() - start
+        spent[1] += maxrss() - rss
+        timer.phase = 'vhdldot.parse'
+        return result
+    componentLibrary.dotRenderer.generateDotCode = timed
+    name = os.path.join(workdir, os.path.basename(filename))
+    shutil.copy(filename, name)
+    script = os.path.join(vhdldot_dir, 'vhdl-dot.py')
+    cwd, argv = os.getcwd(), sys.argv
+    os.chdir(workdir)
+    sys.argv = [script, os.path.basename(name)]
+    timer.phase = 'vhdldot.parse'
+    rss = maxrss()
+    start = time.time()
+    try:
+        # the script finds its grammar in sys.modules['__main__']
+        runpy.run_path(script, run_name='__main__')
+    finally:
+        os.chdir(cwd)
+        sys.argv = argv
+        componentLibrary.dotRenderer.generateDotCode = render
+    elapsed = time.time() - start
+    rss = maxrss() - rss
+    timer.add('vhdldot.parse', elapsed - spent[0], rss - spent[1])
+    timer.add('vhdldot.render', spent[0], spent[1])
+
+# runs the whole pipeline on filename (in a pool process), returns the
+# results of the phases, the failed phases and the peak RSS of the run (an
+# exception is not passed to the main process, it may not be unpickled)
+def run_pipeline(filename):
+    workdir = tempfile.mkdtemp(prefix='pipebench-')
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    timer = PhaseTimer()
+    try:
+        xml_name = run_vhd2xml(timer, filename, workdir)
+        optim_name = run_optimvhd(timer, xml_name)
+        run_analysevhd(timer, optim_name)
+        run_vhdldot(timer, filename, workdir)
+    except Exception:
+        # the later phases are not run
+        timer.fail()
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+        shutil.rmtree(workdir, True)
+    return timer.results, timer.failures, maxrss()
+
+# runs the corpus repeat times, returns the result (json)
+def benchmark(files, repeat=1):
+    total = {}
+    size = 0
+    peak = 0
+    # phase -> file name -> error
+    failed = {}
+    for filename in files:
+        size += os.path.getsize(filename)
+        best = {}
+        for i in range(repeat):
+            # a fresh process per run, the peak RSS belongs to this run
+            pool = multiprocessing.Pool(1)
+            try:
+                results, failures, rss = pool.apply(run_pipeline, (filename,))
+            finally:
+                pool.terminate()
+                pool.join()
+            peak = max(peak, rss)
+            for phase, (seconds, rss) in results.items():
+                if not best.has_key(phase) or seconds < best[phase][0]:
+                    best[phase] = (seconds, rss)
+            for phase, error in failures.items():
+                failed.setdefault(phase, {})[os.path.basename(filename)] = \
+                    error
+        # a phase failed in one of the runs is not timed for the file
+        for phase in failed:
+            if best.has_key(phase) and \
+                failed[phase].has_key(os.path.basename(filename)):
+                del best[phase]
+        for phase, (seconds, rss) in best.items():
+            t = total.setdefault(phase, [0.0, 0])
+            t[0] += seconds
+            t[1] = max(t[1], rss)
+    result = []
+    for phase in phases:
+        if total.has_key(phase):
+            seconds, rss = total[phase]
+            result.append({'phase': phase, 'time': seconds, 'rss': rss,
+                'throughput': size / max(seconds, 1e-9)})
+    return {'files': files, 'bytes': size, 'repeat': repeat,
+        'phases': result, 'total': sum([r['time'] for r in result]),
+        'peak_rss': peak, 'failed': failed}
+
+# names of the files of result (the directories may differ between runs)
+def file_names(result):
+    return [os.path.basename(f) for f in result['files']]
+
+# compares result with baseline, returns the regressed phases; None if the
+# baseline was taken on other files (the times are not comparable)
+def compare(result, baseline, tolerance, output=sys.stdout):
+    if file_names(result) != file_names(baseline) or \
+        result['bytes'] != baseline['bytes']:
+        print >>output, 'baseline of other files (%d files, %d bytes), ' \
+            'not compared' % (len(baseline['files']), baseline['bytes'])
+        return None
+    base = dict([(r['phase'], r) for r in baseline['phases']])
+    slower = []
+    print >>output, '%-30s %10s %10s %8s' % \
+        ('phase', 'time [s]', 'base [s]', 'ratio')
+    for r in result['phases']:
+        b = base.get(r['phase'])
+        if b == None:
+            print >>output, '%-30s %10.4f %10s' % (r['phase'], r['time'], '-')
+            continue
+        ratio = r['time'] / max(b['time'], 1e-9)
+        mark = ''
+        # phases below a millisecond are noise
+        if ratio > 1 + tolerance and r['time'] - b['time'] > 1e-3:
+            mark = ' SLOWER'
+            slower.append(r['phase'])
+        print >>output, '%-30s %10.4f %10.4f %7.2fx%s' % (r['phase'],
+            r['time'], b['time'], ratio, mark)
+    # a phase failed on a file where it did not fail in the baseline
+    base = baseline.get('failed', {})
+    for phase in sorted(result['failed']):
+        new = [f for f in sorted(result['failed'][phase])
+            if not base.get(phase, {}).has_key(f)]
+        if new:
+            print >>output, '%-30s FAILED on %s' % (phase, ' '.join(new))
+            if phase not in slower:
+                slower.append(phase)
+    return slower
+
+# prints the result table
+def report(result, output=sys.stdout):
+    print >>output, '%-30s %10s %10s %12s' % \
+        ('phase', 'time [s]', 'RSS+ [KB]', 'bytes/s')
+    for r in result['phases']:
+        print >>output, '%-30s %10.4f %10d %12.0f' % (r['phase'], r['time'],
+            r['rss'], r['throughput'])
+    print >>output, '%d files, %d bytes, %.3f s, peak RSS %d KB' % \
+        (len(result['files']), result['bytes'], result['total'],
+        result['peak_rss'])
+    for phase in sorted(result['failed']):
+        for f, error in sorted(result['failed'][phase].items()):
+            print >>output, '%s failed on %s: %s' % (phase, f, error)
+
+if __name__ == "__main__":
+    optparser = optparse.OptionParser(usage='%prog [options] [file.vhd ...]')
+    optparser.add_option('-n', '--repeat', type='int', default=1,
+        help='runs per file, the best one counts')
+    optparser.add_option('-o', '--output', metavar='FILE',
+        help='write the result to FILE (json)')
+    optparser.add_option('-b', '--baseline', metavar='FILE',
+        help='compare with the result stored in FILE (json)')
+    optparser.add_option('-t', '--tolerance', type='float', default=0.2,
+        help='allowed slowdown against the baseline (default %default)')
+    (options, args) = optparser.parse_args()
+    files = args or corpus
+    if not files:
+        print >>sys.stderr, 'syntax: %s file.vhd' % sys.argv[0]
+        sys.exit(1)
+    result = benchmark(files, options.repeat)
+    report(result)
+    if options.output:
+        f = open(options.output, 'w')
+        json.dump(result, f, indent=1)
+        f.write('\n')
+        f.close()
+    if options.baseline:
+        f = open(options.baseline)
+        baseline = json.load(f)
+        f.close()
+        print
+        slower = compare(result, baseline, options.tolerance)
+        if slower == None or slower:
+            sys.exit(1)
@@ -0,0 +1,324 @@
+#! /usr/bin/env python
+# vim:ts=4:expandtab:sw=4:tw=0
+###############################################################################
+# project.py - dependency ordered, parallel build of a multi-file design      #
+#                                                                             #
+# This program is free software; you can redistribute it and/or modify        #
+#   it under the terms of the GNU General Public License as published by      #
+#   the Free Software Foundation; either version 2 of the License, or         #
+#   (at your option) any later version.                                       #
+#   See http://www.gnu.org/licenses/gpl.html for more details.                #
+#                                                                             #
+###############################################################################
+###############################################################################
+# The token stream of every file (no parse) yields the design units the file
+# provides (entities, packages, configurations) and the units it needs:
+# packages of use clauses, the entity of an architecture or configuration,
+# the package of a package body, entity, component (default binding) and
+# configuration instantiations and the bindings of configurations.  Units
+# not provided by a file of the project (ieee, unisim, ...) are ignored.
+#
+# A file is built (vhd2xml, optimvhd, analysevhd of all its architectures)
+# as soon as all files it depends on are built, files without a dependency
+# between them are built concurrently in a pool of worker processes.  The
+# analysis loads the optimized xml of the dependencies first, so an
+# architecture finds the entity of another file.  Files in a dependency
+# cycle are built after all the others.
+#
+# $ ./project.py [-j N] [-m manifest.json] file(s)
+
+import sys
+import os # for OS functions
+import json
+import time
+import Queue
+import optparse
+import traceback
+import multiprocessing
+from cStringIO import StringIO
+import vhd2xml
+
+###############################################################################
+# Dependency scan                                                             #
+###############################################################################
+
+# returns the units provided and the units needed by file filename,
+# a unit is a (kind, name) tuple
+def scan_file(filename):
+    f = open(filename)
+    content = f.read()
+    f.close()
+    lexer = vhd2xml.new_lexer(filename)
+    lexer.input(content)
+    types = []
+    values = []
+    while True:
+        t = lexer.token()
+        if not t:
+            break
+        types.append(t.type)
+        values.append(t.value)
+    provides = set()
+    needs = set()
+    # selected name starting at token i: returns its names and the next index
+    def selected(i):
+        names = []
+        while i < len(types) and types[i] in ('ID', 'ALL'):
+            names.append(values[i])
+            if i + 1 < len(types) and types[i+1] == 'DOT':
+                i += 2
+            else:
+                i += 1
+                break
+        return names, i
+    n = len(types)
+    for i in range(n):
+        t = types[i]
+        after_colon = i > 0 and types[i-1] == ':'
+        if t == 'USE':
+            if i + 1 < n and types[i+1] in ('ENTITY', 'CONFIGURATION'):
+                # binding of a configuration: use entity lib.name
+                names, j = selected(i + 2)
+                if names:
+                    needs.add((types[i+1].lower(), names[-1]))
+            else:
+                # use lib.package[.item]
+                names, j = selected(i + 1)
+                if len(names) >= 2:
+                    needs.add(('package', names[1]))
+        elif t == 'ENTITY' and i + 2 < n and types[i+1] == 'ID':
+            if after_colon:
+                # label : entity lib.name
+                names, j = selected(i + 1)
+                needs.add(('entity', names[-1]))
+            elif types[i+2] == 'IS':
+                provides.add(('entity', values[i+1]))
+        elif t == 'ARCHITECTURE' and i + 3 < n and types[i+2] == 'OF':
+            needs.add(('entity', values[i+3]))
+        elif t == 'PACKAGE' and i + 2 < n:
+            if types[i+1] == 'BODY' and i + 2 < n:
+                needs.add(('package', values[i+2]))
+            elif types[i+1] == 'ID' and types[i+2] == 'IS':
+                provides.add(('package', values[i+1]))
+        elif t == 'CONFIGURATION' and i + 1 < n:
+            if after_colon:
+                # label : configuration lib.name
+                names, j = selected(i + 1)
+                if names:
+                    needs.add(('configuration', names[-1]))
+            elif i + 3 < n and types[i+2] == 'OF':
+                provides.add(('configuration', values[i+1]))
+                needs.add(('entity', values[i+3]))
+        elif t == 'ID' and after_colon and i + 2 < n and \
+            types[i+1] in ('PORT', 'GENERIC') and types[i+2] == 'MAP':
+            # label : component port map, bound to the entity of its name
+            needs.add(('entity', values[i]))
+        elif t == 'COMPONENT' and after_colon and i + 1 < n and \
+            types[i+1] == 'ID':
+            # label : component name port map
+            needs.add(('entity', values[i+1]))
+    return filename, provides, needs
+
+# scans file filename in a pool process, returns (scan, None) or (None,
+# traceback text) of a failed scan: the exception itself may not be
+# unpickled in the main process (lex.LexError), the pool would hang
+def scan_worker(filename):
+    try:
+        return scan_file(filename), None
+    except Exception:
+        return None, traceback.format_exc()
+
+# Project class
+class Project(object):
+    "Files of a design with their unit dependency graph"
+
+    def __init__(self, files):
+        self.files = files
+        # unit -> file providing it
+        self.provider = {}
+        # file -> files it depends on / files depending on it
+        self.depends = dict([(f, set()) for f in files])
+        self.dependents = dict([(f, set()) for f in files])
+        # files in or behind a dependency cycle
+        self.cycles = []
+
+    # scans the files (in pool if given) and builds the graph
+    def scan(self, pool=None):
+        if pool:
+            scans = []
+            for scan, error in pool.map(scan_worker, self.files):
+                if error:
+                    # stops as the serial scan does
+                    sys.stderr.write(error)
+                    sys.exit(1)
+                scans.append(scan)
+        else:
+            scans = map(scan_file, self.files)
+        for filename, provides, needs in scans:
+            for unit in provides:
+                self.provider.setdefault(unit, filename)
+        for filename, provides, needs in scans:
+            for unit in needs:
+                f = self.provider.get(unit)
+                if f != None and f != filename:
+                    self.depends[filename].add(f)
+                    self.dependents[f].add(filename)
+
+    # returns the files in topological order, files in or behind a cycle
+    # come last
+    def order(self):
+        count = dict([(f, len(d)) for f, d in self.depends.items()])
+        ready = [f for f in self.files if count[f] == 0]
+        result = []
+        while ready:
+            f = ready.pop(0)
+            result.append(f)
+            for d in sorted(self.dependents[f]):
+                count[d] -= 1
+                if count[d] == 0:
+                    ready.append(d)
+        self.cycles = [f for f in self.files if count[f] > 0]
+        return result + self.cycles
+
+    # returns all files filename depends on, in build order
+    def closure(self, filename, order):
+        needed = set()
+        stack = list(self.depends[filename])
+        while stack:
+            f = stack.pop()
+            if f not in needed and f != filename:
+                needed.add(f)
+                stack.extend(self.depends[f])
+        return [f for f in order if f in needed]
+
+###############################################################################
+# Build                                                                       #
+###############################################################################
+
+# builds file filename: vhd2xml, optimvhd and the analysis of all its
+# architectures (dependencies are loaded before), writes filename.dot;
+# returns the manifest record and the console output
+def build_file(filename, deps):
+    import optimvhd
+    import analysevhd
+    from elements import VHDLdesign
+    stdout, stderr = sys.stdout, sys.stderr
+    sys.stdout, sys.stderr = StringIO(), StringIO()
+    start = time.time()
+    record = {'file': filename, 'depends': deps, 'pid': os.getpid()}
+    try:
+        try:
+            record.update(vhd2xml.convert_file(filename))
+            optim = optimvhd.optimizeFile(filename + '.xml')
+            design = VHDLdesign('myDesign')
+            for d in deps:
+                # a dependency in a cycle may not be built yet
+                if os.path.exists(d + '.optim.xml'):
+                    analysevhd.loadFile(design, d + '.optim.xml')
+            newFile = analysevhd.loadFile(design, optim)
+            archs = newFile.getArchMap().values()
+            if archs:
+                design.setMainFile(newFile)
+                dot = ''
+                for arch in archs:
+                    design.setMainArch(arch)
+                    dot += design.checkDependency()
+                dot_file = open(filename + '.dot', 'w')
+                dot_file.write(dot)
+                dot_file.close()
+            record['architectures'] = len(archs)
+        except Exception:
+            record['error'] = traceback.format_exc().splitlines()[-1]
+            traceback.print_exc()
+        record['total'] = time.time() - start
+        return record, sys.stdout.getvalue(), sys.stderr.getvalue()
+    finally:
+        sys.stdout, sys.stderr = stdout, stderr
+
+# prints the output of a built file
+def report(record, out, err):
+    print record['file']
+    sys.stdout.write(out)
+    sys.stdout.flush()
+    sys.stderr.write(err)
+    sys.stderr.flush()
+    print '------------ done'
+
+# builds the project in dependency order with jobs worker processes,
+# returns the manifest records in completion order
+def build(project, jobs=1):
+    order = project.order()
+    records = []
+    if jobs <= 1:
+        for f in order:
+            record, out, err = build_file(f, project.closure(f, order))
+            report(record, out, err)
+            records.append(record)
+        return records
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pool = multiprocessing.Pool(jobs)
+    done = Queue.Queue()
+    waiting = dict([(f, len(project.depends[f])) for f in order])
+    pending = set(order)
+    def submit(f):
+        pending.remove(f)
+        pool.apply_async(build_file, (f, project.closure(f, order)),
+            callback=done.put)
+    try:
+        for f in order:
+            if waiting[f] == 0:
+                submit(f)
+        running = len(order) - len(pending)
+        while running or pending:
+            if not running:
+                # files in or behind a cycle are built one by one
+                submit([f for f in order if f in pending][0])
+                running += 1
+            record, out, err = done.get()
+            running -= 1
+            report(record, out, err)
+            records.append(record)
+            for d in sorted(project.dependents[record['file']]):
+                waiting[d] -= 1
+                if waiting[d] == 0 and d in pending:
+                    submit(d)
+                    running += 1
+    finally:
+        pool.close()
+        pool.join()
+    return records
+
+if __name__ == "__main__":
+    optparser = optparse.OptionParser(usage='%prog [-j N] file.vhd ...')
+    optparser.add_option('-j', '--jobs', type='int',
+        default=multiprocessing.cpu_count(),
+        help='number of parallel worker processes (default: cpu count)')
+    optparser.add_option('-m', '--manifest', metavar='FILE',
+        help='write the build order and per-file records to FILE (json)')
+    (options, args) = optparser.parse_args()
+    if len(args) == 0:
+        print >>sys.stderr, 'syntax: %s file.vhd' % sys.argv[0]
+        sys.exit(1)
+    project = Project(args)
+    if options.jobs > 1:
+        pool = multiprocessing.Pool(options.jobs)
+        project.scan(pool)
+        pool.close()
+        pool.join()
+    else:
+        project.scan()
+    order = project.order()
+    if project.cycles:
+        print >>sys.stderr, 'dependency cycle: %s' % ' '.join(project.cycles)
+    start = time.time()
+    records = build(project, options.jobs)
+    if options.manifest:
+        manifest = open(options.manifest, 'w')
+        json.dump({'order': order, 'cycles': project.cycles,
+            'files': records, 'total': time.time() - start}, manifest,
+            indent=1)
+        manifest.write('\n')
+        manifest.close()
+    if [r for r in records if r.has_key('error')]:
+        sys.exit(1)
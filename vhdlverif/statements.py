@@ -21,9 +21,9 @@ from common import *
 # Statements class
 class Statement(VHDLobject):
     "Statement class"
-    # parent with dependency matrix
+    # parent with dependency graph
     matrixParent = None
-    # sensitivity list
+    # sensitivity list (symbols)
     masterList = []
 
     def __init__(self, ID, xml, par, mpar, lst):
@@ -42,9 +42,28 @@ class Statement(VHDLobject):
     def addMaster(self, master):
         self.masterList.append(master)
 
+    # returns the symbol of identifier name
+    def symbol(self, name):
+        return self.matrixParent.symbols.symbol(name)
+
     def getMasterList(self):
         return self.masterList
 
+    # checks the dependencies of the statement and of all nested statements,
+    # the nested statements wait on a stack (no recursion), in the order of
+    # the source
+    def checkDependency(self):
+        stack = [self]
+        while stack:
+            nested = stack.pop().checkOwnDependency()
+            if nested:
+                stack.extend(reversed(nested))
+
+    # checks the dependencies of the statement itself, returns the nested
+    # statements to check (if any)
+    def checkOwnDependency(self):
+        return None
+
     def getExpressions(self, xmlNode):
         exprs = []
         for objTag in xmlNode.childNodes:
@@ -63,7 +82,8 @@ class Statement(VHDLobject):
 class ParStmts(Statement):
     "Parallel Statements class"
 
-    def checkDependency(self):
+    def checkOwnDependency(self):
+        nested = []
         for parStmtTag in self.getXMLNode().childNodes:
             type = parStmtTag.localName
             if type == "blockParallelStatement":
@@ -73,7 +93,7 @@ class ParStmts(Statement):
                 processPS = ProcessParStmt(parStmtTag.getAttribute('label'), \
                     parStmtTag, self, self.getMatrixParent(), \
                     self.getMasterList())
-                processPS.checkDependency()
+                nested.append(processPS)
             elif type == "procedureParallelStatement":
 #                print type + " not supported"
                 pass
@@ -81,7 +101,7 @@ class ParStmts(Statement):
                 assignPS = AssignParStmt(parStmtTag.getAttribute('label'), \
                     parStmtTag, self, self.getMatrixParent(), \
                     self.getMasterList())
-                assignPS.checkDependency()
+                nested.append(assignPS)
             elif type == "assertParallelStatement":
 #                print type + " not supported"
                 pass
@@ -92,7 +112,7 @@ class ParStmts(Statement):
                 compPS = CompParStmt(parStmtTag.getAttribute('label'), \
                     parStmtTag, self, self.getMatrixParent(), \
                     self.getMasterList())
-                compPS.checkDependency()
+                nested.append(compPS)
             elif type == "entityParallelStatement":
 #                print type + " not supported"
                 pass
@@ -106,49 +126,52 @@ class ParStmts(Statement):
                 ifPS = IfParStmt(parStmtTag.getAttribute('label'), \
                     parStmtTag, self, self.getMatrixParent(), \
                     self.getMasterList())
-                ifPS.checkDependency()
+                nested.append(ifPS)
             elif type == "forParallelStatement":
                 forPS = ForParStmt(parStmtTag.getAttribute('label'), \
                     parStmtTag, self, self.getMatrixParent(), \
                     self.getMasterList())
-                forPS.checkDependency()
+                nested.append(forPS)
+        return nested
 
 
 # Process parallel statements class
 class ProcessParStmt(Statement):
     "Process Parallel Statements class"
 
-    def checkDependency(self):
+    def checkOwnDependency(self):
+        nested = []
         for objTag in self.getXMLNode().childNodes:
             type = objTag.localName
             if type == "range" or type == "parameters":
-                for oTag in objTag.getElementsByTagName('objectExpression'):
-                    self.addMaster(oTag.getAttribute('id'))
-        seqStmtsTag = self.getXMLNode(). \
-            getElementsByTagName('sequentialStatements').item(0)
+                for oTag in elements_by_tag_name(objTag, 'objectExpression'):
+                    self.addMaster(self.symbol(oTag.getAttribute('id')))
+        seqStmtsTag = first_element_by_tag_name(self.getXMLNode(), \
+            'sequentialStatements')
         seqStmt = SeqStmts(seqStmtsTag.getAttribute('label'), seqStmtsTag, \
             self, self.matrixParent, self.masterList)
-        seqStmt.checkDependency()
+        nested.append(seqStmt)
+        return nested
 
 
 # Assign parallel statements class
 class AssignParStmt(Statement):
     "Assign Parallel Statements class"
 
-    def checkDependency(self):
+    def checkOwnDependency(self):
         dependList = []
         for objTag in self.getXMLNode().childNodes:
             type = objTag.localName
             if type == "objectExpression":
-                dependList.append(objTag.getAttribute('id'))
+                dependList.append(self.symbol(objTag.getAttribute('id')))
 #                print objTag.getAttribute('id')
             elif type == "recordExpression" or type == "aggregateExpression":
-                for oTag in objTag.getElementsByTagName('objectExpression'):
-                    self.addMaster(oTag.getAttribute('id'))
-        valuesList = self.getXMLNode().getElementsByTagName('signalValue')
+                for oTag in elements_by_tag_name(objTag, 'objectExpression'):
+                    self.addMaster(self.symbol(oTag.getAttribute('id')))
+        valuesList = elements_by_tag_name(self.getXMLNode(), 'signalValue')
         for valueTag in valuesList:
-            for objTag in valueTag.getElementsByTagName('objectExpression'):
-                self.addMaster(objTag.getAttribute('id'))
+            for objTag in elements_by_tag_name(valueTag, 'objectExpression'):
+                self.addMaster(self.symbol(objTag.getAttribute('id')))
 #                print objTag.getAttribute('id')
         for id in dependList:
             self.getMatrixParent().setDep(self.getMasterList(), id)
@@ -158,10 +181,10 @@ class AssignParStmt(Statement):
 class CompParStmt(Statement):
     "Component Parallel Statements class"
 
-    def checkDependency(self):
+    def checkOwnDependency(self):
         dependList = []
-#        portMapTag = self.getXMLNode().getElementsByTagName('portMap').item(0)
-#        for mapTag in portMapTag.getElementsByTagName('map'):
+#        portMapTag = first_element_by_tag_name(self.getXMLNode(), 'portMap')
+#        for mapTag in elements_by_tag_name(portMapTag, 'map'):
 #            for objTag in mapTag.childNodes:
 #                if objTag.localName == 'objectExpression':
 #                    objList.append(objTag.getAttribute('id'))
@@ -169,15 +192,15 @@ class CompParStmt(Statement):
 #                if obj in self.getMatrixParent().
 #
 ##            if type == "objectExpression":
-#                dependList.append(objTag.getAttribute('id'))
+#                dependList.append(self.symbol(objTag.getAttribute('id')))
 ##                print objTag.getAttribute('id')
 #            elif type == "recordExpression" or type == "aggregateExpression":
-#                for oTag in objTag.getElementsByTagName('objectExpression'):
-#                    self.addMaster(oTag.getAttribute('id'))
-#        valuesList = self.getXMLNode().getElementsByTagName('signalValue')
+#                for oTag in elements_by_tag_name(objTag, 'objectExpression'):
+#                    self.addMaster(self.symbol(oTag.getAttribute('id')))
+#        valuesList = elements_by_tag_name(self.getXMLNode(), 'signalValue')
 #        for valueTag in valuesList:
-#            for objTag in valueTag.getElementsByTagName('objectExpression'):
-#                self.addMaster(objTag.getAttribute('id'))
+#            for objTag in elements_by_tag_name(valueTag, 'objectExpression'):
+#                self.addMaster(self.symbol(objTag.getAttribute('id')))
 ##                print objTag.getAttribute('id')
 #        for id in dependList:
 #            self.getMatrixParent().setDep(self.getMasterList(), id)
@@ -187,35 +210,40 @@ class CompParStmt(Statement):
 class IfParStmt(Statement):
     "If Parallel Statements class"
 
-    def checkDependency(self):
+    def checkOwnDependency(self):
+        nested = []
         for exprTag in self.getExpressions(self.getXMLNode()):
-            for objTag in exprTag.getElementsByTagName('objectExpression'):
-                self.addMaster(objTag.getAttribute('id'))
-        generateTag = self.getXMLNode().getElementsByTagName('generate').item(0)
-        parStmtsTag = generateTag. \
-            getElementsByTagName('parallelStatements').item(0)
+            for objTag in elements_by_tag_name(exprTag, 'objectExpression'):
+                self.addMaster(self.symbol(objTag.getAttribute('id')))
+        generateTag = first_element_by_tag_name(self.getXMLNode(), 'generate')
+        parStmtsTag = first_element_by_tag_name(generateTag, \
+            'parallelStatements')
         parStmt = ParStmts(parStmtsTag.getAttribute('label'), parStmtsTag, \
             self, self.matrixParent, self.masterList)
-        parStmt.checkDependency()
+        nested.append(parStmt)
+        return nested
 
 # For parallel statements class
 class ForParStmt(Statement):
     "For Parallel Statements class"
 
-    def checkDependency(self):
-        generateTag = self.getXMLNode().getElementsByTagName('generate').item(0)
-        parStmtsTag = generateTag. \
-            getElementsByTagName('parallelStatements').item(0)
+    def checkOwnDependency(self):
+        nested = []
+        generateTag = first_element_by_tag_name(self.getXMLNode(), 'generate')
+        parStmtsTag = first_element_by_tag_name(generateTag, \
+            'parallelStatements')
         parStmt = ParStmts(parStmtsTag.getAttribute('label'), parStmtsTag, \
             self, self.matrixParent, self.masterList)
-        parStmt.checkDependency()
+        nested.append(parStmt)
+        return nested
 
 ###############################################################################
 # Sequential statements class
 class SeqStmts(Statement):
     "Sequential Statements class"
 
-    def checkDependency(self):
+    def checkOwnDependency(self):
+        nested = []
         for seqStmtTag in self.getXMLNode().childNodes:
             type = seqStmtTag.localName
             if type == "waitSequentialStatement":
@@ -231,7 +259,7 @@ class SeqStmts(Statement):
                 sigAssignSS = SigAssSeqStmt(seqStmtTag.getAttribute('label'), \
                     seqStmtTag, self, self.getMatrixParent(), \
                     self.getMasterList())
-                sigAssignSS.checkDependency()
+                nested.append(sigAssignSS)
             elif type == "variableAssignSequentialStatement":
 #                print type + " not supported"
                 pass
@@ -242,7 +270,7 @@ class SeqStmts(Statement):
                 ifSS = IfSeqStmt(seqStmtTag.getAttribute('label'), \
                     seqStmtTag, self, self.getMatrixParent(), \
                     self.getMasterList())
-                ifSS.checkDependency()
+                nested.append(ifSS)
             elif type == "caseSequentialStatement":
 #                print type + " not supported"
                 pass
@@ -264,25 +292,26 @@ class SeqStmts(Statement):
             elif type == "nullSequentialStatement":
 #                print type + " not supported"
                 pass
+        return nested
 
 # Signal assign sequential statements class
 class SigAssSeqStmt(Statement):
     "Signal Assign Sequential Statements class"
 
-    def checkDependency(self):
+    def checkOwnDependency(self):
         dependList = []
         for objTag in self.getXMLNode().childNodes:
             type = objTag.localName
             if type == "objectExpression":
-                dependList.append(objTag.getAttribute('id'))
+                dependList.append(self.symbol(objTag.getAttribute('id')))
 #                print objTag.getAttribute('id')
             elif type == "recordExpression" or type == "aggregateExpression":
-                for oTag in objTag.getElementsByTagName('objectExpression'):
-                    self.addMaster(oTag.getAttribute('id'))
-        valuesList = self.getXMLNode().getElementsByTagName('signalValue')
+                for oTag in elements_by_tag_name(objTag, 'objectExpression'):
+                    self.addMaster(self.symbol(oTag.getAttribute('id')))
+        valuesList = elements_by_tag_name(self.getXMLNode(), 'signalValue')
         for valueTag in valuesList:
-            for objTag in valueTag.getElementsByTagName('objectExpression'):
-                self.addMaster(objTag.getAttribute('id'))
+            for objTag in elements_by_tag_name(valueTag, 'objectExpression'):
+                self.addMaster(self.symbol(objTag.getAttribute('id')))
 #                print objTag.getAttribute('id')
         for id in dependList:
             self.getMatrixParent().setDep(self.getMasterList(), id)
@@ -291,30 +320,33 @@ class SigAssSeqStmt(Statement):
 class IfSeqStmt(Statement):
     "If Sequential Statements class"
 
-    def checkDependency(self):
+    def checkOwnDependency(self):
+        nested = []
         for exprTag in self.getExpressions(self.getXMLNode()):
-            for objTag in exprTag.getElementsByTagName('objectExpression'):
-                self.addMaster(objTag.getAttribute('id'))
-        thenTag = self.getXMLNode().getElementsByTagName('then').item(0)
-        seqStmtsTag = thenTag. \
-            getElementsByTagName('sequentialStatements').item(0)
+            for objTag in elements_by_tag_name(exprTag, 'objectExpression'):
+                self.addMaster(self.symbol(objTag.getAttribute('id')))
+        thenTag = first_element_by_tag_name(self.getXMLNode(), 'then')
+        seqStmtsTag = first_element_by_tag_name(thenTag, \
+            'sequentialStatements')
         seqStmt = SeqStmts(seqStmtsTag.getAttribute('label'), seqStmtsTag, \
             self, self.matrixParent, self.masterList)
-        seqStmt.checkDependency()
-        for elseifTag in self.getXMLNode().getElementsByTagName('elseif'):
+        nested.append(seqStmt)
+        for elseifTag in elements_by_tag_name(self.getXMLNode(), 'elseif'):
             for exprTag in self.getExpressions(elseifTag):
-                for objTag in exprTag.getElementsByTagName('objectExpression'):
-                    self.addMaster(objTag.getAttribute('id'))
-            seqStmtsTag = elseifTag. \
-                getElementsByTagName('sequentialStatements').item(0)
+                for objTag in elements_by_tag_name(exprTag, \
+                    'objectExpression'):
+                    self.addMaster(self.symbol(objTag.getAttribute('id')))
+            seqStmtsTag = first_element_by_tag_name(elseifTag, \
+                'sequentialStatements')
             seqStmt = SeqStmts(seqStmtsTag.getAttribute('label'), seqStmtsTag, \
                 self, self.matrixParent, self.masterList)
-            seqStmt.checkDependency()
-        elseTag = self.getXMLNode().getElementsByTagName('else').item(0)
+            nested.append(seqStmt)
+        elseTag = first_element_by_tag_name(self.getXMLNode(), 'else')
         if elseTag != None:
-            seqStmtsTag = elseTag. \
-                getElementsByTagName('sequentialStatements').item(0)
+            seqStmtsTag = first_element_by_tag_name(elseTag, \
+                'sequentialStatements')
             seqStmt = SeqStmts(seqStmtsTag.getAttribute('label'), seqStmtsTag, \
                 self, self.matrixParent, self.masterList)
-            seqStmt.checkDependency()
+            nested.append(seqStmt)
+        return nested
             
\ No newline at end of file
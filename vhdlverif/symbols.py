@@ -0,0 +1,54 @@
+#! /usr/bin/env python
+# vim:ts=4:expandtab:sw=4:tw=0
+###############################################################################
+# symbols.py - design-wide table of identifiers                               #
+#                                                                             #
+# This program is free software; you can redistribute it and/or modify        #
+#   it under the terms of the GNU General Public License as published by      #
+#   the Free Software Foundation; either version 2 of the License, or         #
+#   (at your option) any later version.                                       #
+#   See http://www.gnu.org/licenses/gpl.html for more details.                #
+#                                                                             #
+###############################################################################
+###############################################################################
+# Every identifier of a design gets a dense integer (symbol) the first time it
+# is seen, the analysis keeps symbols in its maps and lists instead of names.
+# VHDL identifiers are case insensitive, the name of a symbol is the interned
+# lower case identifier.
+
+# Symbol table class
+class SymbolTable(object):
+    "Table of identifiers, maps lower case names to dense integers"
+
+    def __init__(self):
+        # name (any spelling seen) -> symbol
+        self.numbers = {}
+        # symbol -> lower case name
+        self.names = []
+
+    # returns the symbol of identifier name, a new one for a new name
+    def symbol(self, name):
+        number = self.numbers.get(name)
+        if number == None:
+            lower = intern(str(name).lower())
+            number = self.numbers.get(lower)
+            if number == None:
+                number = len(self.names)
+                self.names.append(lower)
+                self.numbers[lower] = number
+            self.numbers[name] = number
+        return number
+
+    # returns the symbol of identifier name, None if it is not known
+    def lookup(self, name):
+        number = self.numbers.get(name)
+        if number == None:
+            number = self.numbers.get(str(name).lower())
+        return number
+
+    # returns the (lower case) name of symbol number
+    def name(self, number):
+        return self.names[number]
+
+    def __len__(self):
+        return len(self.names)
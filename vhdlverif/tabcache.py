@@ -0,0 +1,149 @@
+#! /usr/bin/env python
+# vim:ts=4:expandtab:sw=4:tw=0
+###############################################################################
+# tabcache.py - persistent, content-hashed cache of PLY lex and parse tables  #
+#                                                                             #
+# This program is free software; you can redistribute it and/or modify        #
+#   it under the terms of the GNU General Public License as published by      #
+#   the Free Software Foundation; either version 2 of the License, or         #
+#   (at your option) any later version.                                       #
+#   See http://www.gnu.org/licenses/gpl.html for more details.                #
+#                                                                             #
+###############################################################################
+###############################################################################
+# The tables of every grammar are stored as parsetab_<name>_<hash>.py (and the
+# lexer tables as lextab_<name>_<hash>.py) in one shared cache directory.  The
+# hash covers everything the tables depend on (PLY version, method, start
+# symbol, tokens, precedence, the token rules and the rule docstrings), so a
+# changed grammar simply gets a new file.  Cached tables are loaded in
+# optimize mode; new tables are built in a private temporary directory and
+# renamed into place, so concurrent processes never see a partially written
+# file.
+#
+# The cache directory is taken from $PYVHDL_CACHE_DIR, then
+# $XDG_CACHE_HOME/pyvhdl, then ~/.cache/pyvhdl.
+
+import sys
+import os # for OS functions
+import types
+import shutil
+import tempfile
+import hashlib
+
+# environment variable overriding the cache directory
+CACHE_ENV = 'PYVHDL_CACHE_DIR'
+
+# returns the cache directory (created on demand, added to sys.path),
+# None if it is not usable
+def cache_dir(path=None):
+    if not path:
+        path = os.environ.get(CACHE_ENV)
+    if not path:
+        base = os.environ.get('XDG_CACHE_HOME') or \
+            os.path.join(os.path.expanduser('~'), '.cache')
+        path = os.path.join(base, 'pyvhdl')
+    path = os.path.abspath(path)
+    try:
+        os.makedirs(path)
+    except OSError:
+        if not os.path.isdir(path):
+            return None
+    if not os.access(path, os.W_OK):
+        return None
+    if path not in sys.path:
+        sys.path.append(path)
+    return path
+
+# returns the grammar rules (p_* functions) of a module dictionary
+def grammar_rules(ldict):
+    rules = [f for n, f in ldict.items()
+        if n[:2] == 'p_' and isinstance(f, types.FunctionType)]
+    rules.sort(key=lambda f: f.func_code.co_firstlineno)
+    return rules
+
+# hash of everything the parse tables are built from
+def grammar_signature(yaccmod, ldict, method='LALR', start=None):
+    sig = hashlib.md5()
+    sig.update(getattr(yaccmod, '__version__', '') + '\0' + method + '\0')
+    sig.update(repr(start or ldict.get('start')) + '\0')
+    sig.update(repr(tuple(ldict.get('tokens', ()))) + '\0')
+    sig.update(repr(ldict.get('precedence')) + '\0')
+    for f in grammar_rules(ldict):
+        sig.update(f.__name__ + '\0' + (f.__doc__ or '') + '\0')
+    return sig.hexdigest()[:16]
+
+# hash of everything the lexer tables are built from
+def lexer_signature(lexmod, ldict):
+    sig = hashlib.md5()
+    sig.update(getattr(lexmod, '__version__', '') + '\0')
+    for n in ('tokens', 'literals', 'states'):
+        sig.update(repr(ldict.get(n)) + '\0')
+    names = [n for n in ldict.keys() if n[:2] == 't_']
+    names.sort()
+    for n in names:
+        v = ldict[n]
+        if isinstance(v, types.FunctionType):
+            sig.update('%s\0%d\0%s\0' % (n, v.func_code.co_firstlineno,
+                v.__doc__ or ''))
+        else:
+            sig.update('%s\0%r\0' % (n, v))
+    return sig.hexdigest()[:16]
+
+# moves the table files written to tmpdir into the cache directory
+def publish(tmpdir, path):
+    # debug output first, the table itself makes the entry visible
+    names = os.listdir(tmpdir)
+    names.sort(key=lambda n: n.endswith('.py'))
+    for n in names:
+        if n.endswith('.py') or n.endswith('.out'):
+            try:
+                os.rename(os.path.join(tmpdir, n), os.path.join(path, n))
+            except OSError:
+                # another process has already published the same tables
+                pass
+
+# builds (or loads) the parser of a grammar module through the cache
+#   yaccmod .. the yacc module of the grammar (vendored or ply.yacc)
+#   module  .. module object containing the grammar rules
+#   name    .. short name of the grammar, used in the table file name
+def yacc(yaccmod, module, name, method='LALR', cachedir=None, **kw):
+    debug = kw.pop('debug', 0)
+    ldict = module.__dict__
+    tabname = 'parsetab_%s_%s' % (name,
+        grammar_signature(yaccmod, ldict, method, kw.get('start')))
+    path = cache_dir(cachedir)
+    if path is None:
+        # no usable cache directory, do not litter the working directory
+        return yaccmod.yacc(method=method, module=module, debug=0,
+            write_tables=0, **kw)
+    if os.path.exists(os.path.join(path, tabname + '.py')):
+        return yaccmod.yacc(method=method, module=module, tabmodule=tabname,
+            optimize=1, write_tables=0, debug=0, **kw)
+    tmpdir = tempfile.mkdtemp(prefix='.build-', dir=path)
+    try:
+        parser = yaccmod.yacc(method=method, module=module, tabmodule=tabname,
+            outputdir=tmpdir, debug=debug, debugfile=tabname + '.out', **kw)
+        publish(tmpdir, path)
+    finally:
+        shutil.rmtree(tmpdir, True)
+    return parser
+
+# builds (or loads) the lexer of a token module through the cache, the
+# master regular expressions are read from the lextab instead of being
+# built from the t_* rules (vendored PLY 2.3 lex only)
+def lex(lexmod, module, name, cachedir=None, **kw):
+    ldict = module.__dict__
+    tabname = 'lextab_%s_%s' % (name, lexer_signature(lexmod, ldict))
+    path = cache_dir(cachedir)
+    if path is None:
+        return lexmod.lex(module=module, **kw)
+    if os.path.exists(os.path.join(path, tabname + '.py')):
+        return lexmod.lex(module=module, optimize=1, lextab=tabname, **kw)
+    lexer = lexmod.lex(module=module, **kw)
+    tmpdir = tempfile.mkdtemp(prefix='.build-', dir=path)
+    try:
+        lexer.writetab(os.path.join(tmpdir, tabname))
+        publish(tmpdir, path)
+    finally:
+        shutil.rmtree(tmpdir, True)
+    return lexer
@@ -24,23 +24,42 @@
 
 import sys
 import os # for OS functions
+import copy
+import hashlib
+import cPickle
+import mmap
+import time
+import json
+import optparse
+import shutil
+import tempfile
+import multiprocessing
+import traceback
+from cStringIO import StringIO
 from xml.dom.minidom import getDOMImplementation
+from xml.parsers import expat
 
 ###############################################################################
 # LEXER
 ###############################################################################
 import lex
-
-# output file
-DOMimplement = None
-xml_document = None
-top_element = None
-
-# lexer
-lexer = None
-
-# misc
-debug = False
+import tabcache
+import vhdlast
+import vhdlscan
+import grammarprof
+import designdb
+import events
+
+# master lexers of the lexer engines, built once and cloned for every file
+master_lexers = {}
+# read/write the master regular expressions from/to the table cache
+use_lextab = True
+# lexer engine: 'ply' (vendored PLY lex) or 'scan' (vhdlscan.Scanner, the
+# same token stream from a single-pass scanner)
+lexer_engine = 'ply'
+
+# misc - the element trace of location (events at the TRACE level)
+debug = events.enabled(events.TRACE)
 
 # reserved tokens
 tokens_reserved = (
@@ -158,8 +177,35 @@ def t_newline(t):
     t.lexer.lineno += t.value.count('\n')
 
 def t_error(t):
-    print "%s:%d:illegal character '%s'" % \
-        (t.lexer.filename, t.lexer.lineno, t.value[0])
+    t.lexer.errors += 1
+    events.count('vhd2xml.illegal_characters')
+    events.warning('vhd2xml.illegal_character',
+        "%s:%d:illegal character '%s'" % (t.lexer.filename, t.lexer.lineno,
+        t.lexer.lexdata[t.lexpos]), file=t.lexer.filename,
+        line=t.lexer.lineno)
+
+# lexer factory - returns a fresh lexer for file filename, the master regular
+# expression is compiled only once (or read from the lextab of the table
+# cache) and every file gets a cheap clone of the master lexer
+def new_lexer(filename, engine=None):
+    if engine == None:
+        engine = lexer_engine
+    if not master_lexers.has_key(engine):
+        module = sys.modules[__name__]
+        if engine == 'scan':
+            master_lexers[engine] = vhdlscan.Scanner(module)
+        elif use_lextab:
+            master_lexers[engine] = tabcache.lex(lex, module, 'vhd2xml')
+        else:
+            master_lexers[engine] = lex.lex(module=module)
+    l = master_lexers[engine].clone()
+    l.lexstatestack = []
+    l.lineno = 1
+    l.filename = filename
+    l.errors = 0
+    # offset of the lexed text in the source file (span table)
+    l.offset = 0
+    return l
 
 
 ###############################################################################
@@ -172,30 +218,65 @@ def t_error(t):
 # Functions for syntax structure
 ###############################################################################
 
-# common rule for appending location information - attribute
-def location(p, e, lineno=0):
+# creates a new element in the document of the running parse
+def element(p, tag):
+    return p.lexer.document.createElement(tag)
+
+# common rule for appending location information - the span of the element
+# (start offset of the first symbol by default, offset of the last token of
+# the production) is stored in the span table, the line number is computed
+# when the xml is written
+def location(p, e, start=None):
+    if start == None:
+        start = p.lexpos(1) + p.lexer.offset
     if e == None:
-        return p.lineno(1)
-    if lineno == 0:
-        lineno = p.lineno(1)
+        return start
     if debug:
-        print '  tag: ' + e.tagName + ' (line: ' + str(lineno) + ')'
-    e.setAttribute('line', str(lineno))
+        events.trace('vhd2xml.element',
+            '  tag: ' + e.tagName + ' (offset: ' + str(start) + ')',
+            tag=e.tagName, offset=start)
+    end = start
+    for sym in p.slice[-1:0:-1]:
+        if not isinstance(sym, yacc.YaccSymbol):
+            end = sym.lexpos + p.lexer.offset
+            break
+    e.span = p.lexer.spans.add(start, end)
+
+# start offset of element e
+def position(p, e):
+    return p.lexer.spans.start(e.span)
+
+# operators of the expressions kept n-ary: a chain of one of them
+# (a or b or c) is a single element with all operands as children
+associative_ops = ('and', 'or', 'xor', 'xnor', '+', '&', '*')
+
+# common rule for binary expressions - the left operand is extended when it is
+# an element of the same associative operator (left-recursive chains)
+def binary_expression(p, tag):
+    op = p[2].lower()
+    left = p[1]
+    if op in associative_ops and left.tagName == tag and \
+        left.getAttribute('op').lower() == op:
+        left.appendChild(p[3])
+        return left
+    e = element(p, tag)
+    e.setAttribute('op', p[2])
+    e.appendChild(p[1])
+    e.appendChild(p[3])
+    return e
 
-# common function to find out line nbr of target element
-def getLineTarget(e):
-    if e.tagName == 'objectExpression':
-        return e.getAttribute('line')
-    else:
-        return getFirstChildLine(e)
+# common function to find out the position of target element
+def getLineTarget(p, e):
+    if e.tagName != 'objectExpression':
+        e = getFirstChildLine(e)
+    return position(p, e)
 
-# handy recursive function
+# first descendant (down the first children) with a position
 def getFirstChildLine(e):
-    first = e.firstChild
-    if first.hasAttribute('line'):
-        return first.getAttribute('line')
-    else:
-        return getFirstChildLine(first)
+    e = e.firstChild
+    while getattr(e, 'span', None) == None:
+        e = e.firstChild
+    return e
 
 ###############################################################################
 # 0. Common Productions
@@ -205,7 +286,8 @@ def getFirstChildLine(e):
 def p_start(p):
     """start : start library"""
     if p[2]: 
-        top_element.appendChild(p[2])
+        p.lexer.unit_span = p.lexspan(2)
+        p.lexer.add_unit(p[2])
 
 # start symbol empty - 20080707
 def p_start_empty(p):
@@ -220,7 +302,7 @@ def p_empty(p):
 # match: [:= expr] - 20080708 - xsd
 def p_assign_expr_opt1(p):
     """assign_expr_opt : ASSIGN expr"""
-    e = xml_document.createElement('value')
+    e = element(p, 'value')
     e.appendChild(p[2])
     p[0] = e
 
@@ -231,7 +313,7 @@ def p_assign_expr_opt2(p):
 # match: {range,} - 20080709 - xsd
 def p_range_list1(p):
     """range_list : range"""
-    e = xml_document.createElement('ranges')
+    e = element(p, 'ranges')
     e.appendChild(p[1])
     p[0] = e
 
@@ -244,7 +326,7 @@ def p_range_list2(p):
 # match: range - 20080711 - xsd
 def p_range1(p):
     """range : expr range_dir expr"""
-    e = xml_document.createElement('range')
+    e = element(p, 'range')
     e.setAttribute('direction', p[2])
     e.appendChild(p[1])
     e.appendChild(p[3])
@@ -253,7 +335,7 @@ def p_range1(p):
 # match: range - 20080728 - xsd
 def p_range2(p):
     """range : '(' ID RANGE RANGESIGN ')'"""
-    e = xml_document.createElement('range')
+    e = element(p, 'range')
     e.setAttribute('id', p[1])
     p[0] = e
 
@@ -275,7 +357,7 @@ def p_generic_opt2(p):
 # match: {ID:TYPEID [:= expr];} - 20080708 - xsd
 def p_id_type_expr_list1(p):
     """id_type_expr_list : id_type_expr"""
-    e = xml_document.createElement('generic')
+    e = element(p, 'generic')
     e.appendChild(p[1])
     p[0] = e
 
@@ -288,7 +370,7 @@ def p_id_type_expr_list2(p):
 # match: ID:TYPEID [:= expr] - 20080809 - xsd
 def p_id_type_expr(p):
     """id_type_expr : ID ':' typeid assign_expr_opt"""
-    e = xml_document.createElement('parameter')
+    e = element(p, 'parameter')
     location(p, e)
     e.setAttribute('id', p[1])
     e.appendChild(p[3])
@@ -308,7 +390,7 @@ def p_port_opt2(p):
 # match: {ID: in|out|inout TYPEID [:= expr];} - 20080708 - xsd
 def p_id_port_type_expr_list1(p):
     """id_port_type_expr_list : id_port_type_expr"""
-    e = xml_document.createElement('ports')
+    e = element(p, 'ports')
     e.appendChild(p[1])
     p[0] = e
 
@@ -328,7 +410,7 @@ def p_port_type(p):
 # match: ID: in|out|inout TYPEID [:= expr] - 20080708 - xsd
 def p_id_port_type_expr(p):
     """id_port_type_expr : ID ':' port_type typeid assign_expr_opt"""
-    e = xml_document.createElement('port')
+    e = element(p, 'port')
     e.setAttribute('id', p[1])
     e.setAttribute('io', p[3])
     location(p, e)
@@ -340,7 +422,7 @@ def p_id_port_type_expr(p):
 # match: {[constant|variable|signal] ID : in|out|inout TYPEID [:= expr];} - 20080816 - xsd
 def p_parameter_expr_list1(p):
     """parameter_expr_list : parameter_expr"""
-    e = xml_document.createElement('functionParameters')
+    e = element(p, 'functionParameters')
     e.appendChild(p[1])
     p[0] = e
 
@@ -353,7 +435,7 @@ def p_parameter_expr_list2(p):
 # match: [constant|variable|signal] ID : in|out|inout TYPEID [:= expr] - 20081028 - xsd
 def p_parameter_expr1(p):
     """parameter_expr : CONSTANT id_list ':' port_type typeid assign_expr_opt"""
-    e = xml_document.createElement('constantParameter')
+    e = element(p, 'constantParameter')
     e.appendChild(p[2])
     e.setAttribute('io', p[4])
     location(p, e)
@@ -365,7 +447,7 @@ def p_parameter_expr1(p):
 # - 20081028 - xsd
 def p_parameter_expr2(p):
     """parameter_expr : VARIABLE id_list ':' port_type typeid assign_expr_opt"""
-    e = xml_document.createElement('variableParameter')
+    e = element(p, 'variableParameter')
     e.appendChild(p[2])
     e.setAttribute('io', p[4])
     location(p, e)
@@ -377,7 +459,7 @@ def p_parameter_expr2(p):
 # - 20081028 - xsd
 def p_parameter_expr3(p):
     """parameter_expr : SIGNAL id_list ':' port_type typeid assign_expr_opt"""
-    e = xml_document.createElement('signalParameter')
+    e = element(p, 'signalParameter')
     e.appendChild(p[2])
     e.setAttribute('io', p[4])
     location(p, e)
@@ -389,10 +471,10 @@ def p_parameter_expr3(p):
 # - 20081028 - xsd
 def p_parameter_expr4(p):
     """parameter_expr : id_list ':' port_type typeid assign_expr_opt"""
-    e = xml_document.createElement('idParameter')
+    e = element(p, 'idParameter')
     e.appendChild(p[1])
     e.setAttribute('io', p[3])
-    location(p, e, p[1].firstChild.getAttribute('line'))
+    location(p, e, position(p, p[1].firstChild))
     e.appendChild(p[4])
     if p[5] != None:
         e.appendChild(p[5])
@@ -407,14 +489,14 @@ def p_id_type_list1(p):
 #- 20080728 - xsd
 def p_id_type_list2(p):
     """id_type_list : id_type"""
-    e = xml_document.createElement('generic')
+    e = element(p, 'generic')
     e.appendChild(p[1])
     p[0] = e
 
 # match: ID:TYPEID - 20080728 - xsd
 def p_id_type(p):
     "id_type : ID ':' typeid"
-    e = xml_document.createElement('parameter')
+    e = element(p, 'parameter')
     location(p, e)
     e.setAttribute('id', p[1])
     e.appendChild(p[3])
@@ -423,7 +505,7 @@ def p_id_type(p):
 # match: {ID: in|out|inout TYPEID;} - 20080728 - xsd
 def p_id_port_type_list1(p):
     """id_port_type_list : id_port_type"""
-    e = xml_document.createElement('ports')
+    e = element(p, 'ports')
     e.appendChild(p[1])
     p[0] = e
 
@@ -436,7 +518,7 @@ def p_id_port_type_list2(p):
 # match: ID: in|out|inout TYPEID - 20080728 - xsd
 def p_id_port_type(p):
     "id_port_type : ID ':' port_type typeid"
-    e = xml_document.createElement('port')
+    e = element(p, 'port')
     e.setAttribute('id', p[1])
     e.setAttribute('io', p[3])
     e.appendChild(p[4])
@@ -470,7 +552,7 @@ def p_generic_map_opt2(p):
 # match: {ID => expr,} - 20080724 - xsd
 def p_id_map_list1(p):
     """id_map_list : id_map"""
-    e = xml_document.createElement('universalMap')
+    e = element(p, 'universalMap')
     e.appendChild(p[1])
     p[0] = e
 
@@ -483,7 +565,7 @@ def p_id_map_list2(p):
 #match: ID => expr - 20080919 - xsd
 def p_id_map1(p):
     """id_map : id_object CONNECT expr"""
-    e = xml_document.createElement('map')
+    e = element(p, 'map')
     e.appendChild(p[1])
     e.appendChild(p[3])
     p[0] = e
@@ -491,9 +573,9 @@ def p_id_map1(p):
 #match: ID => open - 20080919 - xsd
 def p_id_map2(p):
     """id_map : id_object CONNECT OPEN"""
-    e = xml_document.createElement('map')
+    e = element(p, 'map')
     e.appendChild(p[1])
-    e1 = xml_document.createElement(p[3])
+    e1 = element(p, p[3])
     e.appendChild(e1)
     p[0] = e
 
@@ -516,7 +598,7 @@ def p_generic_map_key_opt2(p):
 # match: {[ID =>] expr,} - 20080728 - xsd 
 def p_id_map_key_opt_list1(p):
     """id_map_key_opt_list : id_map_key_opt"""
-    e = xml_document.createElement('universalMap')
+    e = element(p, 'universalMap')
     e.appendChild(p[1])
     p[0] = e
 
@@ -534,7 +616,7 @@ def p_id_map_key_opt1(p):
 #- 20080919 - xsd
 def p_id_map_key_opt2(p):
     """id_map_key_opt : id_object CONNECT expr"""
-    e = xml_document.createElement('map')
+    e = element(p, 'map')
     e.appendChild(p[1])
     e.appendChild(p[3])
     p[0] = e
@@ -542,9 +624,9 @@ def p_id_map_key_opt2(p):
 #- 20080919 - xsd
 def p_id_map_key_opt3(p):
     """id_map_key_opt : id_object CONNECT OPEN"""
-    e = xml_document.createElement('map')
+    e = element(p, 'map')
     e.appendChild(p[1])
-    e1 = xml_document.createElement(p[3])
+    e1 = element(p, p[3])
     e.appendChild(e1)
     p[0] = e
 
@@ -573,7 +655,7 @@ def p_id_opt(p):
 # match: {expr [after time],} - 20080730 - xsd
 def p_expr_list1(p):
     "expr_list : expr_list_item"
-    e = xml_document.createElement('expressions')
+    e = element(p, 'expressions')
     e.appendChild(p[1])
     p[0] = e
 
@@ -589,7 +671,7 @@ def p_expr_list_item(p):
     if p[2] == None:
         p[0] = p[1]
     else:
-        e = xml_document.createElement('afterExpression')
+        e = element(p, 'afterExpression')
         e.appendChild(p[1])
         e.appendChild(p[2][0])
         location(p, e, p[2][1])
@@ -607,7 +689,7 @@ def p_expr_list_after_opt2(p):
 # match: LITERAL ID (where ID must be one of hr|min|sec|ms|us|ns|ps|fs) - 20080811 - xsd
 def p_time1(p):
     "time : LITERAL ID"
-    e = xml_document.createElement('timeExpression')
+    e = element(p, 'timeExpression')
     e.setAttribute('value', p[1])
     e.setAttribute('id', p[2])
     location(p, e)
@@ -616,7 +698,7 @@ def p_time1(p):
 # match: {choice |} - 20080711 - xsd
 def p_choice_list1(p):
     """choice_list : choice"""
-    e = xml_document.createElement('choices')
+    e = element(p, 'choices')
     e.appendChild(p[1])
     p[0] = e                   
 
@@ -635,7 +717,7 @@ def p_choice1(p):
 # match: choice - 20080711 - xsd
 def p_choice2(p):
     """choice : OTHERS"""
-    e = xml_document.createElement('others')
+    e = element(p, 'others')
     p[0] = e                   
 
 ###############################################################################
@@ -679,7 +761,7 @@ def p_library6(p):
 #-------- use clause - library - 20080904 - xsd
 def p_use_clause1(p):
     """use_clause : LIBRARY ID ';'"""
-    e = xml_document.createElement('useClause')
+    e = element(p, 'useClause')
     e.setAttribute('library', p[2])
     location(p, e)
     p[0] = e
@@ -694,7 +776,7 @@ def p_use_clause2(p):
 #-------- use clause - useList - 20080904 - xsd
 def p_use_list1(p):
     """use_list : use"""
-    e = xml_document.createElement('useClause')
+    e = element(p, 'useClause')
     e.appendChild(p[1])
     p[0] = e
 
@@ -707,7 +789,7 @@ def p_use_list2(p):
 #-------- use clause - use 1dot - 20080708 - xsd
 def p_use1(p):
     """use : USE ID DOT ID ';'"""
-    e = xml_document.createElement('use')
+    e = element(p, 'use')
     e.setAttribute('id', p[2]+p[3]+p[4])
     location(p, e)
     p[0] = e
@@ -715,7 +797,7 @@ def p_use1(p):
 #-------- use clause - use 1dot all - 20081029 - xsd
 def p_use1a(p):
     """use : USE ID DOT ALL ';'"""
-    e = xml_document.createElement('use')
+    e = element(p, 'use')
     e.setAttribute('id', p[2]+p[3]+p[4])
     location(p, e)
     p[0] = e
@@ -723,7 +805,7 @@ def p_use1a(p):
 #-------- use clause - use 2dot - 20080708 - xsd
 def p_use2(p):
     """use : USE ID DOT ID DOT ID ';'"""
-    e = xml_document.createElement('use')
+    e = element(p, 'use')
     e.setAttribute('id', p[2]+p[3]+p[4]+p[5]+p[6])
     location(p, e)
     p[0] = e
@@ -731,7 +813,7 @@ def p_use2(p):
 #-------- use clause - use 2dot all - 20080708 - xsd
 def p_use2a(p):
     """use : USE ID DOT ID DOT ALL ';'"""
-    e = xml_document.createElement('use')
+    e = element(p, 'use')
     e.setAttribute('id', p[2]+p[3]+p[4]+p[5]+p[6])
     location(p, e)
     p[0] = e
@@ -739,7 +821,7 @@ def p_use2a(p):
 #-------- entity unit - 20080809 - xsd
 def p_entity(p):
     """entity : entity_header generic_opt entity1 port_opt declaration_list entity_body_opt entity_tail"""
-    e = xml_document.createElement('entity')
+    e = element(p, 'entity')
     location(p, e, p[1][0])
     e.setAttribute('id', p[1][1])
     if p[2] != None:
@@ -755,7 +837,7 @@ def p_entity(p):
 #-------- entity_header - 20080708 - xsd
 def p_entity_header(p):
     """entity_header : ENTITY ID IS"""
-    p[0] = (p.lineno(1), p[2])
+    p[0] = (location(p, None), p[2])
 
 #-------- entity - eps - 20080708 - xsd
 def p_entity1(p):
@@ -780,7 +862,7 @@ def p_entity_tail(p):
 #-------- architecture unit - 20080924 - xsd
 def p_architecture(p):
     """architecture : architecture_header declaration_list architecture1 BEGIN parallel_stmt_list_opt architecture_tail"""
-    e = xml_document.createElement('architecture')
+    e = element(p, 'architecture')
     location(p, e, p[1][0])
     e.setAttribute('id', p[1][1])
     e.setAttribute('entity', p[1][2])
@@ -793,7 +875,7 @@ def p_architecture(p):
 # - 20080924 - xsd
 def p_architecture_header(p):
     """architecture_header : ARCHITECTURE ID OF ID IS"""
-    p[0] = (p.lineno(1), p[2], p[4])
+    p[0] = (location(p, None), p[2], p[4])
 
 # - 20080924 - xsd
 def p_architecture1(p):
@@ -809,7 +891,7 @@ def p_architecture_tail(p):
 #-------- package unit - 20080930 - xsd
 def p_package(p):
     """package : package_header declaration_list package_tail"""
-    e = xml_document.createElement('package')
+    e = element(p, 'package')
     location(p, e, p[1][0])
     e.setAttribute('id', p[1][1])
     if p[2].hasChildNodes():
@@ -819,7 +901,7 @@ def p_package(p):
 # - 20080930 - xsd
 def p_package_header(p):
     """package_header : PACKAGE ID IS"""
-    p[0] = (p.lineno(1), p[2])
+    p[0] = (location(p, None), p[2])
 
 # - 20080930 - xsd
 def p_package_tail(p):
@@ -829,7 +911,7 @@ def p_package_tail(p):
 #-------- package body unit - 20080930 - xsd
 def p_package_body(p):
     """package_body : package_body_header declaration_list package_body_tail"""
-    e = xml_document.createElement('packageBody')
+    e = element(p, 'packageBody')
     location(p, e, p[1][0])
     e.setAttribute('id', p[1][1])
     if p[2].hasChildNodes():
@@ -839,7 +921,7 @@ def p_package_body(p):
 # - 20080930 - xsd
 def p_package_body_header(p):
     """package_body_header : PACKAGE BODY ID IS"""
-    p[0] = (p.lineno(1), p[3])
+    p[0] = (location(p, None), p[3])
 
 # - 20080930 - xsd
 def p_package_body_tail(p):
@@ -849,7 +931,7 @@ def p_package_body_tail(p):
 #-------- configuration - 20080930 - xsd
 def p_configuration(p):
     """configuration : configuration_header FOR ID config_list configuration_tail"""
-    e = xml_document.createElement('configuration')
+    e = element(p, 'configuration')
     location(p, e, p[1][0])
     e.setAttribute('id', p[1][1])
     e.setAttribute('entity', p[1][2])
@@ -862,7 +944,7 @@ def p_configuration(p):
 # - 20080930 - xsd
 def p_configuration_header(p):
     """configuration_header : CONFIGURATION ID OF ID IS"""
-    p[0] = (p.lineno(1), p[2], p[4])
+    p[0] = (location(p, None), p[2], p[4])
 
 # - 20080930 - xsd
 def p_configuration_tail(p):
@@ -880,7 +962,7 @@ def p_config_list1(p):
 # - 20080930 - xsd
 def p_config_list2(p):
     """config_list : empty"""
-    e = xml_document.createElement('configList')
+    e = element(p, 'configList')
     p[0] = e
 
 #---- block config - 20080930 - xsd
@@ -898,7 +980,7 @@ def p_comp_config(p):
                    | FOR ALL ':' ID comp_configuration END FOR ';'
                    | FOR ID ':' ID comp_entity END FOR ';'
                    | FOR ID ':' ID comp_configuration END FOR ';'"""
-    e = xml_document.createElement('componentConfiguration')
+    e = element(p, 'componentConfiguration')
     location(p, e)
     e.setAttribute('which', p[2])
     e.setAttribute('id', p[4])
@@ -908,7 +990,7 @@ def p_comp_config(p):
 # - 20080930 - xsd
 def p_comp_entity1(p):
     """comp_entity : USE ENTITY ID DOT ID '(' ID ')' map_opt ';' comp_entity_for_opt END FOR ';'"""
-    e = xml_document.createElement('useEntity')
+    e = element(p, 'useEntity')
     e.setAttribute('id', p[3]+p[4]+p[5])
     e.setAttribute('architecture', p[3])
     location(p, e)
@@ -923,7 +1005,7 @@ def p_comp_entity1(p):
 # - 20080930 - xsd
 def p_comp_entity2(p):
     """comp_entity : USE ENTITY ID DOT ID map_opt ';' comp_entity_for_opt END FOR ';'"""
-    e = xml_document.createElement('useEntity')
+    e = element(p, 'useEntity')
     e.setAttribute('id', p[3]+p[4]+p[5])
     location(p, e)
     if p[6][0] != None:
@@ -937,7 +1019,7 @@ def p_comp_entity2(p):
 # - 20080930 - xsd
 def p_comp_entity3(p):
     """comp_entity : USE ENTITY ID '(' ID ')' map_opt ';' comp_entity_for_opt END FOR ';'"""
-    e = xml_document.createElement('useEntity')
+    e = element(p, 'useEntity')
     e.setAttribute('id', p[3])
     e.setAttribute('architecture', p[5])
     location(p, e)
@@ -952,7 +1034,7 @@ def p_comp_entity3(p):
 # - 20080930 - xsd
 def p_comp_entity4(p):
     """comp_entity : USE ENTITY ID map_opt ';' comp_entity_for_opt END FOR ';'"""
-    e = xml_document.createElement('useEntity')
+    e = element(p, 'useEntity')
     e.setAttribute('id', p[3])
     location(p, e)
     if p[4][0] != None:
@@ -979,7 +1061,7 @@ def p_comp_entity_for_opt2(p):
 # - 20080930 - xsd
 def p_comp_configuration1(p):
     """comp_configuration : USE CONFIGURATION ID DOT ID map_opt ';'"""
-    e = xml_document.createElement('useConfiguration')
+    e = element(p, 'useConfiguration')
     e.setAttribute('id', p[3]+p[4]+p[5])
     location(p, e)
     if p[6][0] != None:
@@ -991,7 +1073,7 @@ def p_comp_configuration1(p):
 # - 20080930 - xsd
 def p_comp_configuration2(p):
     """comp_configuration : USE CONFIGURATION ID map_opt ';'"""
-    e = xml_document.createElement('useConfiguration')
+    e = element(p, 'useConfiguration')
     e.setAttribute('id', p[3])
     location(p, e)
     if p[4][0] != None:
@@ -1016,7 +1098,7 @@ def p_declaration_list1(p):
 # - 20080811 - xsd
 def p_declaration_list2(p):
     "declaration_list : empty"
-    e = xml_document.createElement('declarations')
+    e = element(p, 'declarations')
     p[0] = e
 
 # - 20080811 - xsd
@@ -1037,7 +1119,7 @@ def p_declaration(p):
 #-------- Type Declarations - 20080811 - xsd
 def p_decl_type1(p):
     """decl_type : TYPE ID IS decl_type_def"""
-    e = xml_document.createElement('typeDeclaration')
+    e = element(p, 'typeDeclaration')
     location(p, e)
     e.setAttribute('id', p[2])
     e.appendChild(p[4])
@@ -1046,7 +1128,7 @@ def p_decl_type1(p):
 # - 20080811 - xsd
 def p_decl_type2(p):
     """decl_type : SUBTYPE ID IS decl_type_subdef"""
-    e = xml_document.createElement('subtypeDeclaration')
+    e = element(p, 'subtypeDeclaration')
     location(p, e)
     e.setAttribute('id', p[2])
     e.appendChild(p[4][0])
@@ -1061,10 +1143,10 @@ def p_decl_type_def1(p):
 # - 20080811 - xsd
 def p_decl_type_def2(p):
     """decl_type_def : RANGE LITERAL range_dir LITERAL"""
-    e = xml_document.createElement('range')
+    e = element(p, 'range')
     e.setAttribute('direction', p[3])
-    e1 = xml_document.createElement('constantExpression')
-    e2 = xml_document.createElement('constantExpression')
+    e1 = element(p, 'constantExpression')
+    e2 = element(p, 'constantExpression')
     e1.setAttribute('id', p[2])
     e2.setAttribute('id', p[4])
     e.appendChild(e1)
@@ -1074,7 +1156,7 @@ def p_decl_type_def2(p):
 # - 20080811 - xsd
 def p_decl_type_def3(p):
     """decl_type_def : ARRAY '(' decl_type_range_list ')' OF expr"""
-    e = xml_document.createElement('array')
+    e = element(p, 'array')
     e.appendChild(p[3])
     e.appendChild(p[6])
     p[0] = e
@@ -1087,21 +1169,21 @@ def p_decl_type_def4(p):
 # - 20080811 - xsd
 def p_decl_type_def5(p):
     """decl_type_def : ACCESS typeid"""
-    e = xml_document.createElement('access')
+    e = element(p, 'access')
     e.appendChild(p[2])
     p[0] = e
 
 # - 20080811 - xsd
 def p_decl_type_def6(p):
     """decl_type_def : FILE OF typeid"""
-    e = xml_document.createElement('fileOf')
+    e = element(p, 'fileOf')
     e.appendChild(p[3])
     p[0] = e
 
 # - 20080811 - xsd
 def p_id_list1(p):
     "id_list : id_list_item"
-    e = xml_document.createElement('ids')
+    e = element(p, 'ids')
     e.appendChild(p[1])
     p[0] = e
 
@@ -1114,7 +1196,7 @@ def p_id_list2(p):
 # - 20081028 - xsd
 def p_id_list_item(p):
     "id_list_item : ID"
-    e = xml_document.createElement('id')
+    e = element(p, 'id')
     e.setAttribute('id', p[1])
     location(p, e)
     p[0] = e
@@ -1122,14 +1204,14 @@ def p_id_list_item(p):
 # - 20080811 - xsd
 def p_decl_type_range_list1(p):
     """decl_type_range_list : range"""
-    e = xml_document.createElement('rangesTypes')
+    e = element(p, 'rangesTypes')
     e.appendChild(p[1])
     p[0] = e
 
 # - 20080811 - xsd
 def p_decl_type_range_list2(p):
     """decl_type_range_list : typeid"""
-    e = xml_document.createElement('rangesTypes')
+    e = element(p, 'rangesTypes')
     e.appendChild(p[1])
     p[0] = e
 
@@ -1148,7 +1230,7 @@ def p_decl_type_range_list4(p):
 # - 20080811 - xsd
 def p_decl_type_record_item_list1(p):
     """decl_type_record_item_list : decl_type_record_item_list_item ';'"""
-    e = xml_document.createElement('records')
+    e = element(p, 'records')
     e.appendChild(p[1])
     p[0] = e
 
@@ -1161,8 +1243,8 @@ def p_decl_type_record_item_list2(p):
 # - 20081028 - xsd
 def p_decl_type_record_item_list_item(p):
     """decl_type_record_item_list_item : id_list ':' typeid"""
-    e = xml_document.createElement('record')
-    location(p, e, p[1].firstChild.getAttribute('line'))
+    e = element(p, 'record')
+    location(p, e, position(p, p[1].firstChild))
     e.appendChild(p[1])
     e.appendChild(p[3])
     p[0] = e
@@ -1170,7 +1252,7 @@ def p_decl_type_record_item_list_item(p):
 #---- decl_type SUBTYPE definition - 20080811 - xsd
 def p_decl_type_subdef1(p):
     """decl_type_subdef : ID RANGE range ';'"""
-    e = xml_document.createElement('id')
+    e = element(p, 'id')
     e.setAttribute('id', p[1])
     location(p, e)
     p[0] = (e, p[3])
@@ -1178,7 +1260,7 @@ def p_decl_type_subdef1(p):
 # - 20080811 - xsd
 def p_decl_type_subdef2(p):
     """decl_type_subdef : ID typeid ';'"""
-    e = xml_document.createElement('id')
+    e = element(p, 'id')
     e.setAttribute('id', p[1])
     location(p, e)
     p[0] = (e, p[2])
@@ -1186,7 +1268,7 @@ def p_decl_type_subdef2(p):
 # - 20080811 - xsd
 def p_decl_type_subdef3(p):
     """decl_type_subdef : ID '(' range_list ')'"""
-    e = xml_document.createElement('id')
+    e = element(p, 'id')
     e.setAttribute('id', p[1])
     location(p, e)
     p[0] = (e, p[3])
@@ -1195,11 +1277,11 @@ def p_decl_type_subdef3(p):
 #---- constant declaration - 20081028 - xsd
 def p_decl_constant(p):
     "decl_constant : CONSTANT id_list ':' typeid ASSIGN expr"
-    e = xml_document.createElement('constantDeclaration')
+    e = element(p, 'constantDeclaration')
     location(p, e)
     e.appendChild(p[2])
     e.appendChild(p[4])
-    e1 = xml_document.createElement('value')
+    e1 = element(p, 'value')
     e1.appendChild(p[6])
     e.appendChild(e1)
     p[0] = e
@@ -1207,7 +1289,7 @@ def p_decl_constant(p):
 #---- shared variable declaration - 20081028 - xsd
 def p_decl_variable1(p):
     """decl_variable : SHARED VARIABLE id_list ':' typeid assign_expr_opt"""
-    e = xml_document.createElement('variableDeclaration')
+    e = element(p, 'variableDeclaration')
     location(p, e)
     e.appendChild(p[3])
     e.setAttribute('shared', 'true')
@@ -1219,7 +1301,7 @@ def p_decl_variable1(p):
 #---- variable declaration - 20081028 - xsd
 def p_decl_variable2(p):
     """decl_variable : VARIABLE id_list ':' typeid assign_expr_opt"""
-    e = xml_document.createElement('variableDeclaration')
+    e = element(p, 'variableDeclaration')
     location(p, e)
     e.appendChild(p[2])
     e.setAttribute('shared', 'false')
@@ -1231,7 +1313,7 @@ def p_decl_variable2(p):
 #---- signal declaration - 20081028 - xsd
 def p_decl_signal(p):
     """decl_signal : SIGNAL id_list ':' typeid assign_expr_opt"""
-    e = xml_document.createElement('signalDeclaration')
+    e = element(p, 'signalDeclaration')
     location(p, e)
     e.appendChild(p[2])
     e.appendChild(p[4])
@@ -1242,7 +1324,7 @@ def p_decl_signal(p):
 #---- file declaration - 20081029 - xsd
 def p_decl_file0(p):
     """decl_file : FILE id_list ':' typeid"""
-    e = xml_document.createElement('fileDeclaration')
+    e = element(p, 'fileDeclaration')
     location(p, e)
     e.appendChild(p[2])
     e.appendChild(p[4])
@@ -1251,7 +1333,7 @@ def p_decl_file0(p):
 # - 20081028 - xsd
 def p_decl_file1(p):
     """decl_file : FILE id_list ':' typeid IS inout CLITERAL"""
-    e = xml_document.createElement('fileDeclaration')
+    e = element(p, 'fileDeclaration')
     location(p, e)
     e.appendChild(p[2])
     e.appendChild(p[4])
@@ -1262,7 +1344,7 @@ def p_decl_file1(p):
 # - 20081028 - xsd
 def p_decl_file2(p):
     """decl_file : FILE id_list ':' typeid IS OPEN file_open_mode IS CLITERAL"""
-    e = xml_document.createElement('fileDeclaration')
+    e = element(p, 'fileDeclaration')
     location(p, e)
     e.appendChild(p[2])
     e.appendChild(p[4])
@@ -1286,7 +1368,7 @@ def p_file_open_mode(p):
 #---- alias declaration - 20081029 - xsd
 def p_decl_alias(p):
     "decl_alias : ALIAS ID ':' typeid IS id_item"
-    e = xml_document.createElement('aliasDeclaration')
+    e = element(p, 'aliasDeclaration')
     location(p, e)
     e.setAttribute('id', p[2])
     e.appendChild(p[4])
@@ -1296,7 +1378,7 @@ def p_decl_alias(p):
 #---- attribute declaration - 20081029 - xsd
 def p_decl_attrib1(p):
     """decl_attrib : ATTRIBUTE ID ':' typeid"""
-    e = xml_document.createElement('attributeDeclaration')
+    e = element(p, 'attributeDeclaration')
     location(p, e)
     e.setAttribute('id', p[2])
     e.appendChild(p[4])
@@ -1305,7 +1387,7 @@ def p_decl_attrib1(p):
 # - 20081029 - xsd
 def p_decl_attrib2(p):
     """decl_attrib : ATTRIBUTE ID OF decl_attrib_which ':' decl_class IS expr"""
-    e = xml_document.createElement('attributeDeclaration')
+    e = element(p, 'attributeDeclaration')
     location(p, e)
     e.setAttribute('id', p[2])
     e.setAttribute('of', p[4])
@@ -1341,7 +1423,7 @@ def p_decl_class(p):
 def p_decl_component1(p):
     """decl_component : COMPONENT ID generic_opt port_opt END COMPONENT
                       | COMPONENT ID generic_opt port_opt END COMPONENT ID"""
-    e = xml_document.createElement('componentDeclaration')
+    e = element(p, 'componentDeclaration')
     location(p, e)
     e.setAttribute('id', p[2])
     if p[3] != None:
@@ -1354,7 +1436,7 @@ def p_decl_component1(p):
 def p_decl_component3(p):
     """decl_component : COMPONENT ID IS generic_opt port_opt END COMPONENT
                       | COMPONENT ID IS generic_opt port_opt END COMPONENT ID"""
-    e = xml_document.createElement('componentDeclaration')
+    e = element(p, 'componentDeclaration')
     location(p, e)
     e.setAttribute('id', p[2])
     if p[4] != None:
@@ -1366,7 +1448,7 @@ def p_decl_component3(p):
 #---- function declaration - 20081029 - xsd
 def p_decl_function1a(p):
     """decl_function : FUNCTION ID function_decl_opt RETURN typeid function_body_opt"""
-    e = xml_document.createElement('functionDeclaration')
+    e = element(p, 'functionDeclaration')
     location(p, e)
     e.setAttribute('id', p[2])
     e.setAttribute('pure', 'true')
@@ -1383,7 +1465,7 @@ def p_decl_function1a(p):
 # - 20081029 - xsd
 def p_decl_function1b(p):
     """decl_function : PURE FUNCTION ID function_decl_opt RETURN typeid function_body_opt"""
-    e = xml_document.createElement('functionDeclaration')
+    e = element(p, 'functionDeclaration')
     location(p, e)
     e.setAttribute('id', p[3])
     e.setAttribute('pure', 'true')
@@ -1400,7 +1482,7 @@ def p_decl_function1b(p):
 # - 20081029 - xsd
 def p_decl_function2(p):
     """decl_function : IMPURE FUNCTION ID function_decl_opt RETURN typeid function_body_opt"""
-    e = xml_document.createElement('functionDeclaration')
+    e = element(p, 'functionDeclaration')
     location(p, e)
     e.setAttribute('id', p[3])
     e.setAttribute('pure', 'false')
@@ -1445,7 +1527,7 @@ def p_function_body_opt2(p):
 #---- procedure declaration - 20081029 - xsd
 def p_decl_procedure(p):
     "decl_procedure : PROCEDURE ID procedure_decl_opt procedure_body_opt"
-    e = xml_document.createElement('procedureDeclaration')
+    e = element(p, 'procedureDeclaration')
     location(p, e)
     e.setAttribute('id', p[2])
     if p[3] != None: 
@@ -1470,7 +1552,7 @@ def p_procedure_body_opt2(p):
 #---- for declaration - 20080816 - xsd
 def p_decl_for(p):
     "decl_for : FOR decl_for_which ':' ID USE decl_for_ent_conf map_opt ';'"
-    e = xml_document.createElement('forDeclaration')
+    e = element(p, 'forDeclaration')
     location(p, e)
     e.setAttribute('which', p[2])
     e.setAttribute('id', p[4])
@@ -1537,11 +1619,7 @@ def p_expr(p):
             | expr NOR relexpr
             | expr XOR relexpr
             | expr XNOR relexpr"""
-    e = xml_document.createElement('logicalExpression')
-    e.setAttribute('op', p[2])
-    e.appendChild(p[1])
-    e.appendChild(p[3])
-    p[0] = e
+    p[0] = binary_expression(p, 'logicalExpression')
     
 #-------- relexpr - 20080730 - xsd
 def p_relexpr1(p):
@@ -1556,7 +1634,7 @@ def p_relexpr(p):
                | relexpr LE shexpr
                | relexpr GT shexpr
                | relexpr GE shexpr"""
-    e = xml_document.createElement('relationalExpression')
+    e = element(p, 'relationalExpression')
     e.setAttribute('op', p[2])
     e.appendChild(p[1])
     e.appendChild(p[3])
@@ -1575,7 +1653,7 @@ def p_shexpr(p):
                | shexpr SRA sexpr
                | shexpr ROL sexpr
                | shexpr ROR sexpr"""
-    e = xml_document.createElement('shiftExpression')
+    e = element(p, 'shiftExpression')
     e.setAttribute('op', p[2])
     e.appendChild(p[1])
     e.appendChild(p[3])
@@ -1591,11 +1669,7 @@ def p_sexpr(p):
     """sexpr : sexpr '+' mulexpr
              | sexpr '-' mulexpr
              | sexpr '&' mulexpr"""
-    e = xml_document.createElement('addingExpression')
-    e.setAttribute('op', p[2])
-    e.appendChild(p[1])
-    e.appendChild(p[3])
-    p[0] = e
+    p[0] = binary_expression(p, 'addingExpression')
 
 #-------- mulexpr - 20080730 - xsd
 def p_mulexpr1(p):
@@ -1608,11 +1682,7 @@ def p_mulexpr(p):
                | mulexpr '/' expexpr
                | mulexpr MOD expexpr
                | mulexpr REM expexpr"""
-    e = xml_document.createElement('multiplyingExpression')
-    e.setAttribute('op', p[2])
-    e.appendChild(p[1])
-    e.appendChild(p[3])
-    p[0] = e
+    p[0] = binary_expression(p, 'multiplyingExpression')
 
 #-------- expexpr - 20080730 - xsd
 def p_expexpr1(p):
@@ -1622,7 +1692,7 @@ def p_expexpr1(p):
 #-------- expexpr - 20080730 - xsd
 def p_expexpr2(p):
     """expexpr : expexpr EXPSIGN factor"""
-    e = xml_document.createElement('exponentialExpression')
+    e = element(p, 'exponentialExpression')
     e.setAttribute('op', p[2])
     e.appendChild(p[1])
     e.appendChild(p[3])
@@ -1632,7 +1702,7 @@ def p_expexpr2(p):
 def p_factor1(p):
     """factor : '+' prim
               | '-' prim"""
-    e = xml_document.createElement('prefixExpression')
+    e = element(p, 'prefixExpression')
     e.setAttribute('op', p[1])
     e.appendChild(p[2])
     p[0] = e
@@ -1646,7 +1716,7 @@ def p_factor2(p):
 def p_factor3(p):
     """factor : NOT prim
               | ABS prim"""
-    e = xml_document.createElement('prefixExpression')
+    e = element(p, 'prefixExpression')
     e.setAttribute('op', p[1])
     e.appendChild(p[2])
     p[0] = e
@@ -1654,7 +1724,7 @@ def p_factor3(p):
 #-------- prim - 20081015 - xsd
 def p_prim0(p):
     "prim : CLITERAL"
-    e = xml_document.createElement('constantExpression')
+    e = element(p, 'constantExpression')
     e.setAttribute('id', p[1])
     location(p, e)
     p[0] = e
@@ -1662,7 +1732,7 @@ def p_prim0(p):
 # - 20080711 - xsd
 def p_prim1(p):
     "prim : LITERAL"
-    e = xml_document.createElement('constantExpression')
+    e = element(p, 'constantExpression')
     e.setAttribute('id', p[1])
     location(p, e)
     p[0] = e
@@ -1675,7 +1745,7 @@ def p_prim2(p):
 # - 20080711 - xsd
 def p_prim3(p):
     """prim : NEW ID"""
-    e = xml_document.createElement('newExpression')
+    e = element(p, 'newExpression')
     e.setAttribute('id', p[2])
     location(p, e)
     p[0] = e
@@ -1683,10 +1753,10 @@ def p_prim3(p):
 # - 20080711 - xsd
 def p_prim4(p):
     """prim : NEW ID APOSTROPHE '(' expr ')'"""
-    e = xml_document.createElement('newExpression')
+    e = element(p, 'newExpression')
     e.setAttribute('id', p[2])
     location(p, e)
-    e1 = xml_document.createElement('attribute')
+    e1 = element(p, 'attribute')
     e.appendChild(e1)
     e1.appendChild(p[5])
     p[0] = e
@@ -1714,7 +1784,7 @@ def p_choice_expr_list2(p):
 #---- choice to expression list - 20080811 - xsd
 def p_choice_expr_list1(p):
     "choice_expr_list : choice_expr_list_item"
-    e = xml_document.createElement('aggregateExpression')
+    e = element(p, 'aggregateExpression')
     e.appendChild(p[1])
     p[0] = e
 
@@ -1725,7 +1795,7 @@ def p_choice_expr_list3(p):
         p[1].appendChild(p[3])
         p[0] = p[1]
     else:
-        e = xml_document.createElement('aggregateExpression')
+        e = element(p, 'aggregateExpression')
         e.appendChild(p[1])
         e.appendChild(p[3])
         p[0] = e
@@ -1737,7 +1807,7 @@ def p_choice_expr_list4(p):
         p[1].appendChild(p[3])
         p[0] = p[1]
     else:
-        e = xml_document.createElement('aggregateExpression')
+        e = element(p, 'aggregateExpression')
         e.appendChild(p[1])
         e.appendChild(p[3])
         p[0] = e
@@ -1745,7 +1815,7 @@ def p_choice_expr_list4(p):
 #---- choice to expression list: item - 20080804 - xsd
 def p_choice_expr_list_item(p):
     "choice_expr_list_item : choice_list CONNECT expr"
-    e = xml_document.createElement('connect')
+    e = element(p, 'connect')
     e.appendChild(p[1])
     e.appendChild(p[3])
     p[0] = e
@@ -1758,8 +1828,8 @@ def p_parid1(p):
 #---- key parameter (or index) - 20080821 - xsd
 def p_parid2(p):
     """parid : ID CONNECT expr"""
-    e = xml_document.createElement('connect')
-    e1 = xml_document.createElement('id')
+    e = element(p, 'connect')
+    e1 = element(p, 'id')
     e1.setAttribute('id', p[1])
     e.appendChild(e1)
     e.appendChild(p[3])
@@ -1788,13 +1858,13 @@ def p_sequential_stmt_list_opt1(p):
 #-------- 20080725 - xsd
 def p_sequential_stmt_list_opt2(p):
     """sequential_stmt_list_opt : empty"""
-    e = xml_document.createElement('sequentialStatements')
+    e = element(p, 'sequentialStatements')
     p[0] = e
 
 #-------- 20080725 - xsd
 def p_sequential_stmt_list1(p):
     "sequential_stmt_list : sequential_stmt ';'"
-    e = xml_document.createElement('sequentialStatements')
+    e = element(p, 'sequentialStatements')
     e.appendChild(p[1])
     p[0] = e
 
@@ -1825,15 +1895,15 @@ def p_sequential_stmt(p):
 #---- seq statement wait - 20080924 - xsd
 def p_seq_stmt_wait1(p):
     """seq_stmt_wait : WAIT ON id_list UNTIL expr FOR expr"""
-    e = xml_document.createElement('waitSequentialStatement')
+    e = element(p, 'waitSequentialStatement')
     location(p, e)
-    e1 = xml_document.createElement(p[2])
+    e1 = element(p, p[2])
     e1.appendChild(p[3])
     e.appendChild(e1)
-    e2 = xml_document.createElement(p[4])
+    e2 = element(p, p[4])
     e2.appendChild(p[5])
     e.appendChild(e2)
-    e3 = xml_document.createElement(p[6])
+    e3 = element(p, p[6])
     e3.appendChild(p[7])
     e.appendChild(e3)
     p[0] = e
@@ -1843,12 +1913,12 @@ def p_seq_stmt_wait2(p):
     """seq_stmt_wait : WAIT ON id_list UNTIL expr
                      | WAIT ON id_list FOR expr
                      | WAIT UNTIL expr FOR expr"""
-    e = xml_document.createElement('waitSequentialStatement')
+    e = element(p, 'waitSequentialStatement')
     location(p, e)
-    e1 = xml_document.createElement(p[2])
+    e1 = element(p, p[2])
     e1.appendChild(p[3])
     e.appendChild(e1)
-    e2 = xml_document.createElement(p[4])
+    e2 = element(p, p[4])
     e2.appendChild(p[5])
     e.appendChild(e2)
     p[0] = e
@@ -1858,9 +1928,9 @@ def p_seq_stmt_wait3(p):
     """seq_stmt_wait : WAIT ON id_list
                      | WAIT UNTIL expr
                      | WAIT FOR expr"""
-    e = xml_document.createElement('waitSequentialStatement')
+    e = element(p, 'waitSequentialStatement')
     location(p, e)
-    e1 = xml_document.createElement(p[2])
+    e1 = element(p, p[2])
     e1.appendChild(p[3])
     e.appendChild(e1)
     p[0] = e
@@ -1868,14 +1938,14 @@ def p_seq_stmt_wait3(p):
 # - 20080924 - xsd
 def p_seq_stmt_wait4(p):
     """seq_stmt_wait : WAIT"""
-    e = xml_document.createElement('waitSequentialStatement')
+    e = element(p, 'waitSequentialStatement')
     location(p, e)
     p[0] = e
 
 #---- seq statement assert - 20080923 - xsd
 def p_seq_stmt_assert1(p):
     """seq_stmt_assert : ASSERT expr REPORT CLITERAL severity"""
-    e = xml_document.createElement('assertSequentialStatement')
+    e = element(p, 'assertSequentialStatement')
     location(p, e)
     e.appendChild(p[2])
     e.setAttribute('report', p[4])
@@ -1885,7 +1955,7 @@ def p_seq_stmt_assert1(p):
 # - 20080923 - xsd
 def p_seq_stmt_assert2(p):
     """seq_stmt_assert : ASSERT expr REPORT CLITERAL"""
-    e = xml_document.createElement('assertSequentialStatement')
+    e = element(p, 'assertSequentialStatement')
     location(p, e)
     e.appendChild(p[2])
     e.setAttribute('report', p[4])
@@ -1894,7 +1964,7 @@ def p_seq_stmt_assert2(p):
 # - 20080923 - xsd
 def p_seq_stmt_assert3(p):
     """seq_stmt_assert : ASSERT expr severity"""
-    e = xml_document.createElement('assertSequentialStatement')
+    e = element(p, 'assertSequentialStatement')
     location(p, e)
     e.appendChild(p[2])
     e.setAttribute('severity', p[3])
@@ -1903,7 +1973,7 @@ def p_seq_stmt_assert3(p):
 # - 20080923 - xsd
 def p_seq_stmt_assert4(p):
     """seq_stmt_assert : ASSERT expr"""
-    e = xml_document.createElement('assertSequentialStatement')
+    e = element(p, 'assertSequentialStatement')
     location(p, e)
     e.appendChild(p[2])
     p[0] = e
@@ -1920,7 +1990,7 @@ def p_severity(p):
 def p_seq_stmt_report(p):
     """seq_stmt_report : REPORT CLITERAL severity
                        | REPORT CLITERAL"""
-    e = xml_document.createElement('reportSequentialStatement')
+    e = element(p, 'reportSequentialStatement')
     location(p, e)
     e.setAttribute('report', p[2])
     if p[3] != None:
@@ -1930,13 +2000,13 @@ def p_seq_stmt_report(p):
 #---- seq statement signal assign - 20081029 - xsd
 def p_seq_stmt_assign1(p):
     "seq_stmt_assign : target LE delay_mechanism expr_list"
-    e = xml_document.createElement('signalAssignSequentialStatement')
-    location(p, e, getLineTarget(p[1]))
+    e = element(p, 'signalAssignSequentialStatement')
+    location(p, e, getLineTarget(p, p[1]))
     e.appendChild(p[1])
     e.setAttribute('delay', p[3][0])
     if p[3][1] != None:
         e.appendChild(p[3][1])
-    e1 = xml_document.createElement('signalValue')
+    e1 = element(p, 'signalValue')
     e1.appendChild(p[4])
     e.appendChild(e1)
     p[0] = e
@@ -1944,10 +2014,10 @@ def p_seq_stmt_assign1(p):
 # - 20081029 - xsd
 def p_seq_stmt_assign2(p):
     """seq_stmt_assign : target LE expr_list"""
-    e = xml_document.createElement('signalAssignSequentialStatement')
-    location(p, e, getLineTarget(p[1]))
+    e = element(p, 'signalAssignSequentialStatement')
+    location(p, e, getLineTarget(p, p[1]))
     e.appendChild(p[1])
-    e1 = xml_document.createElement('signalValue')
+    e1 = element(p, 'signalValue')
     e1.appendChild(p[3])
     e.appendChild(e1)
     p[0] = e
@@ -1955,8 +2025,8 @@ def p_seq_stmt_assign2(p):
 #---- seq statement variable assign - 20081029 - xsd
 def p_seq_stmt_varassign(p):
     "seq_stmt_varassign : target ASSIGN expr"
-    e = xml_document.createElement('variableAssignSequentialStatement')
-    location(p, e, getLineTarget(p[1]))
+    e = element(p, 'variableAssignSequentialStatement')
+    location(p, e, getLineTarget(p, p[1]))
     e.appendChild(p[1])
     e.appendChild(p[3])
     p[0] = e
@@ -1979,7 +2049,7 @@ def p_seq_stmt_if1(p):
     e = p[7]
     location(p, e)
     e.setAttribute('label', p[1])
-    e1 = xml_document.createElement('then')
+    e1 = element(p, 'then')
     e1.appendChild(p[6])
     e.insertBefore(e1, e.firstChild)
     e.insertBefore(p[4], e.firstChild)
@@ -1993,7 +2063,7 @@ def p_seq_stmt_if2(p):
                    | IF expr THEN sequential_stmt_list seq_stmt_elsif_list_opt seq_stmt_else_opt END IF"""
     e = p[5]
     location(p, e)
-    e1 = xml_document.createElement('then')
+    e1 = element(p, 'then')
     e1.appendChild(p[4])
     e.insertBefore(e1, e.firstChild)
     e.insertBefore(p[2], e.firstChild)
@@ -2009,13 +2079,13 @@ def p_seq_stmt_elsif_list_opt1(p):
 # - 20080924 - xsd
 def p_seq_stmt_elsif_list_opt2(p):
     """seq_stmt_elsif_list_opt : empty"""
-    e = xml_document.createElement('ifSequentialStatement')
+    e = element(p, 'ifSequentialStatement')
     p[0] = e
 
 # - 20080924 - xsd
 def p_seq_stmt_elsif_list1(p):
     "seq_stmt_elsif_list : seq_stmt_elsif"
-    e = xml_document.createElement('ifSequentialStatement')
+    e = element(p, 'ifSequentialStatement')
     e.appendChild(p[1])
     p[0] = e
 
@@ -2028,9 +2098,9 @@ def p_seq_stmt_elsif_list2(p):
 # - 20080924 - xsd
 def p_seq_stmt_elsif(p):
     "seq_stmt_elsif : ELSIF expr THEN sequential_stmt_list"
-    e = xml_document.createElement('elseif')
+    e = element(p, 'elseif')
     e.appendChild(p[2])
-    e1 = xml_document.createElement('then')
+    e1 = element(p, 'then')
     e1.appendChild(p[4])
     e.appendChild(e1)
     p[0] = e
@@ -2038,7 +2108,7 @@ def p_seq_stmt_elsif(p):
 # - 20080924 - xsd
 def p_seq_stmt_else_opt1(p):
     """seq_stmt_else_opt : ELSE sequential_stmt_list"""
-    e = xml_document.createElement('else')
+    e = element(p, 'else')
     e.appendChild(p[2])
     p[0] = e
 
@@ -2067,7 +2137,7 @@ def p_seq_stmt_case2(p):
 # - 20080924 - xsd
 def p_seq_stmt_case_when_list1(p):
     """seq_stmt_case_when_list : seq_stmt_case_when_list_item"""
-    e = xml_document.createElement('caseSequentialStatement')
+    e = element(p, 'caseSequentialStatement')
     e.appendChild(p[1])
     p[0] = e
 
@@ -2080,7 +2150,7 @@ def p_seq_stmt_case_when_list2(p):
 # - 20080924 - xsd
 def p_seq_stmt_case_when_list_item(p):
     """seq_stmt_case_when_list_item : WHEN choice_list CONNECT sequential_stmt_list"""
-    e = xml_document.createElement('case')
+    e = element(p, 'case')
     e.appendChild(p[2])
     e.appendChild(p[4])
     p[0] = e
@@ -2088,7 +2158,7 @@ def p_seq_stmt_case_when_list_item(p):
 #---- seq statement while - 20080923 - xsd
 def p_seq_stmt_while1(p):
     """seq_stmt_while : ID ':' WHILE expr LOOP sequential_stmt_list END LOOP ID"""
-    e = xml_document.createElement('whileSequentialStatement')
+    e = element(p, 'whileSequentialStatement')
     e.setAttribute('label', p[1])
     location(p, e)
     e.appendChild(p[4])
@@ -2098,7 +2168,7 @@ def p_seq_stmt_while1(p):
 # - 20080923 - xsd
 def p_seq_stmt_while2(p):
     """seq_stmt_while : ID ':' LOOP sequential_stmt_list END LOOP ID"""
-    e = xml_document.createElement('whileSequentialStatement')
+    e = element(p, 'whileSequentialStatement')
     e.setAttribute('label', p[1])
     location(p, e)
     e.appendChild(p[4])
@@ -2107,7 +2177,7 @@ def p_seq_stmt_while2(p):
 # - 20080923 - xsd
 def p_seq_stmt_while3(p):
     """seq_stmt_while : WHILE expr LOOP sequential_stmt_list END LOOP"""
-    e = xml_document.createElement('whileSequentialStatement')
+    e = element(p, 'whileSequentialStatement')
     location(p, e)
     e.appendChild(p[2])
     e.appendChild(p[4])
@@ -2116,7 +2186,7 @@ def p_seq_stmt_while3(p):
 # - 20080923 - xsd
 def p_seq_stmt_while4(p):
     """seq_stmt_while : LOOP sequential_stmt_list END LOOP"""
-    e = xml_document.createElement('whileSequentialStatement')
+    e = element(p, 'whileSequentialStatement')
     location(p, e)
     e.appendChild(p[2])
     p[0] = e
@@ -2125,7 +2195,7 @@ def p_seq_stmt_while4(p):
 def p_seq_stmt_for1(p):
     """seq_stmt_for : ID ':' FOR ID IN range LOOP sequential_stmt_list END LOOP ID
                     | ID ':' FOR ID IN range LOOP sequential_stmt_list END LOOP"""
-    e = xml_document.createElement('forSequentialStatement')
+    e = element(p, 'forSequentialStatement')
     location(p, e)
     e.setAttribute('label', p[1])
     e.setAttribute('id', p[4])
@@ -2136,7 +2206,7 @@ def p_seq_stmt_for1(p):
 # - 20080923 - xsd
 def p_seq_stmt_for2(p):
     """seq_stmt_for : FOR ID IN range LOOP sequential_stmt_list END LOOP"""
-    e = xml_document.createElement('forSequentialStatement')
+    e = element(p, 'forSequentialStatement')
     location(p, e)
     e.setAttribute('id', p[2])
     e.appendChild(p[4])
@@ -2147,7 +2217,7 @@ def p_seq_stmt_for2(p):
 def p_seq_stmt_next1(p):
     """seq_stmt_next : NEXT ID WHEN expr
                      | NEXT ID"""
-    e = xml_document.createElement('nextSequentialStatement')
+    e = element(p, 'nextSequentialStatement')
     location(p, e)
     e.setAttribute('label', p[2])
     if p[4] != None:
@@ -2158,7 +2228,7 @@ def p_seq_stmt_next1(p):
 def p_seq_stmt_next2(p):
     """seq_stmt_next : NEXT WHEN expr
                      | NEXT"""
-    e = xml_document.createElement('nextSequentialStatement')
+    e = element(p, 'nextSequentialStatement')
     location(p, e)
     if p[3] != None:
         e.appendChild(p[3])
@@ -2168,7 +2238,7 @@ def p_seq_stmt_next2(p):
 def p_seq_stmt_exit1(p):
     """seq_stmt_exit : EXIT ID WHEN expr
                      | EXIT ID"""
-    e = xml_document.createElement('exitSequentialStatement')
+    e = element(p, 'exitSequentialStatement')
     location(p, e)
     e.setAttribute('label', p[2])
     if p[4] != None:
@@ -2179,7 +2249,7 @@ def p_seq_stmt_exit1(p):
 def p_seq_stmt_exit2(p):
     """seq_stmt_exit : EXIT WHEN expr
                      | EXIT"""
-    e = xml_document.createElement('exitSequentialStatement')
+    e = element(p, 'exitSequentialStatement')
     location(p, e)
     if p[3] != None:
         e.appendChild(p[3])
@@ -2189,7 +2259,7 @@ def p_seq_stmt_exit2(p):
 def p_seq_stmt_return(p):
     """seq_stmt_return : RETURN expr
                        | RETURN"""
-    e = xml_document.createElement('returnSequentialStatement')
+    e = element(p, 'returnSequentialStatement')
     location(p, e)
     if p[2] != None:
         e.appendChild(p[2])
@@ -2198,7 +2268,7 @@ def p_seq_stmt_return(p):
 #---- seq statement null - 20080923 - xsd
 def p_seq_stmt_null(p):
     "seq_stmt_null : NULL"
-    e = xml_document.createElement('nullSequentialStatement')
+    e = element(p, 'nullSequentialStatement')
     location(p, e)
     p[0] = e
 
@@ -2218,7 +2288,7 @@ def p_parallel_stmt_list_opt2(p):
 #-------- parallel statement list - 20080722 - xsd
 def p_parallel_stmt_list1(p):
     """parallel_stmt_list : parallel_stmt ';'"""
-    e = xml_document.createElement('parallelStatements')
+    e = element(p, 'parallelStatements')
     e.appendChild(p[1])
     p[0] = e
 
@@ -2248,7 +2318,7 @@ def p_parallel_stmt(p):
 #---- parallel statement block - 20080820 - xsd
 def p_par_stmt_block(p):
     "par_stmt_block : ID ':' BLOCK is_opt par_generic_opt par_port_opt declaration_list BEGIN parallel_stmt_list_opt END BLOCK id_opt"
-    e = xml_document.createElement('blockParallelStatement')
+    e = element(p, 'blockParallelStatement')
     e.setAttribute('label', p[1])
     location(p, e)
     if p[5] != None:
@@ -2286,7 +2356,7 @@ def p_par_port_opt2(p):
 #---- parallel statement process - 20080919 - xsd
 def p_par_stmt_process1a(p):
     "par_stmt_process : POSTPONED PROCESS process_sens_list_opt declaration_list BEGIN sequential_stmt_list_opt END postponed_opt PROCESS id_opt"
-    e = xml_document.createElement('processParallelStatement')
+    e = element(p, 'processParallelStatement')
     location(p, e)
     e.setAttribute('postponed', 'true')
     if p[3] != None:
@@ -2300,7 +2370,7 @@ def p_par_stmt_process1a(p):
 #- 20080919 - xsd
 def p_par_stmt_process1b(p):
     "par_stmt_process : PROCESS process_sens_list_opt declaration_list BEGIN sequential_stmt_list_opt END postponed_opt PROCESS id_opt"
-    e = xml_document.createElement('processParallelStatement')
+    e = element(p, 'processParallelStatement')
     location(p, e)
     e.setAttribute('postponed', 'false')
     if p[2] != None:
@@ -2314,7 +2384,7 @@ def p_par_stmt_process1b(p):
 #-------- 20080904 - xsd
 def p_par_stmt_process2(p):
     "par_stmt_process : ID ':' postponed_opt PROCESS process_sens_list_opt declaration_list BEGIN sequential_stmt_list_opt END postponed_opt PROCESS id_opt"
-    e = xml_document.createElement('processParallelStatement')
+    e = element(p, 'processParallelStatement')
     e.setAttribute('label', p[1])
     location(p, e)
     if p[3] != None:
@@ -2435,7 +2505,7 @@ def p_par_stmt_assign4(p):
     "par_stmt_assign : par_stmt_assign_part"
     e = p[1][1]
     e.setAttribute('postponed', 'false')
-    location(p, e, getLineTarget(p[1][0]))
+    location(p, e, getLineTarget(p, p[1][0]))
     e.insertBefore(p[1][0], e.firstChild)
     p[0] = e
 
@@ -2453,14 +2523,14 @@ def p_par_stmt_assign_part1ab(p):
 #---- assign expr - 20080904 - xsd
 def p_par_stmt_assign_expr1(p):
     "par_stmt_assign_expr : signal_value"
-    e = xml_document.createElement('assignParallelStatement')
+    e = element(p, 'assignParallelStatement')
     e.appendChild(p[1])
     p[0] = e
 
 #- 20080904 - xsd
 def p_par_stmt_assign_expr2a(p):
     "par_stmt_assign_expr : signal_value WHEN expr ELSE par_stmt_assign_expr"
-    e = xml_document.createElement('when')
+    e = element(p, 'when')
     e.appendChild(p[3])
     p[1].appendChild(e)
     p[5].insertBefore(p[1], p[5].firstChild)  
@@ -2469,22 +2539,22 @@ def p_par_stmt_assign_expr2a(p):
 #---- signal value - 20080904 - xsd
 def p_signal_value(p):
     """signal_value : expr_list"""
-    e = xml_document.createElement('signalValue')
+    e = element(p, 'signalValue')
     e.appendChild(p[1])
     p[0] = e
 
 #- 20080904 - xsd
 def p_signal_value1(p):
     """signal_value : UNAFFECTED"""
-    e = xml_document.createElement('signalValue')
-    e1 = xml_document.createElement(p[1])
+    e = element(p, 'signalValue')
+    e1 = element(p, p[1])
     e.appendChild(e1)
     p[0] = e
 
 #---- parallel statement assert - 20080910 - xsd
 def p_par_stmt_assert1(p):
     """par_stmt_assert : ID ':' POSTPONED ASSERT expr report_opt severity_opt"""
-    e = xml_document.createElement('assertParallelStatement')
+    e = element(p, 'assertParallelStatement')
     e.setAttribute('label', p[1])
     e.setAttribute('postponed', 'true')
     location(p, e)
@@ -2498,7 +2568,7 @@ def p_par_stmt_assert1(p):
 # - 20080910 - xsd
 def p_par_stmt_assert2(p):
     """par_stmt_assert : ID ':' ASSERT expr report_opt severity_opt"""
-    e = xml_document.createElement('assertParallelStatement')
+    e = element(p, 'assertParallelStatement')
     e.setAttribute('label', p[1])
     e.setAttribute('postponed', 'false')
     location(p, e)
@@ -2512,7 +2582,7 @@ def p_par_stmt_assert2(p):
 # - 20080910 - xsd
 def p_par_stmt_assert3(p):
     """par_stmt_assert : POSTPONED ASSERT expr report_opt severity_opt"""
-    e = xml_document.createElement('assertParallelStatement')
+    e = element(p, 'assertParallelStatement')
     e.setAttribute('postponed', 'true')
     location(p, e)
     e.appendChild(p[3])
@@ -2525,7 +2595,7 @@ def p_par_stmt_assert3(p):
 # - 20080910 - xsd
 def p_par_stmt_assert4(p):
     """par_stmt_assert : ASSERT expr report_opt severity_opt"""
-    e = xml_document.createElement('assertParallelStatement')
+    e = element(p, 'assertParallelStatement')
     e.setAttribute('postponed', 'false')
     location(p, e)
     e.appendChild(p[2])
@@ -2637,7 +2707,7 @@ def p_name2(p):
 # - 20081016 - xsd
 def p_attribute_selection1(p):
     "attribute_selection : APOSTROPHE ID"
-    e = xml_document.createElement('attribute')
+    e = element(p, 'attribute')
     e.setAttribute('id', p[2])
     location(p, e)
     p[0] = e
@@ -2645,7 +2715,7 @@ def p_attribute_selection1(p):
 # - 20081016 - xsd
 def p_attribute_selection2(p):
     "attribute_selection : APOSTROPHE ID '(' expr ')'"
-    e = xml_document.createElement('attribute')
+    e = element(p, 'attribute')
     e.setAttribute('id', p[2])
     location(p, e)
     e.appendChild(p[4])
@@ -2679,7 +2749,7 @@ def p_id_object2(p):
         p[1].appendChild(p[3])
         p[0] = p[1]
     else:
-        e = xml_document.createElement('recordExpression')
+        e = element(p, 'recordExpression')
         e.appendChild(p[1])
         e.appendChild(p[3])
         p[0] = e
@@ -2698,7 +2768,7 @@ def p_suffix2(p):
     # CLITERAL is a simple string, like "Hello" or whatever
     """suffix : CLITERAL
               | ALL"""
-    e = xml_document.createElement('suffix')
+    e = element(p, 'suffix')
     e.setAttribute('id', p[1])
     location(p, e)
     p[0] = e
@@ -2725,7 +2795,7 @@ def p_id_item2(p):
 # - 20081015 - xsd
 def p_id_item3(p):
     "id_item : ID"
-    e = xml_document.createElement('objectExpression')
+    e = element(p, 'objectExpression')
     e.setAttribute('id', p[1])
     location(p, e)
     p[0] = e
@@ -2733,7 +2803,7 @@ def p_id_item3(p):
 # - 20081009 - xsd
 def p_expressions1(p):
     "expressions_or_parameters : parid"
-    e = xml_document.createElement('parameters')
+    e = element(p, 'parameters')
     e.appendChild(p[1])
     p[0] = e
 
@@ -2756,7 +2826,7 @@ def p_aggregate(p):
 # - 20081024 - xsd
 def p_element_association_list1(p):
     "element_association_list : element_association"
-    e = xml_document.createElement('aggregateExpression')
+    e = element(p, 'aggregateExpression')
     e.appendChild(p[1])
     p[0] = e 
 
@@ -2811,15 +2881,15 @@ def p_delay_mechanism2(p):
 # - 20080920 - xsd
 def p_delay_mechanism3(p):
     "delay_mechanism : REJECT time INERTIAL"
-    e = xml_document.createElement('reject')
+    e = element(p, 'reject')
     e.appendChild(p[2])
     p[0] = (p[3], e)
 
 # selected_waveforms ::= waveform WHEN choices { , waveform WHEN choices } - 20080923 - xsd
 def p_selected_waveforms1(p):
     "selected_waveforms : waveform WHEN choice_list"
-    e = xml_document.createElement('selectParallelStatement')
-    e1 = xml_document.createElement('when')
+    e = element(p, 'selectParallelStatement')
+    e1 = element(p, 'when')
     e1.appendChild(p[3])
     p[1].appendChild(e1)
     e.appendChild(p[1])
@@ -2828,7 +2898,7 @@ def p_selected_waveforms1(p):
 # - 20080923 - xsd
 def p_selected_waveforms2(p):
     "selected_waveforms : selected_waveforms ',' waveform WHEN choice_list"
-    e = xml_document.createElement('when')
+    e = element(p, 'when')
     e.appendChild(p[5])
     p[3].appendChild(e)
     p[1].appendChild(p[3])
@@ -2840,22 +2910,22 @@ def p_selected_waveforms2(p):
 #     | unaffected
 def p_waveform1(p):
     "waveform : waveform_element_list"
-    e = xml_document.createElement('signalValue')
+    e = element(p, 'signalValue')
     e.appendChild(p[1])
     p[0] = e
 
 # - 20080923 - xsd
 def p_waveform2(p):
     "waveform : UNAFFECTED"
-    e = xml_document.createElement('signalValue')
-    e1 = xml_document.createElement(p[1])
+    e = element(p, 'signalValue')
+    e1 = element(p, p[1])
     e.appendChild(e1)
     p[0] = e
 
 # - 20080923 - xsd
 def p_waveform_element_list1(p): # stejne jako expr_list az na waveform_element2
     "waveform_element_list : waveform_element"
-    e = xml_document.createElement('expressions')
+    e = element(p, 'expressions')
     e.appendChild(p[1])
     p[0] = e
 
@@ -2877,12 +2947,12 @@ def p_waveform_element1(p):
 # - 20080923 - xsd
 def p_waveform_element2(p):
     "waveform_element : NULL expr_list_after_opt"
-    e1 = xml_document.createElement('null')
+    e1 = element(p, 'null')
     if p[2] == None:
         p[0] = e1
         location(p, e1)
     else:
-        e = xml_document.createElement('afterExpression')
+        e = element(p, 'afterExpression')
         location(p, e)
         e.appendChild(e1)
         e.appendChild(p[2][0])
@@ -2891,7 +2961,7 @@ def p_waveform_element2(p):
 # - 20081024 - xsd
 def p_par_stmt_comp(p):
     "par_stmt_comp : ID ':' ID map_forced"
-    e = xml_document.createElement('componentParallelStatement')
+    e = element(p, 'componentParallelStatement')
     e.setAttribute('label', p[1])
     e.setAttribute('id', p[3])
     location(p, e)
@@ -2904,7 +2974,7 @@ def p_par_stmt_comp(p):
 #---- parallel statement entity (VHDL93) - 20080919 - xsd
 def p_par_stmt_entity1(p):
     """par_stmt_entity : ID ':' ENTITY ID DOT ID '(' ID ')' map_opt"""
-    e = xml_document.createElement('entityParallelStatement')
+    e = element(p, 'entityParallelStatement')
     e.setAttribute('label', p[1])
     e.setAttribute('id', p[4]+p[5]+p[6])
     e.setAttribute('architecture', p[8])
@@ -2918,7 +2988,7 @@ def p_par_stmt_entity1(p):
 #---- parallel statement entity (VHDL93) - 20080919 - xsd
 def p_par_stmt_entity2(p):
     """par_stmt_entity : ID ':' ENTITY ID DOT ID map_opt"""
-    e = xml_document.createElement('entityParallelStatement')
+    e = element(p, 'entityParallelStatement')
     e.setAttribute('label', p[1])
     e.setAttribute('id', p[4]+p[5]+p[6])
     location(p, e)
@@ -2931,7 +3001,7 @@ def p_par_stmt_entity2(p):
 #---- parallel statement entity (VHDL93) - 20080919 - xsd
 def p_par_stmt_entity3(p):
     """par_stmt_entity : ID ':' ENTITY ID '(' ID ')' map_opt"""
-    e = xml_document.createElement('entityParallelStatement')
+    e = element(p, 'entityParallelStatement')
     e.setAttribute('label', p[1])
     e.setAttribute('id', p[4])
     e.setAttribute('architecture', p[6])
@@ -2945,7 +3015,7 @@ def p_par_stmt_entity3(p):
 #---- parallel statement entity (VHDL93) - 20080919 - xsd
 def p_par_stmt_entity4(p):
     """par_stmt_entity : ID ':' ENTITY ID map_opt"""
-    e = xml_document.createElement('entityParallelStatement')
+    e = element(p, 'entityParallelStatement')
     e.setAttribute('label', p[1])
     e.setAttribute('id', p[4])
     location(p, e)
@@ -2958,7 +3028,7 @@ def p_par_stmt_entity4(p):
 #---- parallel statement configuriaton (VHDL93) - 20080919 - xsd
 def p_par_stmt_configuration1(p):
     """par_stmt_configuration : ID ':' CONFIGURATION ID DOT ID map_opt"""
-    e = xml_document.createElement('configurationParallelStatement')
+    e = element(p, 'configurationParallelStatement')
     e.setAttribute('label', p[1])
     e.setAttribute('id', p[4]+p[5]+p[6])
     location(p, e)
@@ -2971,7 +3041,7 @@ def p_par_stmt_configuration1(p):
 #---- parallel statement configuration (VHDL93) - 20080919 - xsd
 def p_par_stmt_configuration2(p):
     """par_stmt_configuration : ID ':' CONFIGURATION ID map_opt"""
-    e = xml_document.createElement('configurationParallelStatement')
+    e = element(p, 'configurationParallelStatement')
     e.setAttribute('label', p[1])
     e.setAttribute('id', p[4])
     location(p, e)
@@ -2985,12 +3055,12 @@ def p_par_stmt_configuration2(p):
 def p_par_stmt_if(p):
     """par_stmt_if : ID ':' IF expr GENERATE parallel_stmt_list_opt END GENERATE ID
                    | ID ':' IF expr GENERATE parallel_stmt_list_opt END GENERATE"""
-    e = xml_document.createElement('ifParallelStatement')
+    e = element(p, 'ifParallelStatement')
     e.setAttribute('label', p[1])
     location(p, e)
     e.appendChild(p[4])
     if p[6] != None:
-        e1 = xml_document.createElement('generate')
+        e1 = element(p, 'generate')
         e1.appendChild(p[6])
         e.appendChild(e1)
     p[0] = e
@@ -2999,13 +3069,13 @@ def p_par_stmt_if(p):
 def p_par_stmt_for(p):
     """par_stmt_for : ID ':' FOR ID IN range GENERATE parallel_stmt_list_opt END GENERATE ID
                     | ID ':' FOR ID IN range GENERATE parallel_stmt_list_opt END GENERATE"""
-    e = xml_document.createElement('forParallelStatement')
+    e = element(p, 'forParallelStatement')
     e.setAttribute('label', p[1])
     location(p, e)
     e.setAttribute('id', p[4])
     e.appendChild(p[6])
     if p[8] != None: 
-        e1 = xml_document.createElement('generate')
+        e1 = element(p, 'generate')
         e1.appendChild(p[8])
         e.appendChild(e1)
     p[0] = e
@@ -3013,18 +3083,26 @@ def p_par_stmt_for(p):
 ###############################################################################
 # 6. Others
 ###############################################################################
+# error function of lr_parser, the copies of new_lr_parser have their own
 def p_error(p):
+    syntax_error(p, lr_parser)
+
+# reports a syntax error of a parse, p is None at the end of file
+def syntax_error(p, parser, lexer=None):
     if p:
+        p.lexer.errors += 1
         print >>sys.stderr, "%s:%d:invalid syntax `%s'" % \
             (p.lexer.filename, p.lexer.lineno, p.value)
-        yacc.errok()
+        parser.errok()
     else:
+        lexer.errors += 1
         print >>sys.stderr, \
             '%s:%d:unexpected EOF' % (lexer.filename, lexer.lineno)
 
-# build the parser
+# build the parser (tables are kept in the shared table cache)
 import yacc
-yacc.yacc(method='LALR')
+lr_parser = tabcache.yacc(yacc, sys.modules[__name__], 'vhd2xml',
+    method='LALR')
 
 entities=[]
 
@@ -3032,40 +3110,792 @@ entities=[]
 # READER
 ###############################################################################
 
-def parse_file(filename):
-    """parse_file(filename, abstract_content=None) parse file. Use abstract
-    content (if available) instead of file content."""
-    lexer.filename = filename
-    if os.access(filename, os.R_OK):
+# node backends - factories creating an empty document with root element tag,
+# the document creates all nodes of the parse
+def dom_document(tag):
+    return getDOMImplementation().createDocument(None, tag, None)
+
+backends = {
+    'dom': dom_document,        # xml.dom.minidom
+    'ast': vhdlast.Document,    # compact __slots__ syntax tree
+}
+
+# node backend of parse_file, stream_file and the command line converter
+backend = 'dom'
+# reuse unchanged design units of the previous parse (see IncrementalParser)
+incremental = False
+# parse result cache of parse_file and stream_file (see ParseCache)
+parse_cache = None
+# default size limit of the parse result cache (bytes)
+cache_limit = 256 << 20
+# map source files into memory instead of reading them (see VHDLParser.read)
+use_mmap = False
+# grammar profile of the parses (see grammarprof.GrammarProfile)
+grammar_profile = None
+
+# VHDL parser class
+class VHDLParser(object):
+    "Re-entrant VHDL parser, every parse builds its own document"
+
+    def __init__(self, factory=dom_document):
+        self.factory = factory
+        # parse result cache, result of the last parse_file/stream_file was
+        # taken from the cache, syntax errors of the last parse
+        self.cache = None
+        self.cached = False
+        self.errors = 0
+        # read source files through mmap
+        self.mmap = False
+        # grammar profile collecting the reductions of every parse
+        self.profile = None
+
+    # new document for file filename
+    def new_document(self, filename):
+        document = self.factory("vhdl")
+        top = document.documentElement
+        top.setAttribute('file', filename)
+        top.setAttribute('xmlns:xsi',
+                'http://www.w3.org/2001/XMLSchema-instance') 
+        top.setAttribute('xsi:noNamespaceSchemaLocation',
+                'http://www.liberouter.org/formal_verification/tools/vhd2xml/vhdl.xsd')
+        return document
+
+    # new LR parser sharing the parse tables, parse state is private
+    def new_lr_parser(self, lexer):
+        parser = copy.copy(lr_parser)
+        parser.errorfunc = lambda p: syntax_error(p, parser, lexer)
+        if self.profile:
+            parser.productions = \
+                self.profile.productions(lr_parser.productions)
+        return parser
+
+    # runs one parse, every completed design unit is passed to add_unit,
+    # with tracking the lexer.unit_span of the unit is valid in add_unit
+    def run(self, content, document, add_unit, lexer=None, tracking=0):
+        if lexer == None:
+            lexer = new_lexer(document.documentElement.getAttribute('file'))
+        lexer.document = document
+        lexer.spans = document.spans
+        if self.profile:
+            # writing the units is not charged to the start rule
+            add_unit = self.profile.outside('write', add_unit)
+        lexer.add_unit = add_unit
+        # tokens of mapped input are only copied when their value is used
+        lexer.lexlazy = not isinstance(content, str)
+        parser = self.new_lr_parser(lexer)
+        if self.profile:
+            self.profile.parse(parser, lexer, content, tracking=tracking)
+        else:
+            parser.parse(content, lexer=lexer, tracking=tracking)
+        self.errors += lexer.errors
+        return lexer
+
+    def parse_string(self, content, filename='<string>'):
+        """parse_string(content, filename) parse VHDL source content of file
+        filename and return its xml document."""
+        document = self.new_document(filename)
+        document.spans = vhdlast.SpanTable(content)
+        self.errors = 0
+        self.run(content, document, document.documentElement.appendChild)
+        if not isinstance(document, vhdlast.Document):
+            # minidom documents get their 'line' attributes right away
+            document.spans.resolve(document.documentElement)
+        return document
+
+    def stream_string(self, content, output, filename='<string>', copy=None):
+        """stream_string(content, output, filename) parse VHDL source content
+        of file filename and write its xml to file object output, every
+        design unit is written as soon as it is parsed. Returns the stream
+        writer."""
+        document = self.new_document(filename)
+        document.spans = vhdlast.SpanTable(content)
+        writer = XMLStreamWriter(output, document.documentElement, copy=copy,
+            spans=document.spans)
+        self.errors = 0
+        self.run(content, document, writer.write_unit)
+        writer.close()
+        return writer
+
+    # reads source file filename; in mmap mode the file is mapped read-only
+    # and the lexer scans the mapping, the source is never copied into a
+    # string (empty files and files that cannot be mapped are read)
+    def read(self, filename):
+        if not os.access(filename, os.R_OK):
+            raise IOError('could not read %s' % filename)
         f = open(filename)
-        content = f.read()
+        try:
+            if self.mmap:
+                try:
+                    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except (ValueError, EnvironmentError):
+                    pass
+            return f.read()
+        finally:
+            f.close()
+
+    # releases source content returned by read
+    def release(self, content):
+        if isinstance(content, mmap.mmap):
+            content.close()
+
+    # stores the xml of the units written to entry in the cache, results
+    # with syntax errors are dropped (the errors would not be reported again)
+    def cache_result(self, content, entry, units):
+        if self.errors:
+            self.cache.discard(entry)
+        else:
+            self.cache.put(content, entry, units)
+
+    def parse_file(self, filename):
+        """parse_file(filename) parse file filename and return its xml
+        document."""
+        content = self.read(filename)
+        try:
+            hit = self.cache and self.cache.get(content)
+            self.cached = bool(hit)
+            if hit:
+                f, units = hit
+                document = self.new_document(filename)
+                read_units(f, document, document.documentElement.appendChild)
+                f.close()
+                return document
+            document = self.parse_string(content, filename)
+            entry = self.cache and self.cache.new_entry()
+            if entry:
+                top = document.documentElement
+                for e in top.childNodes:
+                    write_unit(entry, e, '  ', '\n', document.spans)
+                self.cache_result(content, entry, len(top.childNodes))
+            return document
+        finally:
+            self.release(content)
+
+    def stream_file(self, filename, output):
+        """stream_file(filename, output) parse file filename and write its
+        xml to file object output unit by unit."""
+        content = self.read(filename)
+        try:
+            hit = self.cache and self.cache.get(content)
+            self.cached = bool(hit)
+            if hit:
+                f, units = hit
+                document = self.new_document(filename)
+                writer = XMLStreamWriter(output, document.documentElement)
+                writer.copy_units(f, units)
+                f.close()
+                writer.close()
+                return writer
+            entry = self.cache and self.cache.new_entry()
+            writer = self.stream_string(content, output, filename, entry)
+            if entry:
+                self.cache_result(content, entry, writer.units)
+            return writer
+        finally:
+            self.release(content)
+
+# fingerprint of a piece of source text
+def fingerprint(text):
+    return hashlib.md5(text).digest()
+
+# number of newlines in text[start:end], text may be a mmap
+def count_newlines(text, start=0, end=None):
+    if end == None:
+        end = len(text)
+    if isinstance(text, str):
+        return text.count('\n', start, end)
+    count = 0
+    while start < end:
+        count += text[start:min(start + (1 << 20), end)].count('\n')
+        start += 1 << 20
+    return count
+
+# true if a unit can end at offset end of text: right after a ';' that is
+# not in a comment (the text is cut there and a comment is only taken up to
+# the end of its line)
+def unit_boundary(text, end):
+    if text[end-1] != ';':
+        return False
+    return text.find('--', text.rfind('\n', 0, end) + 1, end) < 0
+
+# version of the parser - changes with the grammar and its actions
+parser_version = None
+
+def get_parser_version():
+    global parser_version
+    if parser_version == None:
+        sig = hashlib.md5()
+        for module in (sys.modules[__name__], vhdlast, vhdlscan):
+            f = open(os.path.splitext(module.__file__)[0] + '.py')
+            sig.update(f.read())
+            f.close()
+        parser_version = sig.hexdigest()
+    return parser_version
+
+# shifts line attributes of all elements of the subtree by delta
+def shift_lines(e, delta):
+    stack = [e]
+    while stack:
+        e = stack.pop()
+        if e.hasAttribute('line'):
+            e.setAttribute('line', str(int(e.getAttribute('line')) + delta))
+        stack.extend(e.childNodes)
+
+# Incremental VHDL parser class
+class IncrementalParser(VHDLParser):
+    """VHDL parser reusing design units of the previous parse of a file.
+    Every library unit owns the source text from the end of the previous
+    unit up to its closing ';', the fingerprints and syntax trees of the units
+    are kept in the table cache. The longest run of unchanged units at the
+    start and at the end of the file is reused, only the text in between is
+    lexed and parsed again."""
+
+    def __init__(self, cachedir=None):
+        VHDLParser.__init__(self, vhdlast.Document)
+        self.cachedir = cachedir
+        # statistics of the last parse
+        self.reused = 0
+        self.parsed = 0
+        self.errors = 0
+
+    # cache file of source file filename
+    def entry_name(self, filename):
+        path = tabcache.cache_dir(self.cachedir)
+        if path == None:
+            return None
+        key = hashlib.md5(os.path.abspath(filename)).hexdigest()[:16]
+        return os.path.join(path, 'units_%s.pickle' % key)
+
+    def load(self, name):
+        try:
+            f = open(name, 'rb')
+            try:
+                entry = cPickle.load(f)
+            finally:
+                f.close()
+        except (IOError, EOFError, cPickle.UnpicklingError):
+            return None
+        if entry.get('version') != get_parser_version():
+            return None
+        return entry
+
+    def save(self, name, entry):
+        entry['version'] = get_parser_version()
+        tmp = '%s.%d' % (name, os.getpid())
+        f = open(tmp, 'wb')
+        cPickle.dump(entry, f, 2)
         f.close()
-        yacc.parse(content)
+        os.rename(tmp, name)
+
+    def run(self, content, document, add_unit):
+        filename = document.documentElement.getAttribute('file')
+        name = self.entry_name(filename)
+        entry = name and self.load(name)
+        if entry:
+            old = entry['units']
+        else:
+            old = []
+        # unit record: (length, lines, fingerprint, pickled syntax tree)
+        units = []
+        # unchanged units at the start
+        pos = 0
+        line = 1
+        i = 0
+        kept = []
+        while i < len(old):
+            length, lines, fp, tree = old[i]
+            if fingerprint(content[pos:pos+length]) != fp:
+                break
+            kept.append(cPickle.loads(tree))
+            pos += length
+            line += lines
+            i += 1
+        # a use clause takes the use clauses after it into its list, the
+        # last one before the changed text is parsed again with that text
+        while kept and kept[-1].tagName == 'useClause':
+            kept.pop()
+            i -= 1
+            length, lines, fp, tree = old[i]
+            pos -= length
+            line -= lines
+        for e in kept:
+            add_unit(e)
+        units.extend(old[:i])
+        # unchanged units at the end; a unit ends with its ';' and its text
+        # starts right after the ';' of the unit before.  Changed trailing
+        # text (comments after the last unit) is parsed on its own.
+        end = len(content)
+        j = len(old)
+        if entry:
+            length, fp = entry['tail']
+            if end - length >= pos and fingerprint(content[end-length:]) == fp:
+                end -= length
+            else:
+                end = content.rfind(';') + 1
+                while end > pos and not unit_boundary(content, end):
+                    end = content.rfind(';', 0, end - 1) + 1
+                end = max(end, pos)
+            while j > i:
+                length, lines, fp, tree = old[j-1]
+                start = end - length
+                if start < pos or \
+                    (start and not unit_boundary(content, start)) or \
+                    fingerprint(content[start:end]) != fp:
+                    break
+                end = start
+                j -= 1
+            if j == len(old):
+                end = len(content)
+        # parse the changed text
+        self.reused = i + len(old) - j
+        self.parsed = 0
+        self.errors = 0
+        rest = ''
+        if pos < end or not entry:
+            rest = self.run_chunk(buffer(content, pos, end - pos), pos, line,
+                document, units, add_unit)
+        # the unchanged units at the end, moved by the lines of the change
+        if j < len(old):
+            delta = line + count_newlines(content, pos, end)
+            for length, lines, fp, tree in old[:j]:
+                delta -= lines
+            delta -= 1
+            for k in range(j, len(old)):
+                length, lines, fp, tree = old[k]
+                e = cPickle.loads(tree)
+                if delta:
+                    shift_lines(e, delta)
+                    tree = cPickle.dumps(e, 2)
+                record = (length, lines, fp, tree)
+                if rest:
+                    # text after the last changed unit belongs to this one,
+                    # it lies before end (the stored text starts at end)
+                    chunk = rest + content[end:end+length]
+                    record = (len(chunk), chunk.count('\n'),
+                        fingerprint(chunk), tree)
+                    rest = ''
+                units.append(record)
+                add_unit(e)
+                end += length
+            tail = content[end:]
+            if tail and fingerprint(tail) != entry['tail'][1]:
+                self.run_chunk(tail, end, 1 + count_newlines(content, 0, end),
+                    document, units, add_unit)
+        else:
+            tail = rest + content[end:]
+        if name and not self.errors:
+            self.save(name, {'units': units,
+                'tail': (len(tail), fingerprint(tail))})
+
+    # parses text starting at offset and line, appends the records of its
+    # units to units and returns the text after the last unit
+    def run_chunk(self, text, offset, line, document, units, add_unit):
+        ends = [0]
+        lexer = new_lexer(document.documentElement.getAttribute('file'))
+        lexer.lineno = line
+        lexer.offset = offset
+        def record(e):
+            unit_end = lexer.unit_span[1] + 1
+            chunk = text[ends[-1]:unit_end]
+            ends.append(unit_end)
+            # stored units carry their lines (moved by shift_lines)
+            document.spans.resolve(e)
+            units.append((len(chunk), chunk.count('\n'),
+                fingerprint(chunk), cPickle.dumps(e, 2)))
+            self.parsed += 1
+            add_unit(e)
+        VHDLParser.run(self, text, document, record, lexer, 1)
+        return text[ends[-1]:]
+
+# Parse result cache class
+class ParseCache(object):
+    """Content-addressed cache of parse results.  An entry is keyed by the
+    hash of the source text and the parser version and holds the xml of the
+    design units (the root element is written for every file again), so a
+    hit skips lexing and parsing.  The entries are files in the parse/
+    directory of the table cache; an entry is touched when it is used and
+    the least recently used entries are evicted when all entries take more
+    than limit bytes.  The size of all entries is taken once and then kept
+    up to date by put, the directory is only scanned again when the size
+    crosses the limit (entries of other processes are counted then); the
+    eviction goes down to 7/8 of the limit, so a full cache is not scanned
+    for every new entry."""
+
+    def __init__(self, limit=None, cachedir=None):
+        if limit == None:
+            limit = cache_limit
+        self.limit = limit
+        self.path = tabcache.cache_dir(cachedir)
+        if self.path != None:
+            self.path = os.path.join(self.path, 'parse')
+            try:
+                os.makedirs(self.path)
+            except OSError:
+                if not os.path.isdir(self.path):
+                    self.path = None
+        # size of all entries
+        self.total = 0
+        if self.path != None:
+            self.total = self.scan()[1]
+        # statistics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def entry_name(self, content):
+        key = hashlib.md5(get_parser_version() + '\0')
+        key.update(content)
+        return os.path.join(self.path, key.hexdigest() + '.xml')
+
+    # returns (file, number of units) of the entry of content, the file is
+    # positioned at the xml of the units; None on a miss
+    def get(self, content):
+        if self.path == None:
+            self.misses += 1
+            return None
+        name = self.entry_name(content)
+        try:
+            f = open(name, 'rb')
+        except IOError:
+            self.misses += 1
+            return None
+        try:
+            os.utime(name, None)
+        except OSError:
+            pass
+        self.hits += 1
+        return f, int(f.readline())
+
+    # returns a new entry file, the xml of the units is written to it and
+    # the entry is published by put (or dropped by discard)
+    def new_entry(self):
+        if self.path == None:
+            return None
+        fd, name = tempfile.mkstemp(prefix='.entry-', dir=self.path)
+        f = open(name, 'wb')
+        os.close(fd)
+        # room for the number of units
+        f.write('%11s\n' % '')
+        return f
+
+    def put(self, content, entry, units):
+        entry.seek(0)
+        entry.write('%11d' % units)
+        entry.seek(0, 2)
+        size = entry.tell()
+        entry.close()
+        os.rename(entry.name, self.entry_name(content))
+        self.total += size
+        if self.total > self.limit:
+            self.evict()
+
+    def discard(self, entry):
+        entry.close()
+        os.remove(entry.name)
+
+    # returns the entries (mtime, size, name), oldest first, and their size
+    def scan(self):
+        entries = []
+        total = 0
+        for n in os.listdir(self.path):
+            if not n.endswith('.xml'):
+                continue
+            try:
+                st = os.stat(os.path.join(self.path, n))
+            except OSError:
+                # evicted by another process
+                continue
+            entries.append((st.st_mtime, st.st_size, n))
+            total += st.st_size
+        entries.sort()
+        return entries, total
+
+    # removes the least recently used entries above 7/8 of the size limit
+    def evict(self):
+        entries, total = self.scan()
+        if total <= self.limit:
+            self.total = total
+            return
+        for mtime, size, n in entries:
+            if total <= self.limit - self.limit / 8:
+                break
+            try:
+                os.remove(os.path.join(self.path, n))
+                self.evictions += 1
+            except OSError:
+                pass
+            total -= size
+        self.total = total
+
+# reads the xml of design units (as written by XMLStreamWriter) from file f,
+# the units are created by document and passed to add_unit
+def read_units(f, document, add_unit):
+    stack = []
+    def start(name, attrs):
+        if not stack:
+            # enclosing element
+            stack.append(None)
+            return
+        e = document.createElement(name)
+        for n, v in attrs.items():
+            e.setAttribute(n, v)
+        if stack[-1] == None:
+            add_unit(e)
+        else:
+            stack[-1].appendChild(e)
+        stack.append(e)
+    def end(name):
+        stack.pop()
+    parser = expat.ParserCreate()
+    parser.returns_unicode = False
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    parser.Parse('<units>')
+    while True:
+        data = f.read(1 << 16)
+        if not data:
+            break
+        parser.Parse(data)
+    parser.Parse('</units>', True)
+
+# parser of the module-level functions and the command line converter
+def new_parser():
+    if incremental:
+        parser = IncrementalParser()
     else:
-        raise IOError('could not read %s' % filename)
+        parser = VHDLParser(backends[backend])
+    parser.cache = parse_cache
+    parser.mmap = use_mmap
+    parser.profile = grammar_profile
+    return parser
 
-if __name__ == "__main__":
-    if len(sys.argv)>1:
-        for file_arg in sys.argv[1:]:
-            # build the lexer
-            lexer = lex.lex()
-            # initialize public variables
-            DOMimplement = getDOMImplementation()
-            xml_document = DOMimplement.createDocument(None, "vhdl", None)
-            top_element = xml_document.documentElement
-            top_element.setAttribute('file', file_arg)
-            top_element.setAttribute('xmlns:xsi',
-                    'http://www.w3.org/2001/XMLSchema-instance') 
-            top_element.setAttribute('xsi:noNamespaceSchemaLocation',
-                    'http://www.liberouter.org/formal_verification/tools/vhd2xml/vhdl.xsd')
-            #debug = True
+def parse_file(filename):
+    """parse_file(filename) parse file filename and return its xml
+    document."""
+    return new_parser().parse_file(filename)
+
+def stream_file(filename, output):
+    """stream_file(filename, output) parse file filename and write its
+    xml to file object output unit by unit."""
+    return new_parser().stream_file(filename, output)
+
+###############################################################################
+# WRITER
+###############################################################################
+
+# Tee writer class
+class TeeWriter(object):
+    "File-like object writing to several files"
+
+    def __init__(self, *files):
+        self.files = files
+
+    def write(self, data):
+        for f in self.files:
+            f.write(data)
+
+# writes design unit e at the first level of the xml, the line numbers of
+# the spans are computed from spans
+def write_unit(output, e, indent, newl, spans=None):
+    if not isinstance(e, vhdlast.Node) and spans != None:
+        # minidom element: the lines become 'line' attributes
+        spans.resolve(e)
+    vhdlast.write_tree(output, e, indent, indent, newl, spans)
+
+# Streaming xml writer class
+class XMLStreamWriter(object):
+    "Streaming xml writer, output is identical to toprettyxml of the document"
+
+    # copy .. optional file receiving the xml of the units (cache entry)
+    # spans .. span table of the document
+    def __init__(self, output, top, indent='  ', newl='\n', copy=None,
+        spans=None):
+        self.output = output
+        self.spans = spans
+        self.unit_output = output
+        if copy != None:
+            self.unit_output = TeeWriter(output, copy)
+        self.top = top
+        self.indent = indent
+        self.newl = newl
+        self.units = 0
+        # time spent in serialization
+        self.time = 0.0
+        output.write('<?xml version="1.0" ?>' + newl)
+        output.write('<' + top.tagName)
+        names = top.attributes.keys()
+        names.sort()
+        for name in names:
+            output.write(' %s="%s"' % \
+                (name, vhdlast.escape(top.getAttribute(name))))
+
+    # writes a completed design unit, the unit is not kept
+    def write_unit(self, e):
+        start = time.time()
+        if self.units == 0:
+            self.output.write('>' + self.newl)
+        write_unit(self.unit_output, e, self.indent, self.newl, self.spans)
+        self.units += 1
+        self.time += time.time() - start
+
+    # writes units design units whose xml is read from file f
+    def copy_units(self, f, units):
+        start = time.time()
+        if units:
+            if self.units == 0:
+                self.output.write('>' + self.newl)
+            shutil.copyfileobj(f, self.output)
+            self.units += units
+        self.time += time.time() - start
+
+    def close(self):
+        if self.units:
+            self.output.write('</%s>%s' % (self.top.tagName, self.newl))
+        else:
+            self.output.write('/>' + self.newl)
+
+# converts file filename to filename.xml, returns its manifest record
+def convert_file(filename):
+    start = time.time()
+    parser = new_parser()
+    if parser.cache:
+        evictions = parser.cache.evictions
+    xml_file = open(filename+'.xml', 'w')
+    writer = parser.stream_file(filename, xml_file)
+    xml_file.close()
+    done = time.time()
+    record = {'file': filename, 'output': filename+'.xml',
+        'size': os.path.getsize(filename), 'units': writer.units,
+        'parse': done-start-writer.time, 'write': writer.time,
+        'total': done-start, 'pid': os.getpid()}
+    if incremental:
+        record['reused'] = parser.reused
+        record['parsed'] = parser.parsed
+    if parser.cache:
+        record['cache'] = parser.cached and 'hit' or 'miss'
+        record['evicted'] = parser.cache.evictions - evictions
+    return record
+
+# batch worker - converts one file in a pool process, the console output of
+# the conversion (and the grammar profile of the file) is captured and
+# returned so that the main process can print it in input order.  A failed
+# conversion returns its traceback (text): the exception itself may not be
+# unpickled in the main process (lex.LexError), the pool would hang.
+def batch_worker(filename):
+    stdout, stderr = sys.stdout, sys.stderr
+    sys.stdout, sys.stderr = StringIO(), StringIO()
+    if grammar_profile:
+        grammar_profile.clear()
+    try:
+        try:
+            record = convert_file(filename)
+        except Exception:
+            return {'file': filename}, sys.stdout.getvalue(), \
+                sys.stderr.getvalue(), None, traceback.format_exc()
+        profile = grammar_profile and grammar_profile.data()
+        return record, sys.stdout.getvalue(), sys.stderr.getvalue(), \
+            profile, None
+    finally:
+        sys.stdout, sys.stderr = stdout, stderr
+
+# converts all files, in a pool of jobs processes if jobs > 1
+def convert_files(files, jobs=1):
+    records = []
+    if jobs > 1:
+        # forked workers inherit the loaded tables and stay warm
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pool = multiprocessing.Pool(jobs)
+        try:
+            for record, out, err, profile, error in \
+                pool.imap(batch_worker, files):
+                print record['file']
+                sys.stdout.write(out)
+                sys.stdout.flush()
+                sys.stderr.write(err)
+                sys.stderr.flush()
+                if error:
+                    # stops as the serial conversion does
+                    sys.stderr.write(error)
+                    sys.exit(1)
+                print '------------ done'
+                records.append(record)
+                if profile:
+                    grammar_profile.merge(profile)
+        finally:
+            pool.terminate()
+            pool.join()
+    else:
+        for file_arg in files:
             print file_arg
-            parse_file(file_arg)
-            filename = file_arg+'.xml'
-            xml_file = open(filename, 'w')
-            xml_file.write(xml_document.toprettyxml("  "))
-            xml_file.close()
+            records.append(convert_file(file_arg))
             print '------------ done'
+    return records
+
+def write_manifest(filename, records):
+    manifest = open(filename, 'w')
+    summary = {'files': records,
+        'total': sum([r['total'] for r in records])}
+    cached = [r['cache'] for r in records if r.has_key('cache')]
+    if cached:
+        summary['cache'] = {'hits': cached.count('hit'),
+            'misses': cached.count('miss'),
+            'evictions': sum([r['evicted'] for r in records
+                if r.has_key('evicted')])}
+    json.dump(summary, manifest, indent=1)
+    manifest.write('\n')
+    manifest.close()
+
+if __name__ == "__main__":
+    optparser = optparse.OptionParser(usage='%prog [options] file.vhd ...')
+    optparser.add_option('-j', '--jobs', type='int', default=1,
+        help='number of parallel conversion processes')
+    optparser.add_option('-m', '--manifest', metavar='FILE',
+        help='write per-file timing to FILE (json)')
+    optparser.add_option('-b', '--backend', choices=backends.keys(),
+        default=backend, help='node backend: dom (default) or ast')
+    optparser.add_option('-i', '--incremental', action='store_true',
+        default=False, help='reparse only design units changed since the '
+        'previous run')
+    optparser.add_option('-l', '--lexer', choices=('ply', 'scan'),
+        default=lexer_engine, help='lexer engine: ply (default) or scan')
+    optparser.add_option('--mmap', action='store_true', default=False,
+        help='map the input files into memory instead of reading them')
+    optparser.add_option('-c', '--cache', action='store_true',
+        default=False, help='take unchanged files from the parse result cache')
+    optparser.add_option('--cache-size', type='int', metavar='MB',
+        default=cache_limit >> 20,
+        help='size limit of the parse result cache (default %default MB)')
+    optparser.add_option('--profile-grammar', metavar='FILE',
+        help='count reductions and time the actions of every grammar rule, '
+        'print the report and write it to FILE (json)')
+    optparser.add_option('--db', metavar='FILE',
+        help='index the design units of changed files in the SQLite '
+        'database FILE')
+    events.add_options(optparser)
+    (options, args) = optparser.parse_args()
+    events.configure_options(options)
+    debug = events.enabled(events.TRACE)
+    backend = options.backend
+    incremental = options.incremental
+    use_mmap = options.mmap
+    lexer_engine = options.lexer
+    if options.cache:
+        parse_cache = ParseCache(options.cache_size << 20)
+    if options.profile_grammar:
+        grammar_profile = grammarprof.GrammarProfile()
+    if len(args)>0:
+        records = convert_files(args, options.jobs)
+        if options.db:
+            # the database is written by the main process only
+            db = designdb.DesignDatabase(options.db)
+            for r in records:
+                r['db'] = db.update(r['file'], r['output']) and \
+                    'indexed' or 'unchanged'
+            db.close()
+        if options.manifest:
+            write_manifest(options.manifest, records)
+        if grammar_profile:
+            grammar_profile.report()
+            grammar_profile.dump(options.profile_grammar)
     else:
         print >>sys.stderr, 'syntax: %s file.vhd' % sys.argv[0]
-
@@ -0,0 +1,356 @@
+#! /usr/bin/env python
+# vim:ts=4:expandtab:sw=4:tw=0
+###############################################################################
+# vhdlast.py - compact syntax tree backend for vhd2xml                        #
+#                                                                             #
+# This program is free software; you can redistribute it and/or modify        #
+#   it under the terms of the GNU General Public License as published by      #
+#   the Free Software Foundation; either version 2 of the License, or         #
+#   (at your option) any later version.                                       #
+#   See http://www.gnu.org/licenses/gpl.html for more details.                #
+#                                                                             #
+###############################################################################
+###############################################################################
+# The grammar actions of vhd2xml only use a small part of the DOM interface
+# (createElement, appendChild, insertBefore, setAttribute, getAttribute,
+# hasAttribute, hasChildNodes, firstChild and tagName).  Node implements just
+# this part with __slots__, attribute dictionaries and child lists are only
+# allocated when they are used.  XML is an optional step: writexml and
+# toprettyxml write the same text as minidom, to_dom converts the tree into a
+# minidom document.
+#
+# Source positions are not kept as 'line' attributes: the span of a node is a
+# row of the SpanTable of its document (start and end offset), the line
+# number is computed when the node is written.
+
+import re
+from array import array
+from xml.parsers import expat
+from bisect import bisect_left
+from xml.dom import minidom
+from xml.dom.minidom import getDOMImplementation, Node as DOMNode
+
+# escapes attribute value (as minidom does)
+def escape(data):
+    data = data.replace("&", "&amp;").replace("<", "&lt;")
+    return data.replace("\"", "&quot;").replace(">", "&gt;")
+
+# Source span table class
+class SpanTable(object):
+    """Source spans of the nodes of a document - start and end offsets in two
+    integer arrays, a node keeps the number of its row (node.span).  Line
+    and column numbers are computed on demand by bisecting the offsets of
+    the newlines of the source, collected once per file."""
+
+    def __init__(self, text=''):
+        self.starts = array('l')
+        self.ends = array('l')
+        self.newlines = array('l',
+            [m.start() for m in re.finditer('\n', text)])
+
+    # adds a span, returns its row
+    def add(self, start, end):
+        self.starts.append(start)
+        self.ends.append(end)
+        return len(self.starts) - 1
+
+    def start(self, row):
+        return self.starts[row]
+
+    def end(self, row):
+        return self.ends[row]
+
+    # line number of the start of span row
+    def lineno(self, row):
+        return bisect_left(self.newlines, self.starts[row]) + 1
+
+    # column number of the start of span row
+    def column(self, row):
+        offset = self.starts[row]
+        line = bisect_left(self.newlines, offset)
+        if line:
+            return offset - self.newlines[line-1]
+        return offset + 1
+
+    # turns the spans of subtree e into 'line' attributes (minidom nodes,
+    # units kept outside of the document)
+    def resolve(self, e):
+        stack = [e]
+        while stack:
+            e = stack.pop()
+            row = getattr(e, 'span', None)
+            if row != None:
+                e.setAttribute('line', str(self.lineno(row)))
+                e.span = None
+            stack.extend(e.childNodes)
+
+# Syntax tree node class
+class Node(object):
+    "Syntax tree node (element)"
+    __slots__ = ('tagName', '_attrs', '_children', 'span')
+
+    def __init__(self, tagName):
+        self.tagName = tagName
+        self._attrs = None
+        self._children = None
+        self.span = None
+
+    def setAttribute(self, name, value):
+        if self._attrs is None:
+            self._attrs = {}
+        self._attrs[name] = value
+
+    def getAttribute(self, name):
+        if self._attrs is None:
+            return ''
+        return self._attrs.get(name, '')
+
+    def hasAttribute(self, name):
+        return self._attrs is not None and name in self._attrs
+
+    def removeAttribute(self, name):
+        del self._attrs[name]
+
+    def _get_attributes(self):
+        return self._attrs or {}
+    attributes = property(_get_attributes)
+
+    def appendChild(self, node):
+        if self._children is None:
+            self._children = [node]
+        else:
+            self._children.append(node)
+        return node
+
+    def insertBefore(self, node, ref):
+        if ref is None:
+            return self.appendChild(node)
+        self._children.insert(self._children.index(ref), node)
+        return node
+
+    def removeChild(self, node):
+        self._children.remove(node)
+        return node
+
+    def hasChildNodes(self):
+        return bool(self._children)
+
+    def _get_childNodes(self):
+        return self._children or []
+    childNodes = property(_get_childNodes)
+
+    def _get_firstChild(self):
+        if self._children:
+            return self._children[0]
+        return None
+    firstChild = property(_get_firstChild)
+
+    def _get_lastChild(self):
+        if self._children:
+            return self._children[-1]
+        return None
+    lastChild = property(_get_lastChild)
+
+    # spans .. span table of the document, the line of the span is written
+    # as 'line' attribute
+    def writexml(self, writer, indent="", addindent="", newl="", spans=None):
+        write_tree(writer, self, indent, addindent, newl, spans)
+
+# Syntax tree document class
+class Document(object):
+    "Syntax tree document, node factory of the compact backend"
+    __slots__ = ('documentElement', 'spans')
+
+    def __init__(self, tagName):
+        self.documentElement = Node(tagName)
+        self.spans = None
+
+    def createElement(self, tagName):
+        return Node(tagName)
+
+    def writexml(self, writer, indent="", addindent="", newl=""):
+        writer.write('<?xml version="1.0" ?>' + newl)
+        write_tree(writer, self.documentElement, indent, addindent, newl,
+            self.spans)
+
+    def toprettyxml(self, indent="\t", newl="\n"):
+        return toprettyxml(self, indent, newl)
+
+# loads xml file filename into a minidom document - expat reads the file in
+# chunks and the elements are created as they are parsed, text of only
+# whitespace (the indentation of pretty printed xml) is dropped
+def load_dom(filename):
+    document = getDOMImplementation().createDocument(None, None, None)
+    stack = [document]
+    createElement = document.createElement
+    # the fast append of the minidom builders, a new node has no parent
+    append = minidom._append_child
+    def start(tag, attrs):
+        e = createElement(tag)
+        for i in range(0, len(attrs), 2):
+            e.setAttribute(attrs[i], attrs[i+1])
+        append(stack[-1], e)
+        stack.append(e)
+    def end(tag):
+        stack.pop()
+    def text(data):
+        if data.strip():
+            append(stack[-1], document.createTextNode(data))
+    parser = expat.ParserCreate()
+    parser.returns_unicode = False
+    parser.ordered_attributes = True
+    # a text between two tags comes in one piece
+    parser.buffer_text = True
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    parser.CharacterDataHandler = text
+    f = open(filename, 'rb')
+    try:
+        parser.ParseFile(f)
+    finally:
+        f.close()
+    return document
+
+###############################################################################
+# Tree walking without recursion - the depth of a tree (nested expressions
+# and statements) is not limited by the Python stack
+
+# writes element e (syntax tree node or minidom element) with its subtree as
+# minidom's writexml does, closing tags wait on the stack of open elements
+def write_tree(writer, e, indent="", addindent="", newl="", spans=None):
+    write = writer.write
+    stack = [(e, indent)]
+    while stack:
+        e, indent = stack.pop()
+        if indent == None:
+            # closing tag
+            write(e)
+            continue
+        if isinstance(e, Node):
+            attrs = e._attrs
+            if e.span != None and spans != None:
+                attrs = dict(attrs or ())
+                attrs['line'] = str(spans.lineno(e.span))
+            children = e._children
+        elif e.nodeType == DOMNode.ELEMENT_NODE:
+            attrs = dict(e.attributes.items())
+            children = e.childNodes
+        else:
+            # text (and comment) nodes as minidom writes them
+            e.writexml(writer, indent, addindent, newl)
+            continue
+        write(indent + "<" + e.tagName)
+        if attrs:
+            names = attrs.keys()
+            names.sort()
+            for name in names:
+                write(' %s="%s"' % (name, escape(attrs[name])))
+        if not children:
+            write("/>" + newl)
+        elif len(children) == 1 and \
+            getattr(children[0], 'nodeType', None) == DOMNode.TEXT_NODE:
+            write(">")
+            children[0].writexml(writer, "", "", "")
+            write("</%s>%s" % (e.tagName, newl))
+        else:
+            write(">" + newl)
+            stack.append(("%s</%s>%s" % (indent, e.tagName, newl), None))
+            indent += addindent
+            for child in reversed(children):
+                stack.append((child, indent))
+
+# returns the xml text of document (syntax tree or minidom document) as
+# minidom's toprettyxml does
+def toprettyxml(document, indent="\t", newl="\n"):
+    lines = []
+    class Writer:
+        write = lines.append
+    writer = Writer()
+    writer.write('<?xml version="1.0" ?>' + newl)
+    if isinstance(document, Document):
+        write_tree(writer, document.documentElement, "", indent, newl,
+            document.spans)
+    else:
+        for e in document.childNodes:
+            write_tree(writer, e, "", indent, newl)
+    return ''.join(lines)
+
+# returns a deep copy of minidom node e (cloneNode(True) without recursion)
+def clone_tree(e):
+    clone = e.cloneNode(False)
+    stack = [(e, clone)]
+    while stack:
+        e, copy = stack.pop()
+        for child in e.childNodes:
+            stack.append((child, copy.appendChild(child.cloneNode(False))))
+    return clone
+
+# returns the descendant elements of e with tag name tagName in document
+# order (getElementsByTagName without recursion)
+def elements_by_tag_name(e, tagName):
+    result = []
+    stack = list(reversed(e.childNodes))
+    while stack:
+        e = stack.pop()
+        if getattr(e, 'tagName', None) == tagName:
+            result.append(e)
+        stack.extend(reversed(e.childNodes))
+    return result
+
+# returns the descendant elements of e with a tag name in tagNames (a set or
+# dictionary) in document order, all tag names are searched in one walk
+def elements_by_tag_names(e, tagNames):
+    result = []
+    stack = list(reversed(e.childNodes))
+    while stack:
+        e = stack.pop()
+        if getattr(e, 'tagName', None) in tagNames:
+            result.append(e)
+        stack.extend(reversed(e.childNodes))
+    return result
+
+# returns the number of descendant elements of e and those with a tag name
+# in tagNames in document order (one walk)
+def element_census(e, tagNames):
+    count = 0
+    result = []
+    stack = list(reversed(e.childNodes))
+    while stack:
+        e = stack.pop()
+        tagName = getattr(e, 'tagName', None)
+        if tagName != None:
+            count += 1
+            if tagName in tagNames:
+                result.append(e)
+        stack.extend(reversed(e.childNodes))
+    return count, result
+
+# returns the first descendant element of e with tag name tagName in
+# document order, None if there is none
+def first_element_by_tag_name(e, tagName):
+    stack = list(reversed(e.childNodes))
+    while stack:
+        e = stack.pop()
+        if getattr(e, 'tagName', None) == tagName:
+            return e
+        stack.extend(reversed(e.childNodes))
+    return None
+
+# converts syntax tree (node or document) into a minidom document, the spans
+# of the nodes become 'line' attributes
+def to_dom(tree, spans=None):
+    if isinstance(tree, Document):
+        spans = tree.spans
+        tree = tree.documentElement
+    document = getDOMImplementation().createDocument(None, tree.tagName, None)
+    stack = [(tree, document.documentElement)]
+    while stack:
+        node, element = stack.pop()
+        for name, value in node.attributes.items():
+            element.setAttribute(name, value)
+        if node.span != None and spans != None:
+            element.setAttribute('line', str(spans.lineno(node.span)))
+        for child in node.childNodes:
+            e = element.appendChild(document.createElement(child.tagName))
+            stack.append((child, e))
+    return document
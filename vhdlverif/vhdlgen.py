@@ -0,0 +1,235 @@
+#! /usr/bin/env python
+# vim:ts=4:expandtab:sw=4:tw=0
+###############################################################################
+# vhdlgen.py - synthetic VHDL design generator for stress tests               #
+#                                                                             #
+# This program is free software; you can redistribute it and/or modify        #
+#   it under the terms of the GNU General Public License as published by      #
+#   the Free Software Foundation; either version 2 of the License, or         #
+#   (at your option) any later version.                                       #
+#   See http://www.gnu.org/licenses/gpl.html for more details.                #
+#                                                                             #
+###############################################################################
+###############################################################################
+# Generates a random design in the VHDL subset taken by vhd2xml and vhdl-dot:
+# entities with std_logic ports, architectures with component declarations,
+# signals, component instances (of entities generated before, so the
+# hierarchy is acyclic), for-generate loops, concurrent assignments and
+# clocked processes with nested if/case statements.  The design is written
+# entity by entity, so the size is only limited by the disk; the same seed
+# gives the same design.
+#
+# $ ./vhdlgen.py [-e entities] [-p ports] [-s signals] [-r processes]
+#       [-d depth] [-x expression depth] [-f fanout] [-g generates]
+#       [--seed N] [-o file | --split directory]
+
+import sys
+import os # for OS functions
+import random
+import optparse
+
+# logical operators of the generated expressions
+operators = ('and', 'or', 'xor', 'nand', 'nor', 'xnor')
+
+# Design generator class
+class DesignGenerator(object):
+    "Generates the entities of a random design"
+
+    def __init__(self, entities=4, ports=8, signals=16, processes=4,
+        depth=2, exprdepth=3, fanout=2, generates=1, seed=1):
+        self.entities = entities
+        self.signals = max(signals, processes)
+        self.processes = processes
+        self.depth = depth
+        self.exprdepth = exprdepth
+        self.fanout = fanout
+        self.generates = generates
+        self.random = random.Random(seed)
+        # every entity has the same ports
+        self.inputs = ['i%d' % i for i in range(max(ports // 2, 1))]
+        self.outputs = ['o%d' % i for i in range(max(ports - ports // 2, 1))]
+        self.width = len(str(max(entities - 1, 0)))
+
+    # name of entity number i
+    def name(self, i):
+        return 'ent%0*d' % (self.width, i)
+
+    # port declaration lines
+    def ports(self, indent):
+        lines = [indent + 'port(', indent + '  clk : in STD_LOGIC;',
+            indent + '  rst : in STD_LOGIC;']
+        for p in self.inputs:
+            lines.append(indent + '  %s : in STD_LOGIC;' % p)
+        for p in self.outputs:
+            lines.append(indent + '  %s : out STD_LOGIC;' % p)
+        lines[-1] = lines[-1][:-1]
+        lines.append(indent + ');')
+        return lines
+
+    # random expression of depth depth over the names in pool
+    def expression(self, pool, depth):
+        return self.term(pool, depth)[0]
+
+    # operand of a binary operator, binary operands are parenthesized
+    def operand(self, pool, depth):
+        e, binary = self.term(pool, depth)
+        if binary:
+            return '(' + e + ')'
+        return e
+
+    # returns a random expression and whether it is a binary operation
+    def term(self, pool, depth):
+        r = self.random
+        if depth <= 0 or r.random() < 0.2:
+            if r.random() < 0.05:
+                return r.choice(("'0'", "'1'")), False
+            return r.choice(pool), False
+        if r.random() < 0.15:
+            return 'not (%s)' % self.expression(pool, depth - 1), False
+        left = self.operand(pool, depth - 1)
+        right = self.operand(pool, depth - 1)
+        return '%s %s %s' % (left, r.choice(operators), right), True
+
+    # nested sequential statements assigning the signals of targets
+    def statements(self, pool, targets, depth, indent):
+        r = self.random
+        lines = []
+        for i in range(r.randint(1, 2)):
+            kind = depth > 0 and r.choice(('if', 'case', 'assign')) or 'assign'
+            if kind == 'if':
+                lines.append(indent + 'if %s = \'1\' then' %
+                    self.operand(pool, self.exprdepth))
+                lines += self.statements(pool, targets, depth - 1,
+                    indent + '  ')
+                if r.random() < 0.5:
+                    lines.append(indent + 'elsif %s = \'1\' then' %
+                        self.operand(pool, self.exprdepth))
+                    lines += self.statements(pool, targets, depth - 1,
+                        indent + '  ')
+                lines.append(indent + 'else')
+                lines += self.statements(pool, targets, depth - 1,
+                    indent + '  ')
+                lines.append(indent + 'end if;')
+            elif kind == 'case':
+                lines.append(indent + 'case %s is' % r.choice(pool))
+                lines.append(indent + '  when \'1\' =>')
+                lines += self.statements(pool, targets, depth - 1,
+                    indent + '    ')
+                lines.append(indent + '  when others =>')
+                lines += self.statements(pool, targets, depth - 1,
+                    indent + '    ')
+                lines.append(indent + 'end case;')
+            else:
+                lines.append(indent + '%s <= %s;' % (r.choice(targets),
+                    self.expression(pool, self.exprdepth)))
+        return lines
+
+    # returns the lines of entity number i and its architecture
+    def entity(self, i):
+        r = self.random
+        name = self.name(i)
+        lines = ['library ieee;', 'use ieee.std_logic_1164.all;', '',
+            'entity %s is' % name]
+        lines += self.ports('  ')
+        lines += ['end %s;' % name, '', 'architecture rtl of %s is' % name]
+        # instances of entities generated before
+        instances = []
+        if i > 0:
+            instances = [r.randrange(i) for k in range(self.fanout)]
+        for master in sorted(set(instances)):
+            lines.append('  component %s' % self.name(master))
+            lines += self.ports('    ')
+            lines.append('  end component;')
+        signals = ['s%d' % k for k in range(self.signals)]
+        nets = ['n%d_%s' % (k, o) for k in range(len(instances))
+            for o in self.outputs]
+        vectors = ['gv%d' % k for k in range(self.generates)]
+        for s in signals + nets:
+            lines.append('  signal %s : STD_LOGIC;' % s)
+        for v in vectors:
+            lines.append('  signal %s : STD_LOGIC_VECTOR(0 to 7);' % v)
+        lines.append('begin')
+        pool = self.inputs + signals + nets + \
+            ['%s(%d)' % (v, k) for v in vectors for k in (0, 7)]
+        for k, master in enumerate(instances):
+            maps = ['clk => clk', 'rst => rst']
+            maps += ['%s => %s' % (p, r.choice(pool)) for p in self.inputs]
+            maps += ['%s => n%d_%s' % (o, k, o) for o in self.outputs]
+            lines.append('  u%d : %s port map (%s);' %
+                (k, self.name(master), ', '.join(maps)))
+        for k, v in enumerate(vectors):
+            lines.append('  g%d : for j in 0 to 7 generate' % k)
+            lines.append('    %s(j) <= %s;' % (v,
+                self.expression(pool, self.exprdepth)))
+            lines.append('  end generate;')
+        for o in self.outputs:
+            lines.append('  %s <= %s;' % (o,
+                self.expression(pool, self.exprdepth)))
+        for p in range(self.processes):
+            targets = signals[p::self.processes]
+            lines.append('  p%d : process(clk, rst)' % p)
+            lines.append('  begin')
+            lines.append('    if rst = \'1\' then')
+            for s in targets:
+                lines.append('      %s <= \'0\';' % s)
+            lines.append('    elsif rising_edge(clk) then')
+            lines += self.statements(pool, targets, self.depth, '      ')
+            lines.append('    end if;')
+            lines.append('  end process;')
+        if not self.processes:
+            for s in signals:
+                lines.append('  %s <= %s;' % (s,
+                    self.expression(pool, self.exprdepth)))
+        lines += ['end rtl;', '']
+        return lines
+
+    # generates the design, yields (entity name, lines) per entity
+    def design(self):
+        for i in range(self.entities):
+            yield self.name(i), self.entity(i)
+
+if __name__ == "__main__":
+    optparser = optparse.OptionParser(usage='%prog [options]')
+    optparser.add_option('-e', '--entities', type='int', default=4,
+        help='number of entities (default %default)')
+    optparser.add_option('-p', '--ports', type='int', default=8,
+        help='ports per entity besides clk and rst (default %default)')
+    optparser.add_option('-s', '--signals', type='int', default=16,
+        help='signals per architecture (default %default)')
+    optparser.add_option('-r', '--processes', type='int', default=4,
+        help='processes per architecture (default %default)')
+    optparser.add_option('-d', '--depth', type='int', default=2,
+        help='nesting depth of if/case statements (default %default)')
+    optparser.add_option('-x', '--expr-depth', type='int', default=3,
+        help='depth of expressions (default %default)')
+    optparser.add_option('-f', '--fanout', type='int', default=2,
+        help='component instances per architecture (default %default)')
+    optparser.add_option('-g', '--generates', type='int', default=1,
+        help='generate loops per architecture (default %default)')
+    optparser.add_option('--seed', type='int', default=1,
+        help='random seed (default %default)')
+    optparser.add_option('-o', '--output', metavar='FILE',
+        help='write the design to FILE (default stdout)')
+    optparser.add_option('--split', metavar='DIR',
+        help='write every entity to DIR/<entity>.vhd')
+    (options, args) = optparser.parse_args()
+    if args:
+        optparser.error('no arguments expected')
+    generator = DesignGenerator(options.entities, options.ports,
+        options.signals, options.processes, options.depth, options.expr_depth,
+        options.fanout, options.generates, options.seed)
+    if options.split:
+        if not os.path.isdir(options.split):
+            os.makedirs(options.split)
+        for name, lines in generator.design():
+            f = open(os.path.join(options.split, name + '.vhd'), 'w')
+            f.write('\n'.join(lines))
+            f.close()
+    else:
+        output = sys.stdout
+        if options.output:
+            output = open(options.output, 'w')
+        for name, lines in generator.design():
+            output.write('\n'.join(lines))
+        if options.output:
+            output.close()
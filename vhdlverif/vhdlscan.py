@@ -0,0 +1,161 @@
+#! /usr/bin/env python
+# vim:ts=4:expandtab:sw=4:tw=0
+###############################################################################
+# vhdlscan.py - single-pass scanner for the token rules of vhd2xml            #
+#                                                                             #
+# This program is free software; you can redistribute it and/or modify        #
+#   it under the terms of the GNU General Public License as published by      #
+#   the Free Software Foundation; either version 2 of the License, or         #
+#   (at your option) any later version.                                       #
+#   See http://www.gnu.org/licenses/gpl.html for more details.                #
+#                                                                             #
+###############################################################################
+###############################################################################
+# Scanner is a replacement of the PLY lexer for the vhd2xml token module.  All
+# token rules are compiled into one regular expression with a named group per
+# rule, in the order PLY tries them (rule functions by line, then strings by
+# decreasing length, then the literal characters), so the token stream is the
+# same.  The rule functions are not called: line counting of newlines and
+# comments and the keyword test of identifiers are done in the scan loop, the
+# keyword test is a dictionary lookup of the identifier text, which also
+# yields the interned lower case value.
+
+import re
+import types
+from operator import itemgetter
+import lex
+
+# Scanner token class - a tuple (type, value, lineno, lexpos, lexer), the
+# parser reads the fields as attributes; tokens are created by
+# tuple.__new__ without a Python level constructor call
+class ScanToken(tuple):
+    "Token passed to the parser"
+    __slots__ = ()
+    type = property(itemgetter(0))
+    value = property(itemgetter(1))
+    lineno = property(itemgetter(2))
+    lexpos = property(itemgetter(3))
+    lexer = property(itemgetter(4))
+
+    def __str__(self):
+        return "LexToken(%s,%r,%d,%d)" % self[:4]
+    __repr__ = __str__
+
+# turns capturing groups of a rule into non-capturing ones, the rule group
+# has to be the last matched group
+def plain_groups(regex):
+    return re.sub(r'(?<!\\)\((?!\?)', '(?:', regex)
+
+# returns the (name, regex) pairs of the token rules of module in the order
+# the PLY lexer tries them
+def token_rules(module):
+    ldict = module.__dict__
+    funcs = [f for n, f in ldict.items() if n[:2] == 't_' and n != 't_error'
+        and isinstance(f, types.FunctionType)]
+    funcs.sort(key=lambda f: f.func_code.co_firstlineno)
+    rules = [(f.__name__[2:], f.__doc__) for f in funcs]
+    strs = [(n[2:], v) for n, v in ldict.items() if n[:2] == 't_'
+        and n != 't_ignore' and isinstance(v, types.StringTypes)]
+    strs.sort(key=lambda r: -len(r[1]))
+    return rules + strs
+
+# Scanner class
+class Scanner(object):
+    "Single-pass VHDL scanner, has the interface of the PLY lexer"
+
+    def __init__(self, module):
+        self.module = module
+        rules = token_rules(module)
+        regex = []
+        for name, r in rules:
+            regex.append('(?P<%s>%s)' % (name, plain_groups(r)))
+        literals = ''.join(module.literals)
+        regex.append('(?P<literal>[%s])' % re.escape(literals))
+        self.regex = re.compile('[%s]*(?:%s)' %
+            (re.escape(module.t_ignore), '|'.join(regex)))
+        self.reserved = module.RESERVED_TYPES
+        self.error = module.t_error
+        # identifier text -> (token type, interned lower case value)
+        self.ids = {}
+        self.lexdata = None
+        self.lexpos = 0
+        self.lexlen = 0
+        self.lineno = 1
+
+    # returns a new scanner sharing the regular expression and the
+    # identifier table
+    def clone(self):
+        c = Scanner.__new__(Scanner)
+        c.__dict__.update(self.__dict__)
+        return c
+
+    # the parser takes the token method after input, it is the next method
+    # of the scan generator
+    def input(self, data):
+        self.lexdata = data
+        self.lexpos = 0
+        self.lexlen = len(data)
+        self.token = self.scan().next
+
+    def token(self):
+        return None
+
+    # the scan loop, a generator of tokens (None at the end of input)
+    def scan(self):
+        data = self.lexdata
+        end = self.lexlen
+        match = self.regex.match
+        ignore = self.module.t_ignore
+        ids = self.ids
+        reserved = self.reserved
+        new = tuple.__new__
+        pos = 0
+        while pos < end:
+            m = match(data, pos)
+            if m == None:
+                # only ignored characters left or an illegal character
+                while pos < end and data[pos] in ignore:
+                    pos += 1
+                if pos < end:
+                    pos = self.illegal(pos)
+                continue
+            kind = m.lastgroup
+            start = m.start(kind)
+            pos = m.end()
+            if kind == 'ID':
+                text = m.group(kind)
+                r = ids.get(text)
+                if r == None:
+                    value = intern(text.lower())
+                    r = ids[text] = (reserved.get(value, 'ID'), value)
+                yield new(ScanToken, (r[0], r[1], self.lineno, start, self))
+            elif kind == 'newline' or kind[:7] == 'ignore_':
+                self.lineno += m.group(kind).count('\n')
+            elif kind == 'literal':
+                text = m.group(kind)
+                yield new(ScanToken, (text, text, self.lineno, start, self))
+            else:
+                yield new(ScanToken,
+                    (kind, m.group(kind), self.lineno, start, self))
+        self.lexpos = end
+        while True:
+            yield None
+
+    # reports an illegal character through t_error, as the PLY lexer does,
+    # returns the position where t_error continues
+    def illegal(self, pos):
+        self.lexpos = pos
+        tok = lex.LexToken()
+        tok.type = 'error'
+        tok.value = self.lexdata[pos:pos+1]
+        tok.lineno = self.lineno
+        tok.lexpos = pos
+        tok.lexer = self
+        self.error(tok)
+        if self.lexpos == pos:
+            raise lex.LexError, ("Scanning error. Illegal character '%s'" %
+                (self.lexdata[pos]), self.lexdata[pos:])
+        return self.lexpos
+
+    def skip(self, n):
+        self.lexpos += n
@@ -339,12 +339,11 @@ class Parser:
                     if errtoken.type == '$end':
                         errtoken = None               # End of file!
                     if self.errorfunc:
-                        global errok,token,restart
-                        errok = self.errok        # Set some special functions available in error recovery
-                        token = get_token
-                        restart = self.restart
+                        # Unlike PLY 2.3, errok(), token() and restart() are
+                        # not published as module globals during p_error():
+                        # they would be shared by concurrent parses.  The
+                        # error function calls the methods of its parser.
                         tok = self.errorfunc(errtoken)
-                        del errok, token, restart   # Delete special functions
                         
                         if self.errorok:
                             # User must have done some kind of panic